@@ -0,0 +1,132 @@
+# E:\CRM\automation_project\benchmarks\import_time.py
+"""
+Import-time (cold start) benchmark of the step runners.
+
+Starts a fresh interpreter several times and measures how long importing a
+module takes (default: step_execution_main_runner), with python -X importtime
+to list the slowest imports. With --prewarm the run also imports every action
+handler (ACTION_HANDLERS.prewarm()), i.e. the cost the lazy registry avoids.
+
+Usage (from the project root):
+
+    python -m benchmarks.import_time
+    python -m benchmarks.import_time --repeats 10 --top 15
+    python -m benchmarks.import_time --module step_execution_batch_runner --prewarm
+
+Imports that fail (e.g. an optional dependency missing on this machine) are
+reported instead of timed.
+"""
+
+import argparse
+import os
+import re
+import subprocess
+import sys
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.dirname(BENCHMARKS_DIR)
+
+DEFAULT_MODULE = "step_execution_main_runner"
+DEFAULT_REPEATS = 5
+DEFAULT_TOP = 10
+
+# One line of -X importtime output: "import time:  self [us] |  cumulative | imported package"
+_IMPORTTIME_LINE = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+
+_SCRIPT = """
+import time
+start = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - start
+{prewarm}
+print("IMPORT_SECONDS", elapsed)
+"""
+
+_PREWARM = """
+from steps_shared_utils.steps_shared_actions_registry import ACTION_HANDLERS
+start = time.perf_counter()
+failed = ACTION_HANDLERS.prewarm()
+print("PREWARM_SECONDS", time.perf_counter() - start)
+print("PREWARM_FAILED", ",".join(failed))
+"""
+
+
+def measure_once(module=DEFAULT_MODULE, prewarm=False):
+    """
+    Imports 'module' in a fresh interpreter. Returns a dict with
+    import_seconds, prewarm_seconds (or None), prewarm_failed, and the parsed
+    -X importtime entries [(cumulative_us, self_us, depth, name)].
+    """
+    script = _SCRIPT.format(module=module, prewarm=_PREWARM if prewarm else "")
+    env = dict(os.environ, STEP_LOG_LEVEL="ERROR")
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", script],
+        cwd=PROJECT_ROOT, env=env, capture_output=True, text=True,
+    )
+    if completed.returncode != 0:
+        last_line = (completed.stderr.strip().splitlines() or ["?"])[-1]
+        raise RuntimeError(f"Importing '{module}' failed: {last_line}")
+
+    result = {"import_seconds": None, "prewarm_seconds": None, "prewarm_failed": [], "imports": []}
+    for line in completed.stdout.splitlines():
+        if line.startswith("IMPORT_SECONDS"):
+            result["import_seconds"] = float(line.split()[1])
+        elif line.startswith("PREWARM_SECONDS"):
+            result["prewarm_seconds"] = float(line.split()[1])
+        elif line.startswith("PREWARM_FAILED"):
+            result["prewarm_failed"] = [name for name in line.split(" ", 1)[-1].strip().split(",") if name]
+    for line in completed.stderr.splitlines():
+        match = _IMPORTTIME_LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, name = match.groups()
+            result["imports"].append((int(cumulative_us), int(self_us), len(indent) // 2, name))
+    return result
+
+
+def _median(values):
+    ordered = sorted(values)
+    middle = len(ordered) // 2
+    return ordered[middle] if len(ordered) % 2 else (ordered[middle - 1] + ordered[middle]) / 2
+
+
+def run(module=DEFAULT_MODULE, repeats=DEFAULT_REPEATS, prewarm=False, top=DEFAULT_TOP):
+    """
+    Measures 'repeats' cold imports and returns the report text.
+    """
+    runs = [measure_once(module, prewarm=prewarm) for _ in range(repeats)]
+    import_times = [r["import_seconds"] for r in runs]
+    lines = [
+        f"Cold import of '{module}' ({repeats} run(s)): "
+        f"median {_median(import_times) * 1000:.0f} ms, min {min(import_times) * 1000:.0f} ms, max {max(import_times) * 1000:.0f} ms",
+    ]
+    if prewarm:
+        prewarm_times = [r["prewarm_seconds"] for r in runs]
+        lines.append(f"Prewarming every action handler: median {_median(prewarm_times) * 1000:.0f} ms")
+        if runs[-1]["prewarm_failed"]:
+            lines.append(f"  Handlers that failed to import: {', '.join(runs[-1]['prewarm_failed'])}")
+
+    # Slowest imports of the last run, by cumulative time (a package includes its children).
+    imports = sorted(runs[-1]["imports"], reverse=True)
+    lines.append("Slowest imports of the last run (cumulative ms, depth, module):")
+    for cumulative_us, self_us, depth, name in imports[:top]:
+        lines.append(f"  {cumulative_us / 1000:8.1f}  {depth:>2}  {name}")
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure the cold import time of the step runners.")
+    parser.add_argument("--module", default=DEFAULT_MODULE, help="Module to import (default: step_execution_main_runner).")
+    parser.add_argument("--repeats", type=int, default=DEFAULT_REPEATS, help="Fresh interpreters to start.")
+    parser.add_argument("--prewarm", action="store_true", help="Also time importing every action handler.")
+    parser.add_argument("--top", type=int, default=DEFAULT_TOP, help="Number of slowest imports to list.")
+    args = parser.parse_args(argv)
+    try:
+        print(run(args.module, repeats=args.repeats, prewarm=args.prewarm, top=args.top))
+    except RuntimeError as e:
+        print(e)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,352 @@
+# E:\CRM\automation_project\benchmarks\run_benchmarks.py
+"""
+Offline benchmark harness for the step executor.
+
+Serves the HTML fixtures in benchmarks/fixtures/ (plain inputs, large <select>s,
+mat-option lists, chosen widgets, intl-tel-input lists, delayed-render elements,
+alert-triggering fields, a long page for screenshots) from a local HTTP server,
+runs the canned execution inputs in benchmarks/scenarios/ through
+run_steps_crm_format in a headless browser, and reports latency percentiles per
+action (and per phase, from the step timing spans) and per scenario.
+
+Usage (from the project root):
+
+    python -m benchmarks.run_benchmarks                       # all scenarios, 5 runs each
+    python -m benchmarks.run_benchmarks large_select mat_options --repeats 10
+    python -m benchmarks.run_benchmarks --save-baseline       # store benchmarks/baseline.json
+    python -m benchmarks.run_benchmarks --output report.json  # also write the full report
+
+Every run is compared against the stored baseline; the exit code is 1 when an
+action or scenario got slower than the baseline by more than --tolerance (and by
+at least MIN_REGRESSION_SECONDS), so the harness can gate a change.
+
+Scenarios are execution inputs (form, condition_context, steps) in which
+"{base_url}" and "{output_dir}" are replaced with the fixture server URL and a
+temporary output directory. The first --warmup runs of each scenario are not
+measured (they teach the adaptive waits and the selector cache, as production
+runs would). Wait statistics and the selector cache are kept in a temporary
+directory, so benchmarks never touch the real step_wait_config.json.
+"""
+
+import argparse
+import glob
+import json
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from functools import partial
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.dirname(BENCHMARKS_DIR)
+FIXTURES_DIR = os.path.join(BENCHMARKS_DIR, "fixtures")
+SCENARIOS_DIR = os.path.join(BENCHMARKS_DIR, "scenarios")
+BASELINE_PATH = os.path.join(BENCHMARKS_DIR, "baseline.json")
+
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from steps_shared_utils.run_logging import get_logger
+
+logger = get_logger("benchmarks")
+
+DEFAULT_REPEATS = 5
+DEFAULT_WARMUP = 1
+
+# A metric regresses when it is slower than the baseline by more than the
+# tolerance (relative) AND by at least MIN_REGRESSION_SECONDS (absolute), so
+# millisecond jitter on fast actions is not reported.
+DEFAULT_TOLERANCE = 0.20
+MIN_REGRESSION_SECONDS = 0.05
+
+# Percentiles compared against the baseline.
+COMPARED_PERCENTILES = ("p50", "p95")
+
+
+class _QuietFixtureHandler(SimpleHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+
+def serve_fixtures(directory=FIXTURES_DIR, port=0):
+    """
+    Serves 'directory' on 127.0.0.1 from a daemon thread.
+    Returns (server, base_url); call server.shutdown() when done.
+    """
+    handler = partial(_QuietFixtureHandler, directory=directory)
+    server = ThreadingHTTPServer(("127.0.0.1", port), handler)
+    thread = threading.Thread(target=server.serve_forever, name="benchmark-fixtures", daemon=True)
+    thread.start()
+    base_url = f"http://127.0.0.1:{server.server_address[1]}"
+    logger.debug("Serving %s at %s", directory, base_url)
+    return server, base_url
+
+
+def load_scenarios(names=None, directory=SCENARIOS_DIR):
+    """
+    Returns [(name, execution_input)] for the scenario files in 'directory'
+    (all of them, or only 'names', in the given order).
+    """
+    available = {
+        os.path.splitext(os.path.basename(path))[0]: path
+        for path in glob.glob(os.path.join(directory, "*.json"))
+    }
+    if names:
+        unknown = [name for name in names if name not in available]
+        if unknown:
+            raise ValueError(f"Unknown scenario(s): {', '.join(unknown)}. Available: {', '.join(sorted(available))}")
+    else:
+        names = sorted(available)
+
+    scenarios = []
+    for name in names:
+        with open(available[name], "r", encoding="utf-8") as f:
+            scenarios.append((name, json.load(f)))
+    return scenarios
+
+
+def fill_placeholders(execution_input, base_url, output_dir):
+    """
+    Returns a copy of the execution input with {base_url} and {output_dir} filled in.
+    """
+    raw = json.dumps(execution_input)
+    raw = raw.replace("{base_url}", base_url)
+    raw = raw.replace("{output_dir}", json.dumps(output_dir)[1:-1])
+    return json.loads(raw)
+
+
+def percentile(values, q):
+    """
+    Linear-interpolated percentile (q in 0..100) of a non-empty list.
+    """
+    ordered = sorted(values)
+    if len(ordered) == 1:
+        return ordered[0]
+    position = (len(ordered) - 1) * q / 100.0
+    lower = int(position)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower)
+
+
+def describe_samples(values):
+    return {
+        "count": len(values),
+        "mean": round(sum(values) / len(values), 4),
+        "p50": round(percentile(values, 50), 4),
+        "p90": round(percentile(values, 90), 4),
+        "p95": round(percentile(values, 95), 4),
+        "max": round(max(values), 4),
+    }
+
+
+def summarize(runs):
+    """
+    Aggregates measured runs ({"scenario", "status", "timings"}) into the report's
+    "scenarios" and "actions" sections.
+    """
+    scenario_totals = {}
+    scenario_failures = {}
+    action_seconds = {}
+    action_phases = {}
+    action_timeouts = {}
+
+    for run in runs:
+        name = run["scenario"]
+        scenario_totals.setdefault(name, []).append(run["timings"]["total_seconds"])
+        if run["status"] != "completed":
+            scenario_failures[name] = scenario_failures.get(name, 0) + 1
+        for step in run["timings"]["steps"]:
+            action = step["action"] or "?"
+            action_seconds.setdefault(action, []).append(step["seconds"])
+            phases = action_phases.setdefault(action, {})
+            for phase, seconds in step["phases"].items():
+                phases.setdefault(phase, []).append(seconds)
+            if step["timed_out"]:
+                action_timeouts[action] = action_timeouts.get(action, 0) + 1
+
+    scenarios = {}
+    for name, totals in scenario_totals.items():
+        entry = describe_samples(totals)
+        entry["failures"] = scenario_failures.get(name, 0)
+        scenarios[name] = entry
+
+    actions = {}
+    for action, seconds in action_seconds.items():
+        entry = describe_samples(seconds)
+        entry["timeouts"] = action_timeouts.get(action, 0)
+        entry["phases_p50"] = {
+            phase: round(percentile(values, 50), 4)
+            for phase, values in sorted(action_phases[action].items())
+        }
+        actions[action] = entry
+
+    return {"scenarios": scenarios, "actions": actions}
+
+
+def compare_with_baseline(report, baseline, tolerance=DEFAULT_TOLERANCE, min_seconds=MIN_REGRESSION_SECONDS):
+    """
+    Returns a list of regression descriptions (empty when nothing got slower).
+    Metrics missing from either side are ignored.
+    """
+    regressions = []
+    for section in ("scenarios", "actions"):
+        for name, current in report.get(section, {}).items():
+            previous = baseline.get(section, {}).get(name)
+            if not previous:
+                continue
+            for key in COMPARED_PERCENTILES:
+                if key not in previous or key not in current:
+                    continue
+                delta = current[key] - previous[key]
+                if delta >= min_seconds and current[key] > previous[key] * (1.0 + tolerance):
+                    regressions.append(
+                        f"{section[:-1]} '{name}' {key}: {previous[key]:.3f}s -> {current[key]:.3f}s "
+                        f"(+{delta:.3f}s, +{delta / previous[key] * 100 if previous[key] else float('inf'):.0f}%)"
+                    )
+    return regressions
+
+
+def format_report(report, regressions=None):
+    """
+    Returns the report as text tables (scenarios, then actions sorted by p95).
+    """
+    lines = [
+        f"Benchmark: {report['repeats']} measured run(s) per scenario after {report['warmup']} warm-up run(s)",
+        "",
+        f"{'scenario':<20} {'p50':>8} {'p90':>8} {'p95':>8} {'max':>8} {'failed':>7}",
+    ]
+    for name, entry in sorted(report["scenarios"].items()):
+        lines.append(
+            f"{name:<20} {entry['p50']:>8.3f} {entry['p90']:>8.3f} {entry['p95']:>8.3f} {entry['max']:>8.3f} {entry['failures']:>7}"
+        )
+    lines += ["", f"{'action':<36} {'n':>4} {'p50':>8} {'p90':>8} {'p95':>8} {'max':>8} {'t/o':>4}  phases (p50)"]
+    for action, entry in sorted(report["actions"].items(), key=lambda item: item[1]["p95"], reverse=True):
+        phases = " ".join(f"{phase}={seconds:.3f}" for phase, seconds in entry["phases_p50"].items())
+        lines.append(
+            f"{action:<36} {entry['count']:>4} {entry['p50']:>8.3f} {entry['p90']:>8.3f} {entry['p95']:>8.3f} {entry['max']:>8.3f} {entry['timeouts']:>4}  {phases}"
+        )
+    if regressions is not None:
+        lines.append("")
+        if regressions:
+            lines.append(f"{len(regressions)} regression(s) against the baseline:")
+            lines += [f"  {regression}" for regression in regressions]
+        else:
+            lines.append("No regressions against the baseline.")
+    return "\n".join(lines)
+
+
+def run_benchmarks(scenario_names=None, repeats=DEFAULT_REPEATS, warmup=DEFAULT_WARMUP, headless=True):
+    """
+    Runs the scenarios and returns the report dict:
+      {"created", "repeats", "warmup", "scenarios": {...}, "actions": {...}, "runs": [...]}
+    """
+    # Imported here so that the environment set up by main() (temporary stats
+    # files) is in place before the executor modules read it.
+    from step_execution_selenium_flow.step_execution_step_executor import run_steps_crm_format
+    from steps_shared_utils.steps_shares_browser_manager import init_browser, close_browser
+
+    scenarios = load_scenarios(scenario_names)
+    output_dir = tempfile.mkdtemp(prefix="step_benchmarks_output_")
+    server, base_url = serve_fixtures()
+    driver = init_browser(headless=headless)
+    runs = []
+    try:
+        for name, execution_input in scenarios:
+            data = fill_placeholders(execution_input, base_url, output_dir)
+            for iteration in range(warmup + repeats):
+                measured = iteration >= warmup
+                result = run_steps_crm_format(
+                    {"steps": data.get("steps", [])},
+                    driver,
+                    condition_context=data.get("condition_context", {}),
+                    form=data.get("form"),
+                )
+                logger.info(
+                    "%s run %s/%s: %s in %.3fs%s", name, iteration + 1, warmup + repeats,
+                    result["status"], result["timings"]["total_seconds"], "" if measured else " (warm-up)",
+                )
+                if measured:
+                    runs.append({
+                        "scenario": name,
+                        "status": result["status"],
+                        "error": result["error"],
+                        "timings": result["timings"],
+                    })
+    finally:
+        close_browser(driver)
+        server.shutdown()
+        shutil.rmtree(output_dir, ignore_errors=True)
+
+    report = {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "repeats": repeats,
+        "warmup": warmup,
+    }
+    report.update(summarize(runs))
+    report["runs"] = runs
+    return report
+
+
+def load_baseline(path=BASELINE_PATH):
+    if not os.path.exists(path):
+        return None
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_baseline(report, path=BASELINE_PATH):
+    """
+    Stores the percentiles of a report (without the individual runs) as the baseline.
+    """
+    baseline = {key: value for key, value in report.items() if key != "runs"}
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(baseline, f, indent=2)
+        f.write("\n")
+    logger.info("Baseline written to %s", path)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the step executor against local fixtures.")
+    parser.add_argument("scenarios", nargs="*", help="Scenario names (default: all in benchmarks/scenarios).")
+    parser.add_argument("--repeats", type=int, default=DEFAULT_REPEATS, help="Measured runs per scenario.")
+    parser.add_argument("--warmup", type=int, default=DEFAULT_WARMUP, help="Unmeasured runs per scenario before measuring.")
+    parser.add_argument("--headed", action="store_true", help="Show the browser instead of running headless.")
+    parser.add_argument("--baseline", default=BASELINE_PATH, help="Baseline file to compare against.")
+    parser.add_argument("--save-baseline", action="store_true", help="Store this run as the new baseline.")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE, help="Allowed slowdown before a regression (0.2 = 20%%).")
+    parser.add_argument("--output", help="Also write the full report (with every run) to this JSON file.")
+    parser.add_argument("--keep-stats", action="store_true", help="Use the real wait statistics and selector cache files.")
+    args = parser.parse_args(argv)
+
+    stats_dir = None
+    if not args.keep_stats:
+        stats_dir = tempfile.mkdtemp(prefix="step_benchmarks_stats_")
+        os.environ["STEP_WAIT_CONFIG_PATH"] = os.path.join(stats_dir, "step_wait_config.json")
+        os.environ["STEP_WAIT_SQLITE_PATH"] = os.path.join(stats_dir, "step_wait_config.sqlite3")
+        os.environ["STEP_SELECTOR_CACHE_PATH"] = os.path.join(stats_dir, "selector_cache.json")
+        os.environ["STEP_CHECKPOINT_DIR"] = os.path.join(stats_dir, "execution_checkpoints")
+
+    try:
+        report = run_benchmarks(args.scenarios, repeats=args.repeats, warmup=args.warmup, headless=not args.headed)
+    finally:
+        if stats_dir:
+            shutil.rmtree(stats_dir, ignore_errors=True)
+
+    baseline = load_baseline(args.baseline)
+    regressions = compare_with_baseline(report, baseline, tolerance=args.tolerance) if baseline else None
+    print(format_report(report, regressions))
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    if args.save_baseline:
+        save_baseline(report, args.baseline)
+        return 0
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,9 +1,21 @@
 # E:\CRM\automation_project\step_builder_db_manager.py
 
+import atexit
 import os
+import re
+import threading
+import time
+import hashlib
+from contextlib import contextmanager
+
 import psycopg2
+import psycopg2.extensions
 from dotenv import load_dotenv
 
+from steps_shared_utils.run_logging import get_logger
+
+logger = get_logger(__name__)
+
 # If your .env is in a specific location, provide the exact path:
 # load_dotenv(r"E:\CRM\automation_project\.env")
 
@@ -17,11 +29,219 @@ DATABASE_NAME = os.getenv("DATABASE_NAME")
 DATABASE_PASSWORD = os.getenv("DATABASE_PASSWORD")
 DATABASE_PORT = os.getenv("DATABASE_PORT")
 
-def get_connection():
-    return psycopg2.connect(
+# Pool sizing. Every parallel runner worker may hold one connection at a time,
+# so DB_POOL_MAX bounds how many Postgres connection slots this process can use.
+# Returned connections stay open for reuse (up to DB_POOL_MAX of them).
+# DB_POOL_MIN connections are opened on first use and the idle list is topped
+# back up to that many when stale ones are recycled, so the first queries of a
+# run (and of each quiet period) do not pay for connecting.
+DB_POOL_MIN = int(os.getenv("DB_POOL_MIN", "1"))
+DB_POOL_MAX = int(os.getenv("DB_POOL_MAX", "10"))
+
+# A connection idle for longer than this is checked with "SELECT 1" before reuse.
+DB_POOL_HEALTH_CHECK_AFTER = float(os.getenv("DB_POOL_HEALTH_CHECK_AFTER", "30"))
+
+# A connection idle for longer than this is closed instead of reused (the server or
+# a firewall may have dropped it silently).
+DB_POOL_MAX_IDLE = float(os.getenv("DB_POOL_MAX_IDLE", "300"))
+
+# Seconds to wait for a free connection before giving up.
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+
+# Idle connections, most recently returned last. Connections in use are not tracked:
+# _POOL_SLOTS bounds how many exist at all.
+_IDLE = []
+_IDLE_TARGET = 0  # becomes min(DB_POOL_MIN, DB_POOL_MAX) on first use
+_POOL_LOCK = threading.Lock()
+_POOL_SLOTS = threading.BoundedSemaphore(DB_POOL_MAX)
+
+
+class PooledConnection(psycopg2.extensions.connection):
+    """
+    A psycopg2 connection that remembers, for the pool, when it was returned
+    and which statements execute_cached() prepared on it.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.last_used = time.time()
+        self.prepared = set()
+
+
+def _new_connection_kwargs():
+    return dict(
         user=DATABASE_USER,
         host=DATABASE_HOST,
         database=DATABASE_NAME,
         password=DATABASE_PASSWORD,
         port=DATABASE_PORT
     )
+
+
+def _connect():
+    logger.debug("Opening a database connection.")
+    return psycopg2.connect(connection_factory=PooledConnection, **_new_connection_kwargs())
+
+
+def _close(conn):
+    try:
+        conn.close()
+    except psycopg2.Error:
+        pass
+
+
+def _is_healthy(conn):
+    """
+    Returns True if 'conn' is open and, when it has been idle for a while, still answers.
+    """
+    if conn.closed:
+        return False
+    idle = time.time() - conn.last_used
+    if idle > DB_POOL_MAX_IDLE:
+        return False
+    if idle > DB_POOL_HEALTH_CHECK_AFTER:
+        try:
+            with conn.cursor() as cur:
+                cur.execute("SELECT 1")
+            conn.rollback()
+        except psycopg2.Error:
+            return False
+    return True
+
+
+def _warm_pool():
+    """
+    Opens connections until DB_POOL_MIN are idle (the first call arms this).
+    A failure to connect is logged and left to the caller's own connect attempt.
+    """
+    global _IDLE_TARGET
+    with _POOL_LOCK:
+        _IDLE_TARGET = max(0, min(DB_POOL_MIN, DB_POOL_MAX))
+        missing = _IDLE_TARGET - len(_IDLE)
+    for _ in range(max(0, missing)):
+        try:
+            conn = _connect()
+        except psycopg2.Error as e:
+            logger.warning("Could not pre-open a database connection: %s", e)
+            return
+        with _POOL_LOCK:
+            _IDLE.insert(0, conn)
+
+
+def _checkout():
+    """
+    Takes a healthy idle connection, closing broken or stale ones, or opens a
+    new one. Blocks (up to DB_POOL_TIMEOUT) while all DB_POOL_MAX connections
+    are in use.
+    """
+    if not _POOL_SLOTS.acquire(timeout=DB_POOL_TIMEOUT):
+        raise TimeoutError(f"No database connection available within {DB_POOL_TIMEOUT}s (DB_POOL_MAX={DB_POOL_MAX}).")
+    try:
+        if not _IDLE_TARGET:
+            _warm_pool()
+        recycled = False
+        while True:
+            with _POOL_LOCK:
+                conn = _IDLE.pop() if _IDLE else None
+            if conn is None:
+                conn = _connect()
+            elif not _is_healthy(conn):
+                logger.debug("Recycling a stale database connection.")
+                _close(conn)
+                recycled = True
+                continue
+            if recycled:
+                _warm_pool()
+            return conn
+    except Exception:
+        _POOL_SLOTS.release()
+        raise
+
+
+def _checkin(conn, broken=False):
+    try:
+        if broken or conn.closed:
+            _close(conn)
+        else:
+            conn.last_used = time.time()
+            with _POOL_LOCK:
+                _IDLE.append(conn)
+    finally:
+        _POOL_SLOTS.release()
+
+
+@contextmanager
+def get_connection():
+    """
+    Borrows a pooled connection:
+
+        with get_connection() as conn:
+            with conn.cursor() as cur:
+                ...
+
+    Like a plain psycopg2 connection used in a with-block, the transaction is
+    committed when the block succeeds and rolled back when it raises. The
+    connection then goes back to the pool instead of being closed.
+    """
+    conn = _checkout()
+    broken = False
+    try:
+        yield conn
+        conn.commit()
+    except Exception:
+        try:
+            conn.rollback()
+        except psycopg2.Error:
+            broken = True
+        raise
+    finally:
+        _checkin(conn, broken=broken)
+
+
+def close_pool():
+    """
+    Closes every idle pooled connection. Registered to run at interpreter exit;
+    may also be called at the end of a batch run.
+    """
+    with _POOL_LOCK:
+        idle = list(_IDLE)
+        _IDLE.clear()
+    for conn in idle:
+        _close(conn)
+    if idle:
+        logger.debug("Closed %s pooled database connection(s).", len(idle))
+
+
+atexit.register(close_pool)
+
+
+# Any psycopg2 placeholder or escape: %s, %(name)s, %%.
+_PARAM_PATTERN = re.compile(r"%(?:\([^)]*\))?.")
+
+
+def execute_cached(cur, sql, params=()):
+    """
+    Executes 'sql' (psycopg2 %s placeholders) as a server-side prepared statement.
+
+    The statement is prepared once per pooled connection (named after a hash of
+    the SQL text) and later calls only send EXECUTE with the parameters, so the
+    hot repository queries are not parsed and planned again on every call.
+    SQL using named parameters or '%%' escapes, or whose %s count does not match
+    'params', runs as a plain cur.execute() instead.
+    """
+    placeholders = _PARAM_PATTERN.findall(sql)
+    if isinstance(params, dict) or any(p != "%s" for p in placeholders) or len(placeholders) != len(params or ()):
+        cur.execute(sql, params)
+        return
+    params = tuple(params or ())
+    name = "stmt_" + hashlib.md5(sql.encode("utf-8")).hexdigest()[:16]
+    prepared = cur.connection.prepared
+    if name not in prepared:
+        counter = iter(range(1, len(params) + 1))
+        server_sql = _PARAM_PATTERN.sub(lambda _: f"${next(counter)}", sql)
+        cur.execute(f"PREPARE {name} AS {server_sql}")
+        prepared.add(name)
+    if params:
+        cur.execute(f"EXECUTE {name} ({', '.join(['%s'] * len(params))})", params)
+    else:
+        cur.execute(f"EXECUTE {name}")
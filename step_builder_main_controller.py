@@ -8,7 +8,7 @@ from step_builder_db_manager import get_connection
 from step_builder_repositories.step_builder_forms_repository import load_forms
 from step_builder_repositories.step_builder_form_steps_repository import load_form_steps
 from step_builder_ui.step_builder_user_interface import pick_form_gui
-from steps_shared_utils.steps_shares_browser_manager import init_browser, close_browser
+from steps_shared_utils.steps_shares_browser_manager import init_browser, close_browser, BrowserStartError
 from step_builder_selenium_flow.step_builder_step_executor import run_steps
 from step_builder_selenium_flow.step_builder_create_new_step_flow import create_new_step_flow
 
@@ -67,7 +67,11 @@ def main():
         sys.exit(1)
 
     # 5) Initialize browser (keep it open for the entire session)
-    driver = init_browser(headless=False)
+    try:
+        driver = init_browser(headless=False)
+    except BrowserStartError as e:
+        print(f"[ERROR] {e}")
+        sys.exit(1)
 
     try:
         # 6) Run the existing steps (all from step #1 by default)
@@ -1,5 +1,5 @@
 import json
-from step_builder_db_manager import get_connection
+from step_builder_db_manager import get_connection, execute_cached
 
 def load_form_steps(form_id):
     """
@@ -29,7 +29,8 @@ def load_form_steps(form_id):
         with get_connection() as conn:
             with conn.cursor() as cur:
                 # Updated SQL query to include id_uuid from form_steps table.
-                cur.execute("""
+                # Prepared once per pooled connection (hot query).
+                execute_cached(cur, """
                     SELECT
                         id_uuid,
                         step_order,
@@ -166,3 +167,27 @@ def save_new_step(
     except Exception as e:
         print(f"[ERROR] Failed to insert new step: {e}")
         raise
+
+
+def update_step_selector(step_id, selector_type, selector_value):
+    """
+    update_step_selector(step_id, selector_type, selector_value)
+
+    Replaces the selector of one form_steps row (identified by id_uuid).
+    Used by the self-healing selector cache to promote a fallback selector
+    that keeps resolving the element after the page's DOM changed.
+    """
+    print(f"[DEBUG form_steps_repository.update_step_selector] step_id={step_id}, {selector_type} '{selector_value}'.")
+    try:
+        with get_connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute("""
+                    UPDATE form_steps
+                    SET selector_type = %s,
+                        selector_value = %s
+                    WHERE id_uuid = %s
+                """, (selector_type, selector_value, step_id))
+        print(f"[DEBUG] Updated selector for step_id={step_id}.")
+    except Exception as e:
+        print(f"[ERROR] Failed to update selector for step_id={step_id}: {e}")
+        raise
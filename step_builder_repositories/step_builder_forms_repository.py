@@ -5,7 +5,7 @@ This code is execution-agnostic; it simply loads forms from DB.
 No step-building logic is present here.
 """
 
-from step_builder_db_manager import get_connection
+from step_builder_db_manager import get_connection, execute_cached
 
 def load_forms():
     """
@@ -31,7 +31,7 @@ def load_forms():
         with get_connection() as conn:
             with conn.cursor() as cur:
                 # Example SELECT - adapt as needed
-                cur.execute("""
+                execute_cached(cur, """
                     SELECT id_uuid, form_name, status
                     FROM forms
                     WHERE status = 'development'
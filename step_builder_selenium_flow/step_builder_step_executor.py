@@ -5,12 +5,15 @@ from tkinter import messagebox
 
 from steps_shared_actions import handle_unknown_action
 from steps_shared_actions.alert_handler import handle_unexpected_alerts
-from steps_shared_utils.wait_helpers import wait_for_page_ready
+from steps_shared_utils.wait_helpers import wait_for_page_ready, get_settle_options, arm_settle, settle_after_action
 from steps_shared_utils.steps_shared_actions_registry import ACTION_HANDLERS
 
-# Import adaptive wait functionality and configuration retrieval
-from steps_shared_utils.adaptive_wait import adaptive_wait_for_action
-from steps_shared_utils.step_wait_config import get_step_config
+# Import adaptive wait functionality
+from steps_shared_utils.adaptive_wait import adaptive_wait_for_action, build_readiness_probe
+
+from steps_shared_utils.run_logging import get_logger
+
+logger = get_logger(__name__)
 
 def prompt_for_recovery(step):
     """
@@ -77,9 +80,9 @@ def delete_failed_step(step_id):
     try:
         from step_builder_repositories.step_builder_form_steps_repository import delete_step_by_id
         delete_step_by_id(step_id)
-        print(f"[DEBUG] Step with id {step_id} deleted successfully.")
+        logger.debug("Step with id %s deleted successfully.", step_id)
     except Exception as e:
-        print(f"[ERROR] Failed to delete step with id {step_id}: {e}")
+        logger.error("Failed to delete step with id %s: %s", step_id, e)
 
 def update_element_for_failed_step(step, driver):
     """
@@ -89,9 +92,9 @@ def update_element_for_failed_step(step, driver):
     try:
         from step_builder_selenium_flow.step_builder_create_new_step_flow import update_step_element_flow
         update_step_element_flow(step, driver)
-        print(f"[DEBUG] Step with id {step.get('id_uuid')} updated successfully.")
+        logger.debug("Step with id %s updated successfully.", step.get('id_uuid'))
     except Exception as e:
-        print(f"[ERROR] Failed to update step with id {step.get('id_uuid')}: {e}")
+        logger.error("Failed to update step with id %s: %s", step.get('id_uuid'), e)
 
 def run_steps(steps_data, driver, start_step=1, form_id=None, form_name=None):
     """
@@ -101,11 +104,11 @@ def run_steps(steps_data, driver, start_step=1, form_id=None, form_name=None):
     on each step. If a step fails to execute, it prompts the user to either replace the step
     (delete and create a new one in the same location) or update the element selection for the failed step.
     """
-    print(f"[DEBUG] run_steps: Called with existing driver and start_step={start_step}.")
+    logger.debug("run_steps: Called with existing driver and start_step=%s.", start_step)
 
     steps_list = steps_data.get("steps", [])
     if not steps_list:
-        print("[INFO] No steps to execute.")
+        logger.info("No steps to execute.")
         return
 
     for step in steps_list:
@@ -125,52 +128,42 @@ def run_steps(steps_data, driver, start_step=1, form_id=None, form_name=None):
             step_value = step.get("value", "")
             step_id = step.get("id_uuid")  # Unique identifier for this step
 
-            print(f"[DEBUG] Step #{step_number}: Action='{action_name}', Selector='{selector_value}', Value='{step_value}'")
+            logger.debug("Step #%s: Action='%s', Selector='%s', Value='%s'", step_number, action_name, selector_value, step_value)
 
             # Check for alerts before the action
             handle_unexpected_alerts(driver, action="dismiss")
 
-            # Adaptive wait if step has a unique id
-            if step_id:
-                if form_id and step_id and action_name:
-                    existing_config = get_step_config(form_id, step_id, action_name, default_wait=7.0)
-                    new_max_wait = existing_config.get("ema", 7.0)
-                else:
-                    new_max_wait = 7.0
-
-                def test_action(drv):
-                    try:
-                        if selector_type == "xpath":
-                            elem = drv.find_element(By.XPATH, selector_value)
-                        else:
-                            elem = drv.find_element(By.CSS_SELECTOR, selector_value)
-                        return elem.is_displayed() and elem.is_enabled()
-                    except Exception:
-                        return False
+            # Adaptive wait if step has a unique id and a target element
+            # (the timeout is derived from the step's latency histogram, 7s at most)
+            if step_id and selector_value:
+                test_action = build_readiness_probe(selector_type, selector_value)
 
                 measured_wait = adaptive_wait_for_action(
                     driver,
                     action_test_fn=test_action,
-                    max_wait=new_max_wait,
+                    max_wait=7.0,
                     poll_interval=0.5,
                     step_id=step_id,
                     action_type=action_name,
                     form_id=form_id,
                     form_name=form_name
                 )
-                print(f"[DEBUG] Adaptive wait measured {measured_wait:.2f}s for step_id '{step_id}' and action '{action_name}'.")
+                logger.debug("Adaptive wait measured %.2fs for step_id '%s' and action '%s'.", measured_wait, step_id, action_name)
 
-            # Dispatch the action
+            # Dispatch the action (settle probe armed first so it sees the action's requests)
+            settle_options = get_settle_options(step)
+            arm_settle(driver, settle_options)
             action_func = ACTION_HANDLERS.get(action_name, handle_unknown_action)
             action_func(driver, selector_type, selector_value, step_value, step)
 
-            # Post-action: brief pause and check alerts
-            time.sleep(1)
+            # Post-action: wait for the page to settle and check alerts
+            settle_after_action(driver, settle_options)
             handle_unexpected_alerts(driver, action="dismiss")
-            time.sleep(1)
+            if settle_options["mode"] == "fixed":
+                time.sleep(settle_options["delay"])
 
         except Exception as e:
-            print(f"[ERROR] Step execution failed for step #{step.get('step_number')} (id: {step.get('id_uuid')}) with error: {e}")
+            logger.error("Step execution failed for step #%s (id: %s) with error: %s", step.get('step_number'), step.get('id_uuid'), e)
             recovery_choice = prompt_for_recovery(step)
             if recovery_choice == "replace":
                 delete_failed_step(step.get("id_uuid"))
@@ -180,6 +173,6 @@ def run_steps(steps_data, driver, start_step=1, form_id=None, form_name=None):
             elif recovery_choice == "update":
                 update_element_for_failed_step(step, driver)
             else:
-                print("[INFO] No recovery option chosen; skipping the step.")
+                logger.info("No recovery option chosen; skipping the step.")
 
-    print("[INFO] All steps completed successfully.")
+    logger.info("All steps completed successfully.")
@@ -0,0 +1,276 @@
+# E:\CRM\automation_project\step_execution_batch_runner.py
+"""
+Batch mode of the step execution: many execution inputs in one process.
+
+step_execution_main_runner.py runs one form per process, so the orchestrator paid
+for a fresh Python interpreter, every import and a new browser per application.
+This runner reads any number of execution inputs (the same JSON documents the
+main runner accepts: form, condition_context, steps, ...), runs them through the
+parallel runner with warm, reused browser sessions, and writes one result line
+per job to a JSONL file as soon as the job finishes.
+
+Usage:
+    python step_execution_batch_runner.py exec_dir/                   # every *.json in a directory
+    python step_execution_batch_runner.py "exec_data_*.json"          # a glob
+    python step_execution_batch_runner.py inputs.jsonl                # one execution input per line
+    cat inputs.jsonl | python step_execution_batch_runner.py -        # JSON lines on stdin
+
+Options:
+    --output=<path>        Result lines (default: batch_results.jsonl; "-" = stdout)
+    --workers=<n>          Concurrent browsers (default: one per core)
+    --mode=thread|process  Worker pool flavour (default: thread)
+    --profile=<name>       Execution profile (see steps_shares_browser_manager)
+    --browser=<backend>    firefox / chromium
+    --headed               Show the browsers (default: headless)
+    --no-reuse             Start and quit a browser per job
+    --max-jobs-per-session=<n>  Recycle a browser after n jobs (default: 50)
+    --debug                Capture debug artifacts for every job
+    --resume               Checkpoint every input and continue it after the last completed step
+                           of its checkpoint (checkpoints hold session cookies; see execution_checkpoints)
+    --console=<port>       Serve the operator console on 127.0.0.1:<port>; manual, safe and
+                           email-link steps then wait for it instead of opening Tk dialogs
+                           (thread mode only)
+
+Each result line holds: job_id, source, form_id, status, duration, steps_executed,
+failed_step, error, run_id, resumed_from, retries and the run's total time by phase. An input may carry
+its own "job_id", "start_step" and "checkpoint_key". Inputs that cannot be read get a "failed"
+line and do not stop the batch. The exit code is 0 when every job completed.
+"""
+
+import glob
+import json
+import os
+import sys
+import time
+
+from step_execution_selenium_flow.step_execution_parallel_runner import make_job, run_jobs_parallel, DEFAULT_MAX_WORKERS
+from step_execution_repositories.forms_json_repository import load_forms_and_steps_from_json
+from steps_shared_utils.debug_artifacts import flush_debug_artifacts
+from steps_shared_utils.human_tasks import start_operator_console
+
+from steps_shared_utils.run_logging import get_logger
+
+logger = get_logger("batch_runner")
+
+DEFAULT_OUTPUT = "batch_results.jsonl"
+
+
+def iter_execution_inputs(sources):
+    """
+    Yields (source, data) for every execution input found in 'sources', lazily:
+      - a directory   : every *.json file in it (sorted)
+      - a .jsonl file : one execution input per line ("<file>:<line>" as source)
+      - "-"           : JSON lines from stdin ("stdin:<line>")
+      - anything else : a file path or glob pattern of .json files
+    Unreadable inputs are yielded as (source, exception).
+    """
+    for source in sources:
+        if source == "-":
+            yield from _iter_json_lines(sys.stdin, "stdin")
+        elif os.path.isdir(source):
+            for path in sorted(glob.glob(os.path.join(source, "*.json"))):
+                yield from _load_json_file(path)
+        elif source.endswith(".jsonl") and os.path.isfile(source):
+            with open(source, "r", encoding="utf-8") as f:
+                yield from _iter_json_lines(f, source)
+        else:
+            paths = sorted(glob.glob(source))
+            if not paths:
+                yield source, FileNotFoundError(f"No execution input matches '{source}'.")
+            for path in paths:
+                if path.endswith(".jsonl"):
+                    with open(path, "r", encoding="utf-8") as f:
+                        yield from _iter_json_lines(f, path)
+                else:
+                    yield from _load_json_file(path)
+
+
+def _load_json_file(path):
+    try:
+        yield path, load_forms_and_steps_from_json(path)
+    except Exception as e:
+        yield path, e
+
+
+def _iter_json_lines(stream, name):
+    for line_number, line in enumerate(stream, start=1):
+        if not line.strip():
+            continue
+        try:
+            yield f"{name}:{line_number}", json.loads(line)
+        except ValueError as e:
+            yield f"{name}:{line_number}", e
+
+
+def _job_id_for(source, data, used_ids):
+    job_id = data.get("job_id") or os.path.splitext(os.path.basename(source))[0]
+    if job_id in used_ids:
+        job_id = f"{job_id}#{len(used_ids)}"
+    used_ids.add(job_id)
+    return job_id
+
+
+def build_jobs(sources, write_record, debug=None, resume=False):
+    """
+    Turns the execution inputs of 'sources' into parallel runner jobs (lazily).
+    Inputs that cannot be used are reported through write_record() right away.
+    Returns (jobs generator, job_id -> {"source", "form_id"} dict filled while iterating).
+    """
+    origins = {}
+    used_ids = set()
+
+    def generate():
+        for source, data in iter_execution_inputs(sources):
+            if isinstance(data, Exception) or not isinstance(data, dict):
+                error = data if isinstance(data, Exception) else ValueError("Execution input is not a JSON object.")
+                logger.error("Skipping '%s': %s", source, error)
+                write_record({
+                    "job_id": source, "source": source, "form_id": None, "status": "failed",
+                    "duration": 0.0, "steps_executed": 0, "failed_step": None,
+                    "error": f"{type(error).__name__}: {error}",
+                })
+                continue
+
+            form = data.get("form") or {}
+            job_id = _job_id_for(source, data, used_ids)
+            origins[job_id] = {"source": source, "form_id": form.get("id_uuid")}
+            yield make_job(
+                {"steps": data.get("steps", [])},
+                data.get("condition_context", {}),
+                job_id=job_id,
+                start_step=data.get("start_step", 1),
+                form=form,
+                debug=debug,
+                checkpoint_key=data.get("checkpoint_key"),
+                resume=resume,
+            )
+
+    return generate(), origins
+
+
+def result_line(record, origin):
+    """
+    The JSONL record of a finished job (the full timings are reduced to totals).
+    """
+    timings = record.get("timings") or {}
+    line = {
+        "job_id": record.get("job_id"),
+        "source": origin.get("source"),
+        "form_id": origin.get("form_id"),
+        "status": record.get("status"),
+        "duration": round(record.get("duration") or 0.0, 3),
+        "steps_executed": record.get("steps_executed", 0),
+        "failed_step": record.get("failed_step"),
+        "error": record.get("error"),
+        "run_id": record.get("run_id"),
+        "resumed_from": record.get("resumed_from"),
+        "retries": (record.get("retries") or {}).get("count", 0),
+    }
+    if timings:
+        line["total_seconds"] = timings.get("total_seconds")
+        line["by_phase"] = timings.get("by_phase")
+        line["timeout_seconds"] = (timings.get("timeouts") or {}).get("seconds")
+    return line
+
+
+def run_batch(sources, output=DEFAULT_OUTPUT, max_workers=None, mode="thread", headless=True,
+              reuse_browsers=True, max_jobs_per_session=50, profile=None, backend=None, debug=None, resume=False):
+    """
+    run_batch(sources, output=DEFAULT_OUTPUT, max_workers=None, mode="thread", headless=True,
+              reuse_browsers=True, max_jobs_per_session=50, profile=None, backend=None, debug=None, resume=False)
+
+    Runs every execution input of 'sources' (see iter_execution_inputs) and
+    appends one result line per job to 'output' ("-" = stdout).
+    Returns {"jobs": int, "completed": int, "failed": int, "duration": seconds}.
+    """
+    counts = {"jobs": 0, "completed": 0, "failed": 0}
+    out = sys.stdout if output == "-" else open(output, "a", encoding="utf-8")
+    start_time = time.monotonic()
+
+    def write_record(line):
+        counts["jobs"] += 1
+        counts["completed" if line["status"] == "completed" else "failed"] += 1
+        out.write(json.dumps(line, ensure_ascii=False, default=str) + "\n")
+        out.flush()
+
+    jobs, origins = build_jobs(sources, write_record, debug=debug, resume=resume)
+
+    def on_result(record):
+        origin = origins.pop(record.get("job_id"), {})
+        write_record(result_line(record, origin))
+        logger.info(
+            "Job '%s' %s in %.1fs (%s/%s done).", record.get("job_id"), record.get("status"),
+            record.get("duration") or 0.0, counts["jobs"], counts["jobs"] + len(origins),
+        )
+
+    try:
+        run_jobs_parallel(
+            jobs,
+            max_workers=max_workers,
+            mode=mode,
+            headless=headless,
+            on_result=on_result,
+            reuse_browsers=reuse_browsers,
+            max_jobs_per_session=max_jobs_per_session,
+            profile=profile,
+            backend=backend,
+        )
+    finally:
+        if out is not sys.stdout:
+            out.close()
+
+    counts["duration"] = time.monotonic() - start_time
+    logger.info(
+        "Batch finished: %s job(s), %s completed, %s failed in %.1fs.",
+        counts["jobs"], counts["completed"], counts["failed"], counts["duration"],
+    )
+    return counts
+
+
+def _get_option(args, name, default=None):
+    """
+    Returns the value of a "--name=value" option from 'args', or 'default'.
+    """
+    for arg in args:
+        if arg.startswith(name + "="):
+            return arg.split("=", 1)[1]
+    return default
+
+
+def main(argv=None):
+    args = sys.argv[1:] if argv is None else argv
+    sources = [arg for arg in args if arg == "-" or not arg.startswith("--")]
+    if not sources:
+        logger.error("Please provide a directory, glob, .jsonl file or '-' (JSON lines on stdin).")
+        return 2
+
+    console_port = _get_option(args, "--console")
+    mode = _get_option(args, "--mode", "thread")
+    if console_port and mode == "process":
+        # Worker processes have their own task queue, which the console cannot see.
+        logger.error("--console needs --mode=thread: the operator console only serves tasks of this process.")
+        return 2
+    console = start_operator_console(port=int(console_port)) if console_port else None
+    try:
+        summary = run_batch(
+            sources,
+            output=_get_option(args, "--output", DEFAULT_OUTPUT),
+            max_workers=int(_get_option(args, "--workers", DEFAULT_MAX_WORKERS)),
+            mode=mode,
+            headless="--headed" not in args,
+            reuse_browsers="--no-reuse" not in args,
+            max_jobs_per_session=int(_get_option(args, "--max-jobs-per-session", 50)),
+            profile=_get_option(args, "--profile"),
+            backend=_get_option(args, "--browser"),
+            debug=True if "--debug" in args else None,
+            resume="--resume" in args,
+        )
+    finally:
+        flush_debug_artifacts()
+        if console is not None:
+            console.shutdown()
+    return 0 if summary["failed"] == 0 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -16,31 +16,33 @@ import json
 
 # 3) Now we can import from steps_shared
 from step_execution_selenium_flow.step_execution_step_executor import run_steps_crm_format
+from step_execution_selenium_flow.step_execution_plan import build_execution_plan, describe_plan
 
 # LOAD A CUSTOM FUNCTION TO READ JSON FROM A FILE
 from step_execution_repositories.forms_json_repository import load_forms_and_steps_from_json
 
 # SELENIUM-SPECIFIC FUNCTIONS TO START/CLOSE THE BROWSER
-from steps_shared_utils.steps_shares_browser_manager import init_browser, close_browser
+from steps_shared_utils.steps_shares_browser_manager import init_browser, close_browser, get_execution_profile, BrowserStartError
+
+# DEBUG ARTIFACTS (OFF BY DEFAULT, WRITTEN IN THE BACKGROUND TO debug_runs/<run_id>/)
+from steps_shared_utils.debug_artifacts import debug_run, write_debug_artifact, flush_debug_artifacts
 
 import os
 import json
 
-print("[DEBUG] Python executable:", sys.executable)
-print("[DEBUG] PATH:", os.environ.get('PATH'))
+from steps_shared_utils.run_logging import get_logger
+
+logger = get_logger("main_runner")
+
+logger.debug("Python executable: %s", sys.executable)
+logger.debug("PATH: %s", os.environ.get('PATH'))
 
 def write_execution_input_debug(data):
     """
-    Writes the full received JSON (data) to a debug text file and opens it automatically.
+    Queues the full received JSON (data) as a debug artifact of the current run
+    (only when the run captures debug artifacts: --debug or STEP_DEBUG_ARTIFACTS=1).
     """
-    debug_file = os.path.join(os.path.dirname(__file__), "execution_input_debug.txt")
-    try:
-        with open(debug_file, "w", encoding="utf-8") as f:
-            f.write(json.dumps(data, indent=2))
-        # Automatically open the file (this works on Windows)
-        os.startfile(debug_file)
-    except Exception as e:
-        print(f"[ERROR] Could not write or open debug file: {e}")
+    write_debug_artifact("execution_input_debug.txt", lambda: json.dumps(data, indent=2))
 
 def main():
     """
@@ -51,12 +53,57 @@ def main():
 
     2) New style: python main_runner.py --stdin
        -> reads the JSON from sys.stdin, ignoring the old <form_id> approach
+
+    3) Dry run: add --plan to either style
+       -> prints the execution plan (steps to run, handlers, skipped steps)
+          without starting a browser
+
+    4) Debug artifacts: add --debug to either style
+       -> writes the input and condition traces to debug_runs/<run_id>/
+
+    5) Browser profile: add --profile=<name> to either style
+       -> "interactive" (visible window, the default), "production" (headless,
+          no images/fonts/media/animations, eager page loads) or "production_media".
+          Defaults to the form's "execution_profile", then STEP_BROWSER_PROFILE.
+          Forms with OCR/screenshot steps keep images.
+
+    6) Browser: add --browser=<firefox|chromium> to either style
+       -> defaults to the form's "browser_backend", then STEP_BROWSER_BACKEND (firefox).
+
+    7) Resume: add --resume to either style
+       -> restores the captured values, cookies, storage and page of the last
+          completed step (execution_checkpoints/, written after every step of a
+          run started with --resume, a "checkpoint_key" or STEP_CHECKPOINTS=1)
+          and continues from the next step instead of step 1.
+
+    Many inputs at once: use step_execution_batch_runner.py (one process,
+    reused browsers, configurable concurrency, JSONL results).
+    Jobs submitted from another program: run step_execution_service.py once
+    (resident daemon, POST /jobs over local HTTP, progress events, /metrics).
     """
+    with debug_run(enabled=True if "--debug" in sys.argv else None):
+        try:
+            _main()
+        finally:
+            flush_debug_artifacts()
 
+
+def _get_option(name):
+    """
+    Returns the value of a "--name=value" command-line option, or None.
+    (Only the "=" form, so the value is never taken for the positional form_id.)
+    """
+    for arg in sys.argv[1:]:
+        if arg.startswith(name + "="):
+            return arg.split("=", 1)[1]
+    return None
+
+
+def _main():
     # -----------------------------------------------------
     # PRINT INITIAL DEBUG MESSAGE
     # -----------------------------------------------------
-    print("[DEBUG] main_runner.py started.")
+    logger.debug("main_runner.py started.")
 
     # -----------------------------------------------------
     # CHECK COMMAND-LINE ARGUMENTS FOR --stdin
@@ -64,79 +111,106 @@ def main():
     # -----------------------------------------------------
     if "--stdin" in sys.argv:
         # A) Read JSON from stdin
-        print("[DEBUG] Reading JSON from stdin.")
+        logger.debug("Reading JSON from stdin.")
 
         # sys.stdin.read() blocks until EOF, so if running from
         # another script, make sure that script sends JSON data properly.
         raw_data = sys.stdin.read()
-        print(f"[DEBUG] Raw JSON from stdin => {raw_data[:200]}...")  # Show only first 200 chars
+        logger.debug("Raw JSON from stdin => %s...", raw_data[:200])  # Show only first 200 chars
 
         # ATTEMPT TO PARSE THE RAW JSON
         try:
             data = json.loads(raw_data)
         except Exception as e:
-            print(f"[ERROR] Failed to parse JSON from stdin: {e}")
+            logger.error("Failed to parse JSON from stdin: %s", e)
             sys.exit(1)
 
         # WE EXPECT THE DATA TO CONTAIN A "steps" KEY
         write_execution_input_debug(data)
         steps_data = {"steps": data.get("steps", [])}
-        print(f"[DEBUG] Loaded {len(steps_data['steps'])} steps from stdin data.")
+        logger.debug("Loaded %s steps from stdin data.", len(steps_data['steps']))
 
     else:
         # B) Fallback: old style reading from a file using <form_id>
-        if len(sys.argv) < 2:
-            print("[ERROR] Please provide a forms:id_uuid or use --stdin.")
+        positional_args = [arg for arg in sys.argv[1:] if not arg.startswith("--")]
+        if not positional_args:
+            logger.error("Please provide a forms:id_uuid or use --stdin.")
             sys.exit(1)
 
         # GRAB THE ARGUMENT AFTER python main_runner.py
-        chosen_form_id = sys.argv[1]
-        print(f"[DEBUG] Received form_id={chosen_form_id} from argument.")
+        chosen_form_id = positional_args[0]
+        logger.debug("Received form_id=%s from argument.", chosen_form_id)
 
         # BUILD THE JSON FILE NAME BASED ON THE ID
         json_path = f"exec_data_{chosen_form_id}.json"
-        print(f"[DEBUG] Loading steps from file: {json_path}")
+        logger.debug("Loading steps from file: %s", json_path)
 
         # ATTEMPT TO LOAD THE FILE USING OUR CUSTOM REPOSITORY FUNCTION
         try:
             data = load_forms_and_steps_from_json(json_path)
             write_execution_input_debug(data)
             steps_data = {"steps": data.get("steps", [])}
-            print(f"[DEBUG] Loaded {len(steps_data['steps'])} steps from {json_path}.")
+            logger.debug("Loaded %s steps from %s.", len(steps_data['steps']), json_path)
         except Exception as e:
-            print(f"[ERROR] Failed to load steps from '{json_path}': {e}")
+            logger.error("Failed to load steps from '%s': %s", json_path, e)
             sys.exit(1)
 
     # IF NO STEPS WERE FOUND, EXIT GRACEFULLY
     if not steps_data["steps"]:
-        print("[INFO] No steps found. Exiting.")
+        logger.info("No steps found. Exiting.")
         sys.exit(0)
 
+    # -----------------------------------------------------
+    # DRY RUN: PRINT THE EXECUTION PLAN AND STOP
+    # -----------------------------------------------------
+    if "--plan" in sys.argv:
+        plan = build_execution_plan(
+            steps_data,
+            data.get("condition_context", {}),
+            form=data.get("form"),
+            use_cache=False,
+        )
+        print(describe_plan(plan))
+        return
+
     # -----------------------------------------------------
     # 3) INITIALIZE THE SELENIUM BROWSER
     # -----------------------------------------------------
-    print("[DEBUG] Initializing Selenium browser...")
-    driver = init_browser(headless=False)
+    profile = get_execution_profile(
+        _get_option("--profile"), steps_data["steps"], data.get("form"), backend=_get_option("--browser")
+    )
+    logger.debug("Initializing Selenium browser (%s) with profile '%s'...", profile['backend'], profile['name'])
+    try:
+        driver = init_browser(profile=profile)
+    except BrowserStartError:
+        sys.exit(1)
 
     try:
         # -----------------------------------------------------
         # 4) EXECUTE THE STEPS
         # -----------------------------------------------------
-        print("[DEBUG] Running steps now...")
+        logger.debug("Running steps now...")
         # run_steps_crm_format() presumably iterates over steps_data["steps"] and uses
         # the driver to interact with a webpage.
-        run_steps_crm_format(steps_data, driver=driver, condition_context=data.get("condition_context", {}))
-
-        print("[INFO] Steps execution completed successfully.")
+        run_steps_crm_format(
+            steps_data,
+            driver=driver,
+            condition_context=data.get("condition_context", {}),
+            form=data.get("form"),
+            checkpoint_key=data.get("checkpoint_key"),
+            resume="--resume" in sys.argv,
+        )
+
+        logger.info("Steps execution completed successfully.")
     finally:
         # -----------------------------------------------------
         # 5) CLOSE THE BROWSER (ALWAYS EXECUTES VIA `finally`)
         # -----------------------------------------------------
-        print("[DEBUG] Closing the browser.")
+        logger.debug("Closing the browser.")
         close_browser(driver)
 
     # FINAL DEBUG STATEMENT
-    print("[DEBUG] main_runner.py finished.")
+    logger.debug("main_runner.py finished.")
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,370 @@
+# E:\CRM\automation_project\step_execution_selenium_flow\step_execution_parallel_runner.py
+"""
+Worker-pool execution mode for run_steps_crm_format.
+
+run_steps_crm_format drives exactly one browser through one form. This module
+accepts many (steps_data, condition_context) jobs and runs them across N isolated
+WebDriver sessions at the same time, returning one result record per job.
+
+Two pool flavours are available:
+  - "thread"  : every worker is a thread in this process (cheap to start; the
+                browser does the heavy lifting in its own process anyway).
+  - "process" : every worker is a separate Python process (full isolation of
+                module-level state, at the cost of importing everything per worker).
+
+With reuse_browsers=True (the default) browser sessions are taken from a warm
+BrowserPool and reset between jobs instead of being started and quit per job.
+"""
+
+import os
+import threading
+import time
+import uuid
+from functools import partial
+from multiprocessing.util import Finalize
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, wait, FIRST_COMPLETED
+
+from step_execution_selenium_flow.step_execution_step_executor import run_steps_crm_format
+from steps_shared_utils.steps_shares_browser_manager import (
+    init_browser, close_browser, BrowserPool, SessionLimit, get_execution_profile,
+)
+from steps_shared_utils.execution_context import reset_execution_context
+from steps_shared_utils.human_tasks import reset_for_worker_process
+
+from steps_shared_utils.run_logging import get_logger, log_context
+
+logger = get_logger(__name__)
+
+# A browser session needs roughly one core while a page loads, so by default
+# we run one worker per core and let the caller raise/lower it per machine.
+DEFAULT_MAX_WORKERS = os.cpu_count() or 1
+
+# In "process" mode every worker process keeps its own single-session pool
+# per execution profile and backend; together they keep one session alive.
+_PROCESS_POOLS = {}
+_PROCESS_LIMIT = SessionLimit(1)
+
+
+def _pool_key(profile):
+    return (profile["name"], profile["backend"]) if profile else None
+
+
+def _get_process_pool(headless, profile=None):
+    """
+    Returns this process's BrowserPool for 'profile', creating it on first use.
+    The pool is closed when the worker process shuts down.
+    """
+    name = _pool_key(profile)
+    pool = _PROCESS_POOLS.get(name)
+    if pool is None:
+        pool = BrowserPool(size=1, headless=headless, prelaunch=False, profile=profile, limit=_PROCESS_LIMIT)
+        _PROCESS_POOLS[name] = pool
+        # Worker processes exit without running atexit hooks; Finalize is honoured.
+        Finalize(None, pool.close, exitpriority=10)
+    return pool
+
+
+class ProfilePools:
+    """
+    One BrowserPool per execution profile and browser backend, so that jobs of
+    forms needing images (OCR, screenshots) and jobs of trimmed forms each reuse
+    a matching session.
+    Pools other than the first one are started lazily. All pools together keep
+    at most 'size' sessions alive (a SessionLimit): a pool needing a session
+    while the limit is reached quits an idle session of another pool.
+    """
+
+    def __init__(self, size, headless=True, max_jobs_per_session=50, max_memory_mb=None):
+        self.size = size
+        self.headless = headless
+        self.max_jobs_per_session = max_jobs_per_session
+        self.max_memory_mb = max_memory_mb
+        self.limit = SessionLimit(size)
+        self._pools = {}
+        self._lock = threading.Lock()
+
+    def for_profile(self, profile):
+        name = _pool_key(profile)
+        with self._lock:
+            pool = self._pools.get(name)
+            if pool is None:
+                pool = BrowserPool(
+                    size=self.size,
+                    headless=self.headless,
+                    max_jobs_per_session=self.max_jobs_per_session,
+                    max_memory_mb=self.max_memory_mb,
+                    prelaunch=not self._pools,
+                    profile=profile,
+                    limit=self.limit,
+                )
+                self._pools[name] = pool
+            return pool
+
+    def resize(self, size):
+        """
+        Changes the size of every pool (and of pools started later) and of
+        their shared limit.
+        """
+        with self._lock:
+            self.size = size
+            self.limit.size = max(1, size)
+            for pool in self._pools.values():
+                pool.resize(size)
+
+    def close(self):
+        with self._lock:
+            for pool in self._pools.values():
+                pool.close()
+            self._pools.clear()
+
+
+def make_job(steps_data, condition_context=None, job_id=None, start_step=1, form=None, debug=None,
+             checkpoint_key=None, resume=False):
+    """
+    Builds a job dict understood by run_jobs_parallel().
+
+      steps_data        : {"steps": [...]} exactly as run_steps_crm_format expects it.
+      condition_context : The flags used by step conditions (IS_MINOR_TRUE, ...).
+      job_id            : Optional identifier echoed back in the result record.
+      start_step        : Optional step_order to start from.
+      form              : Optional "form" dict of the execution input (id_uuid, form_name, ...).
+      debug             : Optional True/False to capture debug artifacts for this job.
+      checkpoint_key    : Optional name of the job's checkpoint (see execution_checkpoints.py).
+      resume            : Continue after the last completed step of the job's checkpoint.
+    """
+    return {
+        "job_id": job_id or str(uuid.uuid4()),
+        "steps_data": steps_data,
+        "condition_context": condition_context or {},
+        "start_step": start_step,
+        "form": form or {},
+        "debug": debug,
+        "checkpoint_key": checkpoint_key,
+        "resume": resume,
+    }
+
+
+def _normalize_job(job):
+    """
+    Accepts either a job dict (see make_job) or a (steps_data, condition_context) tuple.
+    """
+    if isinstance(job, dict) and "steps_data" in job:
+        return make_job(
+            job["steps_data"],
+            job.get("condition_context"),
+            job_id=job.get("job_id"),
+            start_step=job.get("start_step", 1),
+            form=job.get("form"),
+            debug=job.get("debug"),
+            checkpoint_key=job.get("checkpoint_key"),
+            resume=job.get("resume", False),
+        )
+    steps_data, condition_context = job
+    return make_job(steps_data, condition_context)
+
+
+def run_single_job(job, headless=True, pool=None, reuse_browser=False, profile=None, backend=None, on_event=None):
+    """
+    run_single_job(job, headless=True, pool=None, reuse_browser=False, profile=None, backend=None, on_event=None)
+
+    Runs one job in its own browser session and returns a result record:
+      {
+        "job_id": ..., "status": "completed" | "failed",
+        "steps_executed": int, "failed_step": step_order or None,
+        "error": str or None, "duration": seconds
+      }
+    Never raises: any failure (including browser start-up) ends up in the record.
+
+    The session comes from 'pool' when given; with reuse_browser=True (and no pool)
+    the per-process pool is used; otherwise a fresh browser is started and quit.
+
+    The execution profile and browser backend are resolved for every job from
+    the form ("execution_profile", "browser_backend") and its steps: forms that
+    OCR or take screenshots keep their images. 'profile' and 'backend'
+    ("firefox", "chromium") override the form's values (see get_execution_profile).
+    With a ProfilePools as 'pool' the session comes from the matching pool.
+
+    'on_event' receives the run's progress events (see run_steps_crm_format).
+    """
+    job = _normalize_job(job)
+    record = {
+        "job_id": job["job_id"],
+        "status": "failed",
+        "steps_executed": 0,
+        "failed_step": None,
+        "error": None,
+        "duration": 0.0,
+    }
+    logger.debug("Job '%s' started.", job['job_id'])
+
+    # Values captured by a previous job on this worker must not leak into this one.
+    reset_execution_context()
+
+    # The form's own "execution_profile" and its steps (OCR, screenshots) decide
+    # the profile; 'profile' and 'backend' only override.
+    browser_profile = get_execution_profile(profile, job["steps_data"].get("steps"), job["form"], backend=backend)
+    if isinstance(pool, ProfilePools):
+        pool = pool.for_profile(browser_profile)
+    elif pool is None and reuse_browser:
+        pool = _get_process_pool(headless, browser_profile)
+
+    start_time = time.monotonic()
+    driver = None
+    crashed = False
+    # Tag every log record of this job with its id.
+    with log_context(job_id=job["job_id"]):
+        try:
+            driver = pool.acquire() if pool else init_browser(headless=headless, profile=browser_profile)
+            result = run_steps_crm_format(
+                job["steps_data"],
+                driver=driver,
+                start_step=job["start_step"],
+                condition_context=job["condition_context"],
+                form=job["form"],
+                debug=job["debug"],
+                on_event=on_event,
+                checkpoint_key=job["checkpoint_key"],
+                resume=job["resume"],
+            )
+            record.update(result or {})
+        except Exception as e:
+            # Includes BrowserStartError: inside a worker a browser that cannot
+            # start only fails this job, not the whole pool.
+            crashed = True
+            record["error"] = f"{type(e).__name__}: {e}"
+            logger.error("Job '%s' crashed: %s", job['job_id'], record['error'])
+        finally:
+            if driver is not None:
+                if pool:
+                    # A crashed job may have left the session in an unknown state.
+                    pool.release(driver, discard=crashed)
+                else:
+                    close_browser(driver)
+            record["duration"] = time.monotonic() - start_time
+
+    logger.debug("Job '%s' finished with status '%s' in %.2fs.", job['job_id'], record['status'], record['duration'])
+    return record
+
+
+def run_jobs_parallel(jobs, max_workers=None, mode="thread", headless=True, on_result=None,
+                      reuse_browsers=True, max_jobs_per_session=50, max_memory_mb=None, profile=None,
+                      backend=None):
+    """
+    run_jobs_parallel(jobs, max_workers=None, mode="thread", headless=True, on_result=None,
+                      reuse_browsers=True, max_jobs_per_session=50, max_memory_mb=None, profile=None,
+                      backend=None)
+
+    Runs every job from 'jobs' with at most 'max_workers' browsers alive at once.
+
+    Parameters:
+      jobs        : Any iterable (list, generator draining a queue, ...) of job dicts
+                    from make_job() or (steps_data, condition_context) tuples.
+                    It is consumed lazily, so only a bounded number of jobs is
+                    held in memory at any time.
+      max_workers : Number of concurrent WebDriver sessions (default: one per core).
+      mode        : "thread" or "process" (see module docstring).
+      headless    : Passed to init_browser for every session.
+      on_result   : Optional callable invoked with each result record as soon as
+                    the job finishes (e.g. to stream results to a file).
+      reuse_browsers       : Keep warm browser sessions and reset them between jobs.
+      max_jobs_per_session : (thread mode) Recycle a session after this many jobs.
+      max_memory_mb        : (thread mode) Recycle a session above this memory use.
+      profile     : Optional execution profile name ("production", ...) overriding
+                    the forms' own; the profile is resolved per job either way
+                    (see get_execution_profile).
+      backend     : Optional browser backend ("firefox", "chromium") overriding the
+                    forms' "browser_backend".
+
+    Returns:
+      The list of result records, in the same order as the jobs were supplied.
+    """
+    max_workers = max_workers or DEFAULT_MAX_WORKERS
+    if mode == "thread":
+        executor_cls = ThreadPoolExecutor
+    elif mode == "process":
+        executor_cls = ProcessPoolExecutor
+    else:
+        raise ValueError(f"Unsupported parallel mode: {mode}")
+
+    logger.debug("Starting %s pool with max_workers=%s, headless=%s.", mode, max_workers, headless)
+
+    pool = None
+    if reuse_browsers and mode == "thread":
+        pool = ProfilePools(
+            size=max_workers,
+            headless=headless,
+            max_jobs_per_session=max_jobs_per_session,
+            max_memory_mb=max_memory_mb,
+        )
+        worker_fn = partial(run_single_job, headless=headless, pool=pool, profile=profile, backend=backend)
+    else:
+        worker_fn = partial(run_single_job, headless=headless, reuse_browser=reuse_browsers, profile=profile, backend=backend)
+
+    results = {}
+    job_iter = iter(jobs)
+
+    # Worker processes must not inherit the parent's human-task queue: no
+    # console serves it there.
+    executor_kwargs = {"initializer": reset_for_worker_process} if mode == "process" else {}
+
+    try:
+        with executor_cls(max_workers=max_workers, **executor_kwargs) as executor:
+            _drain_jobs(executor, worker_fn, job_iter, max_workers, results, on_result)
+    finally:
+        if pool:
+            pool.close()
+
+    logger.debug("All %s job(s) finished.", len(results))
+    return [results[i] for i in range(len(results))]
+
+
+def _failed_record(job_id, error):
+    return {
+        "job_id": job_id, "status": "failed", "steps_executed": 0,
+        "failed_step": None, "error": f"{type(error).__name__}: {error}", "duration": 0.0,
+    }
+
+
+def _drain_jobs(executor, worker_fn, job_iter, max_workers, results, on_result):
+    """
+    Submits jobs to 'executor' with bounded look-ahead and collects their records
+    into 'results' (index -> record). A job that cannot be read (malformed entry,
+    failing generator) gets a failed record; the rest of the batch still runs.
+    """
+    in_flight = {}
+    index = 0
+    while True:
+        # Keep the pool busy, but never queue more than one extra job per worker.
+        while len(in_flight) < max_workers * 2:
+            raw = None
+            try:
+                raw = next(job_iter)
+                job = _normalize_job(raw)
+            except StopIteration:
+                break
+            except Exception as e:
+                job_id = (raw.get("job_id") if isinstance(raw, dict) else None) or str(uuid.uuid4())
+                logger.error("Job #%s is malformed and was skipped: %s", index + 1, e)
+                record = _failed_record(job_id, e)
+                results[index] = record
+                index += 1
+                if on_result:
+                    on_result(record)
+                continue
+            in_flight[executor.submit(worker_fn, job)] = (index, job)
+            index += 1
+
+        if not in_flight:
+            break
+
+        done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+        for future in done:
+            job_index, job = in_flight.pop(future)
+            try:
+                record = future.result()
+            except Exception as e:
+                # Only reachable when the worker itself died (e.g. a killed process).
+                record = _failed_record(job["job_id"], e)
+            results[job_index] = record
+            if on_result:
+                on_result(record)
@@ -0,0 +1,240 @@
+# E:\CRM\automation_project\step_execution_selenium_flow\step_execution_plan.py
+"""
+Planning phase for run_steps_crm_format.
+
+condition_context is fixed for a run, so everything the executor used to decide
+per step inside the loop can be decided once, before the first step:
+which steps pass their condition, which handler runs them, the normalized
+selector, the fallback selector candidates, the wait budget and the settle options.
+
+The result is an immutable ExecutionPlan. Plans are cached per
+(form id, condition_context signature, steps fingerprint, start_step). The
+fingerprint ignores the per-client values (client_value), so many clients with
+identical flags on the same form share one plan; each run only binds its own
+step dicts and values to it. A dry run (describe_plan) costs no browser at all.
+"""
+
+import hashlib
+import json
+import threading
+from collections import OrderedDict, namedtuple
+
+from steps_shared_actions.handle_unknown_action import handle_unknown_action
+from steps_shared_utils.steps_shared_actions_registry import ACTION_HANDLERS
+from steps_shared_utils.condition_engine import ConditionEvaluator
+from steps_shared_utils.element_utils import build_selector_candidates, get_step_element_attributes
+from steps_shared_utils.wait_helpers import get_settle_options
+
+from steps_shared_utils.run_logging import get_logger
+
+logger = get_logger(__name__)
+
+# Upper bound of the adaptive wait before a step; the step's latency histogram may lower it.
+DEFAULT_WAIT_BUDGET = 5.0
+
+# Number of plans kept in memory.
+PLAN_CACHE_SIZE = 64
+
+PlannedStep = namedtuple("PlannedStep", [
+    "step_index",          # position in steps_data["steps"]
+    "step_order",          # int
+    "step_id",             # id_uuid or None
+    "action_name",         # action_type
+    "handler",             # bound action function
+    "selector_type",       # lower-case, default "xpath"
+    "selector_value",      # str ("" for steps without a target element)
+    "step_value",          # client_value / insert_value (bound per run)
+    "condition",           # the raw condition (already evaluated to True)
+    "fallback_selectors",  # tuple of (selector_type, selector_value) derived from element_attributes
+    "wait_budget",         # seconds (0.0 = no adaptive wait)
+    "settle_options",      # see wait_helpers.get_settle_options
+    "step",                # the run's step dict, passed to the handler (bound per run)
+])
+
+ExecutionPlan = namedtuple("ExecutionPlan", [
+    "form_id",
+    "context_signature",
+    "start_step",
+    "steps",    # tuple of PlannedStep, in execution order
+    "skipped",  # tuple of (step_order, reason)
+])
+
+_PLAN_CACHE = OrderedDict()
+_PLAN_CACHE_LOCK = threading.Lock()
+
+
+def context_signature(condition_context):
+    """
+    Returns a stable, hashable signature of a condition_context.
+    """
+    return json.dumps(condition_context or {}, sort_keys=True, default=str)
+
+
+# Per-client fields that do not change the plan's structure.
+_CLIENT_FIELDS = ("client_value",)
+
+
+def steps_fingerprint(steps):
+    """
+    Hash of the step list without per-client values, so a plan is never reused
+    after the form's steps changed, but is shared between clients.
+    """
+    structural = [
+        {k: v for k, v in step.items() if k not in _CLIENT_FIELDS}
+        for step in steps
+    ]
+    raw = json.dumps(structural, sort_keys=True, default=str).encode("utf-8")
+    return hashlib.sha1(raw).hexdigest()
+
+
+def _step_value(step):
+    return step.get("client_value") or step.get("insert_value") or ""
+
+
+def _bind(plan, steps):
+    """
+    Returns 'plan' with every PlannedStep pointing at this run's step dicts and values.
+    """
+    return plan._replace(steps=tuple(
+        planned._replace(step=steps[planned.step_index], step_value=_step_value(steps[planned.step_index]))
+        for planned in plan.steps
+    ))
+
+
+def _plan_step(step_index, step):
+    """
+    Builds the PlannedStep for a step whose condition passed.
+    """
+    action_name = step.get("action_type")
+    selector_type = (step.get("selector_type") or "xpath").lower()
+    selector_value = step.get("selector_value", "") or ""
+    step_id = step.get("id_uuid")
+
+    fallback_selectors = ()
+    if selector_value:
+        candidates = build_selector_candidates(
+            selector_type, selector_value, extracted_info=get_step_element_attributes(step)
+        )
+        fallback_selectors = tuple(tuple(candidate) for candidate in candidates[1:])
+
+    return PlannedStep(
+        step_index=step_index,
+        step_order=step.get("step_order", 1),
+        step_id=step_id,
+        action_name=action_name,
+        handler=ACTION_HANDLERS.get(action_name, handle_unknown_action),
+        selector_type=selector_type,
+        selector_value=selector_value,
+        step_value=_step_value(step),
+        condition=step.get("condition", ""),
+        fallback_selectors=fallback_selectors,
+        wait_budget=DEFAULT_WAIT_BUDGET if step_id and selector_value else 0.0,
+        settle_options=get_settle_options(step),
+        step=step,
+    )
+
+
+def build_execution_plan(steps_data, condition_context=None, form=None, start_step=1, condition_fn=None, use_cache=True):
+    """
+    build_execution_plan(steps_data, condition_context=None, form=None, start_step=1, condition_fn=None, use_cache=True)
+
+    Returns the (cached) ExecutionPlan for steps_data["steps"] under condition_context.
+
+    Parameters:
+      steps_data        : {"steps": [...]} as passed to run_steps_crm_format.
+      condition_context : The flags used by step conditions.
+      form              : Optional "form" dict of the execution input (its id_uuid keys the cache).
+      start_step        : Steps with a lower step_order are left out of the plan.
+      condition_fn      : Optional callable(condition) -> bool used instead of a
+                          fresh ConditionEvaluator (e.g. the executor's debug-aware one).
+      use_cache         : False evaluates every condition again even if a cached plan
+                          exists (debug runs and --plan, whose condition traces would
+                          otherwise be missing); the new plan still replaces the cached one.
+    """
+    steps = steps_data.get("steps", [])
+    form_id = (form or {}).get("id_uuid")
+    signature = context_signature(condition_context)
+    key = (form_id, signature, steps_fingerprint(steps), start_step)
+
+    if use_cache:
+        with _PLAN_CACHE_LOCK:
+            plan = _PLAN_CACHE.get(key)
+            if plan is not None:
+                _PLAN_CACHE.move_to_end(key)
+                logger.debug("Reusing cached plan (%s step(s)) for form '%s'.", len(plan.steps), form_id)
+                return _bind(plan, steps)
+
+    if condition_fn is None:
+        condition_fn = ConditionEvaluator(condition_context).evaluate
+
+    selected = []
+    skipped = []
+    for step_index, step in enumerate(steps):
+        step_number = step.get("step_order", 1)
+        if step_number < start_step:
+            continue
+
+        condition = step.get("condition", "")
+        if not condition_fn(condition):
+            logger.debug("Skipping step #%s due to condition='%s'", step_number, condition)
+            skipped.append((step_number, f"condition '{condition}' is false"))
+            continue
+
+        if not step.get("action_type"):
+            logger.warning("Step #%s has no action_type. Skipping.", step_number)
+            skipped.append((step_number, "no action_type"))
+            continue
+
+        selected.append((step_index, step))
+
+    # Import the handlers this plan needs (the registry is lazy) before the first
+    # step runs, so a missing dependency fails the run here and not mid-form.
+    failed = ACTION_HANDLERS.prewarm({step.get("action_type") for _, step in selected})
+    if failed:
+        raise ImportError(f"Could not load the handler(s) of action(s): {', '.join(sorted(failed))}")
+    planned = [_plan_step(step_index, step) for step_index, step in selected]
+
+    plan = ExecutionPlan(
+        form_id=form_id,
+        context_signature=signature,
+        start_step=start_step,
+        steps=tuple(planned),
+        skipped=tuple(skipped),
+    )
+
+    with _PLAN_CACHE_LOCK:
+        _PLAN_CACHE[key] = plan
+        if len(_PLAN_CACHE) > PLAN_CACHE_SIZE:
+            _PLAN_CACHE.popitem(last=False)
+
+    logger.debug("Planned %s step(s), skipped %s for form '%s'.", len(plan.steps), len(plan.skipped), form_id)
+    return plan
+
+
+def clear_plan_cache():
+    with _PLAN_CACHE_LOCK:
+        _PLAN_CACHE.clear()
+
+
+def describe_plan(plan):
+    """
+    Returns a human-readable description of a plan (used by the --plan dry run).
+    """
+    lines = [
+        f"Execution plan for form '{plan.form_id}' (start_step={plan.start_step})",
+        f"Condition context: {plan.context_signature}",
+        f"{len(plan.steps)} step(s) to run, {len(plan.skipped)} skipped:",
+    ]
+    for planned in plan.steps:
+        handler_name = getattr(planned.handler, "__name__", repr(planned.handler))
+        line = f"  #{planned.step_order:<4} {planned.action_name:<28} -> {handler_name}"
+        if planned.selector_value:
+            line += f"  [{planned.selector_type}] {planned.selector_value}"
+        if planned.step_value:
+            line += f"  value='{planned.step_value}'"
+        lines.append(line)
+        if planned.fallback_selectors:
+            lines.append(f"         {len(planned.fallback_selectors)} fallback selector(s), wait budget {planned.wait_budget:.1f}s")
+    for step_order, reason in plan.skipped:
+        lines.append(f"  #{step_order:<4} skipped: {reason}")
+    return "\n".join(lines)
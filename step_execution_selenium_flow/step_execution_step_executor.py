@@ -1,135 +1,66 @@
 # E:\CRM\automation_project\step_execution_selenium_flow\step_execution_step_executor.py
 
 import time
-from selenium.webdriver.common.by import By
-import os
 import json
 
 
 # Example imports for your action functions
-from steps_shared_actions import handle_unknown_action
 from steps_shared_actions.alert_handler import handle_unexpected_alerts
-from steps_shared_utils.steps_shared_actions_registry import ACTION_HANDLERS
-from steps_shared_utils.steps_shared_conditions_registry import CONDITION_EXPRESSIONS
+from steps_shared_utils.condition_engine import ConditionEvaluator
+from steps_shared_utils.debug_artifacts import debug_run, debug_enabled, write_debug_artifact
 
 # Import the adaptive wait function
-from steps_shared_utils.adaptive_wait import adaptive_wait_for_action
-
-def evaluate_condition(expr_key, condition_context):
+from steps_shared_utils.adaptive_wait import adaptive_wait_for_action, build_readiness_probe
+from steps_shared_utils.wait_helpers import arm_settle, settle_after_action
+from steps_shared_utils.step_wait_config import flush_wait_stats
+from steps_shared_utils.element_utils import set_active_step, clear_active_step
+from steps_shared_utils.selector_cache import get_selector_cache, flush_selector_cache
+from step_execution_selenium_flow.step_execution_plan import build_execution_plan
+from steps_shared_utils.step_timing import timing_run, timed_span, current_timings, format_summary, export_summary
+from steps_shared_utils.execution_checkpoints import (
+    CHECKPOINTS_ENABLED, CheckpointRecorder, checkpoint_key as make_checkpoint_key, input_fingerprint,
+    load_checkpoint, prepare_resume,
+)
+from steps_shared_utils.retry_policy import retry_budget_run, retry_call, handler_retry_classes
+from steps_shared_utils.steps_shares_browser_manager import note_visited_origin
+
+from steps_shared_utils.run_logging import get_logger, log_context, new_run_id, is_debug_form
+
+logger = get_logger(__name__)
+
+def evaluate_condition(expr_key, condition_context, evaluator=None):
     """
     Evaluates the condition for a step using the provided condition_context.
-    Logs detailed debug information to a file only if a condition is present,
-    otherwise prints a minimal debug message.
+
+    Registry expressions are compiled once and results are memoized per run by
+    the ConditionEvaluator (pass the run's evaluator; a throwaway one is created
+    otherwise). Detailed debug information is only built when the run captures
+    debug artifacts (see debug_artifacts.py) and a condition is present.
     
     If expr_key is a string that looks like a JSON list, it will parse it.
     """
+    if evaluator is None:
+        evaluator = ConditionEvaluator(condition_context)
+
+    if not expr_key or not debug_enabled():
+        return evaluator.evaluate(expr_key)
+
     debug_lines = []
     debug_lines.append("=== FULL DEBUG START ===")
     debug_lines.append("Timestamp: " + time.strftime("%Y-%m-%d %H:%M:%S"))
     debug_lines.append("Received expr_key (type: {}): {}".format(type(expr_key), expr_key))
     debug_lines.append("Received condition_context (type: {}):".format(type(condition_context)))
     debug_lines.append(json.dumps(condition_context, indent=2))
-    
-    # If no condition is provided, log minimal info to console and return True.
-    if not expr_key:
-        print("\n".join(debug_lines))
-        print("No condition provided. Returning True.")
-        return True
-
-    # Try to parse if expr_key is a string that represents a list.
-    if isinstance(expr_key, str):
-        expr_key_stripped = expr_key.strip()
-        if expr_key_stripped.startswith('[') and expr_key_stripped.endswith(']'):
-            try:
-                parsed = json.loads(expr_key_stripped)
-                debug_lines.append("Parsed expr_key into list: {}".format(parsed))
-                expr_key = parsed
-            except Exception as e:
-                debug_lines.append("[WARNING] Could not parse expr_key as a list: {}".format(e))
-    
-    # If a list of conditions is provided, evaluate all (logical AND).
-    if isinstance(expr_key, list):
-        debug_lines.append("Condition is a list. Evaluating each condition (logical AND).")
-        for key in expr_key:
-            if not isinstance(key, str) or not key.strip():
-                debug_lines.append("Skipping invalid condition key: {}".format(key))
-                continue
-            expr_code = CONDITION_EXPRESSIONS.get(key, "")
-            debug_lines.append("Evaluating key: '{}' -> Expression: '{}'".format(key, expr_code))
-            if not expr_code:
-                debug_lines.append("[WARNING] Condition key '{}' not found in registry. Returning False.".format(key))
-                write_and_open_debug_con(debug_lines)
-                return False
-            local_vars = dict(condition_context)
-            try:
-                result = bool(eval(expr_code, {"__builtins__": {}}, local_vars))
-                debug_lines.append("Result of '{}' with context {}: {}".format(expr_code, local_vars, result))
-                if not result:
-                    debug_lines.append("One condition evaluated to False. Returning False.")
-                    write_and_open_debug_con(debug_lines)
-                    return False
-            except Exception as e:
-                debug_lines.append("[WARNING] Could not eval condition '{}' from key '{}': {}".format(expr_code, key, e))
-                write_and_open_debug_con(debug_lines)
-                return False
-        debug_lines.append("All conditions in the list evaluated to True. Returning True.")
-        write_and_open_debug_con(debug_lines)
-        return True
-
-    # Otherwise, if a single string condition is provided.
-    if not isinstance(expr_key, str) or not expr_key.strip():
-        print("expr_key is not a valid non-empty string. Returning True.")
-        return True
-
-    expr_code = CONDITION_EXPRESSIONS.get(expr_key, "")
-    debug_lines.append("Single condition. Key: '{}' -> Expression: '{}'".format(expr_key, expr_code))
-    if not expr_code:
-        debug_lines.append("[WARNING] Condition key '{}' not found in registry. Returning False.".format(expr_key))
-        write_and_open_debug_con(debug_lines)
-        return False
-
-    local_vars = dict(condition_context)
-    try:
-        result = bool(eval(expr_code, {"__builtins__": {}}, local_vars))
-        debug_lines.append("Result of '{}' with context {}: {}".format(expr_code, local_vars, result))
-        write_and_open_debug_con(debug_lines)
-        return result
-    except Exception as e:
-        debug_lines.append("[WARNING] Could not eval condition '{}' from key '{}': {}".format(expr_code, expr_key, e))
-        write_and_open_debug_con(debug_lines)
-        return False
-
-def write_and_open_debug_con(lines):
-    """
-    Writes the provided debug lines to 'evaluate_condition_debug.txt' and opens it automatically.
-    This function is only called if a condition is being evaluated.
-    """
-    debug_file = os.path.join(os.path.dirname(__file__), "evaluate_condition_debug.txt")
-    try:
-        with open(debug_file, "w", encoding="utf-8") as f:
-            f.write("\n".join(lines))
-        os.startfile(debug_file)
-    except Exception as e:
-        print(f"[ERROR] Could not write or open debug file: {e}")
-
 
+    result = evaluator.evaluate(expr_key, debug_lines)
+    write_debug_artifact("evaluate_condition_debug.txt", debug_lines, append=True)
+    return result
 
-def write_and_open_debug(lines, filename="run_steps_crm_format_debug.txt"):
-    """
-    Writes the provided debug lines to a file and opens it automatically.
+def run_steps_crm_format(steps_data, driver, start_step=1, condition_context=None, form=None, debug=None, on_event=None,
+                         checkpoint_key=None, resume=False):
     """
-    debug_file = os.path.join(os.path.dirname(__file__), filename)
-    try:
-        with open(debug_file, "w", encoding="utf-8") as f:
-            f.write("\n".join(lines))
-        # Automatically open the file (works on Windows)
-        os.startfile(debug_file)
-    except Exception as e:
-        print(f"[ERROR] Could not write or open debug file: {e}")
-
-def run_steps_crm_format(steps_data, driver, start_step=1, condition_context=None):
-    """
-    run_steps_crm_format(steps_data, driver, start_step=1, condition_context=None)
+    run_steps_crm_format(steps_data, driver, start_step=1, condition_context=None, form=None, debug=None, on_event=None,
+                         checkpoint_key=None, resume=False)
 
     Iterates over steps_data["steps"], each having DB-style fields:
       - step_order        (int)
@@ -139,103 +70,269 @@ def run_steps_crm_format(steps_data, driver, start_step=1, condition_context=Non
       - client_value / insert_value  (str)
       - condition         (str)  <-- new for conditional logic
       - id_uuid           (str)  <-- unique identifier for the step
+
+    'form' is the optional "form" dict of the execution input (id_uuid, form_name, ...);
+    it keys the adaptive wait statistics per form.
+
+    'debug' opts this run in (True) or out (False) of writing debug artifacts
+    (input dump, condition traces) to debug_runs/<run_id>/; None follows
+    STEP_DEBUG_ARTIFACTS (off by default).
+
+    'on_event' is an optional callable(event_dict) receiving progress events:
+      {"event": "run_started", "run_id", "form_id", "steps_planned", "steps_skipped", "start_step", "resumed"}
+      {"event": "step_started", "step_order", "step_id", "action"}
+      {"event": "step_finished", "step_order", "step_id", "action", "seconds"}
+      {"event": "step_failed", "step_order", "step_id", "action", "seconds", "error"}
+      {"event": "run_finished", "status", "steps_executed", "failed_step", "error", "seconds"}
+    Every event also carries "run_id" and "ts" (epoch seconds). A failing
+    callback is logged and never stops the run.
+
+    When 'checkpoint_key' or resume=True is given (or STEP_CHECKPOINTS=1), a
+    checkpoint is written after every completed step (see execution_checkpoints.py;
+    it holds the session cookies), under 'checkpoint_key' or a key derived from
+    the input. With resume=True a checkpoint of the same input restores the
+    captured values and the browser state, and the run continues after its last
+    completed step.
+
+    Transient errors (stale element, intercepted click, alert, timeout) are retried
+    by the retry policy (see retry_policy.py) with a jittered backoff within
+    per-class and per-run budgets: inside the actions around each interaction,
+    and by re-running the handler of single-interaction actions (goto, click, ...).
+
+    Returns a result dict:
+      {"status": "completed" | "failed", "steps_executed": int,
+       "failed_step": step_order or None, "error": str or None,
+       "resumed_from": step_order or None,
+       "retries": {"count", "seconds", "by_class", "exhausted"},
+       "run_id": str, "timings": see step_timing.RunTimings.summary()}
+    """
+    # Every log record of this run carries its run id (and form id); forms listed
+    # in STEP_DEBUG_FORMS log at DEBUG regardless of the global level.
+    run_id = new_run_id()
+    form_id = (form or {}).get("id_uuid")
+    with log_context(run_id=run_id, form_id=form_id, debug=is_debug_form(form) or None), \
+            debug_run(enabled=debug, run_id=run_id):
+        emit = _event_emitter(on_event, run_id)
+        with timing_run(run_id=run_id, form_id=form_id) as timings, retry_budget_run() as retry_budget:
+            run_result = _run_steps_crm_format(
+                steps_data, driver, start_step, condition_context, form, emit,
+                run_id=run_id, checkpoint_key=checkpoint_key, resume=resume,
+            )
+        run_result["retries"] = retry_budget.summary()
+
+        # Where the time went: per phase, per step, and lost to timeouts.
+        summary = timings.summary()
+        run_result["run_id"] = run_id
+        run_result["timings"] = summary
+        emit(
+            "run_finished", status=run_result["status"], steps_executed=run_result["steps_executed"],
+            failed_step=run_result["failed_step"], error=run_result["error"], seconds=summary["total_seconds"],
+        )
+        logger.info("%s", format_summary(summary))
+        export_summary(summary)
+        write_debug_artifact("step_timings.json", lambda: json.dumps(summary, indent=2))
+        return run_result
+
+
+def _event_emitter(on_event, run_id):
+    """
+    Returns emit(event, **fields) that forwards progress events to on_event (if any).
     """
+    def emit(event, **fields):
+        if on_event is None:
+            return
+        fields.update(event=event, run_id=run_id, ts=time.time())
+        try:
+            on_event(fields)
+        except Exception as e:
+            logger.warning("on_event callback failed for '%s': %s", event, e)
+    return emit
+
+
+def _run_steps_crm_format(steps_data, driver, start_step, condition_context, form, emit,
+                          run_id=None, checkpoint_key=None, resume=False):
     if condition_context is None:
         condition_context = {}
+    form = form or {}
+    form_id = form.get("id_uuid")
+    form_name = form.get("form_name")
+    condition_evaluator = ConditionEvaluator(condition_context)
 
+    # Debug output for all received data (only built when the run captures artifacts)
+    write_debug_artifact("run_steps_crm_format_debug.txt", lambda: [
+        "=== run_steps_crm_format DEBUG START ===",
+        "Timestamp: " + time.strftime("%Y-%m-%d %H:%M:%S"),
+        "Received steps_data:",
+        json.dumps(steps_data, indent=2),
+        "Received condition_context:",
+        json.dumps(condition_context, indent=2),
+    ])
 
 
-    # Build debug output for all received data
-    debug_lines = []
-    debug_lines.append("=== run_steps_crm_format DEBUG START ===")
-    debug_lines.append("Timestamp: " + time.strftime("%Y-%m-%d %H:%M:%S"))
-    debug_lines.append("Received steps_data:")
-    debug_lines.append(json.dumps(steps_data, indent=2))
-    debug_lines.append("Received condition_context:")
-    debug_lines.append(json.dumps(condition_context, indent=2))
-    write_and_open_debug(debug_lines)
+    logger.debug("run_steps_crm_format() called with %s steps.", len(steps_data.get('steps', [])))
 
-
-    print(f"[DEBUG] run_steps_crm_format() called with {len(steps_data.get('steps', []))} steps.")
+    # Result record returned to the caller (the parallel runner collects one per job).
+    run_result = {"status": "completed", "steps_executed": 0, "failed_step": None, "error": None, "resumed_from": None}
 
     steps_list = steps_data.get("steps", [])
     if not steps_list:
-        print("[INFO] No steps to execute.")
-        return
-
+        logger.info("No steps to execute.")
+        return run_result
+
+    checkpoints = None
+    previous = None
+    if CHECKPOINTS_ENABLED or checkpoint_key or resume:
+        fingerprint = input_fingerprint(steps_data, condition_context, form)
+        key = make_checkpoint_key(steps_data, condition_context, form, key=checkpoint_key)
+        previous = load_checkpoint(key, fingerprint) if resume else None
+        checkpoints = CheckpointRecorder(key, fingerprint, run_id=run_id, form_id=form_id, previous=previous)
+
+    step_number = None
     try:
-        for step in steps_list:
-            step_number = step.get("step_order", 1)
-            if step_number < start_step:
-                continue
-
-            # Evaluate condition if present
-            condition = step.get("condition", "")
-            condition_result = evaluate_condition(condition, condition_context)
-            if not condition_result:
-                print(f"[DEBUG] Skipping step #{step_number} due to condition='{condition}'")
-                continue
-
-            # Get action information
-            action_name = step.get("action_type", None)
-            if not action_name:
-                print(f"[WARNING] Step #{step_number} has no action_type. Skipping.")
-                continue
-
-            # Convert selector_type to lower-case if it exists; default to 'xpath'
-            selector_type = (step.get("selector_type") or "xpath").lower()
-            selector_value = step.get("selector_value", "")
-
-            # Determine the value for typing or visiting a URL
-            step_value = step.get("client_value") or step.get("insert_value") or ""
-            step_id = step.get("id_uuid")  # Unique identifier for this step
-
-            print(f"[DEBUG] Step #{step_number}: "
-                  f"Action='{action_name}', Selector='{selector_value}', Value='{step_value}', "
-                  f"Condition='{condition}' => PASSED.")
-
-            # (1) Check for any leftover/unexpected alerts BEFORE the step
-            handle_unexpected_alerts(driver, action="dismiss")
-
-            # (2) Adaptive wait: if the step has a unique id, try to wait until the target element is available.
-            # Define a test function to check for element presence and basic clickability.
-            if step_id:
-                def test_action(drv):
-                    try:
-                        if selector_type == "xpath":
-                            elem = drv.find_element(By.XPATH, selector_value)
-                        else:
-                            elem = drv.find_element(By.CSS_SELECTOR, selector_value)
-                        # Basic test: element is displayed and enabled.
-                        return elem.is_displayed() and elem.is_enabled()
-                    except Exception as ex:
-                        return False
-
-                measured_wait = adaptive_wait_for_action(
-                    driver,
-                    action_test_fn=test_action,
-                    max_wait=5.0,       # Maximum wait time (adjust as needed)
-                    poll_interval=0.5,  # Poll every 0.5 seconds
-                    step_id=step_id,
-                    action_type=action_name
-                )
-                print(f"[DEBUG] Adaptive wait measured {measured_wait:.2f}s for step_id '{step_id}' and action '{action_name}'.")
-
-            # (3) Dispatch to the appropriate action function
-            action_func = ACTION_HANDLERS.get(action_name, handle_unknown_action)
-            action_func(driver, selector_type, selector_value, step_value, step)
+        # Resume: captured values and browser state of the last completed step.
+        if previous is not None:
+            with timed_span("restore"):
+                resume_step = prepare_resume(driver, steps_data, previous, start_step)
+            if resume_step is None:
+                logger.info("Every step was completed by an earlier run; nothing to resume.")
+                checkpoints.finish("completed")
+                return run_result
+            start_step = run_result["resumed_from"] = resume_step
+        elif resume:
+            logger.info("No checkpoint to resume; starting at step #%s.", start_step)
+
+        # Decide conditions, handlers, selectors and fallbacks for the whole form
+        # up front (cached per form and condition_context signature; debug runs
+        # re-evaluate the conditions so their traces are written).
+        with timed_span("plan"):
+            plan = build_execution_plan(
+                steps_data,
+                condition_context,
+                form=form,
+                start_step=start_step,
+                condition_fn=lambda condition: evaluate_condition(condition, condition_context, condition_evaluator),
+                use_cache=not debug_enabled(),
+            )
+
+        emit(
+            "run_started", form_id=form_id, steps_planned=len(plan.steps), steps_skipped=len(plan.skipped),
+            start_step=start_step, resumed=run_result["resumed_from"] is not None,
+        )
+
+        timings = current_timings()
+        for planned in plan.steps:
+            step_number = planned.step_order
+            step_fields = {"step_order": planned.step_order, "step_id": planned.step_id, "action": planned.action_name}
+            emit("step_started", **step_fields)
+            try:
+                with timings.step(planned.step_order, planned.step_id, planned.action_name) as step_timing:
+                    _execute_planned_step(driver, planned, form_id, form_name)
+            except Exception as e:
+                emit("step_failed", seconds=round(step_timing.duration, 4), error=str(e), **step_fields)
+                raise
+            emit("step_finished", seconds=round(step_timing.duration, 4), **step_fields)
+            run_result["steps_executed"] += 1
+            if checkpoints is not None:
+                with timed_span("checkpoint"):
+                    checkpoints.record_step(
+                        driver, planned.step_order, planned.step_id, planned.action_name, round(step_timing.duration, 4)
+                    )
+
+        logger.info("All steps completed successfully.")
 
-            # (4) Optional small delay after the action
-            time.sleep(1)
+    except Exception as e:
+        logger.error("An error occurred during step execution: %s", e)
+        run_result["status"] = "failed"
+        run_result["failed_step"] = step_number
+        run_result["error"] = str(e)
 
-            # (5) Check again for alerts triggered BY the step
-            handle_unexpected_alerts(driver, action="dismiss")
+    # Persist the wait and selector statistics gathered during this run in one batch.
+    with timed_span("flush"):
+        flush_wait_stats()
+        flush_selector_cache()
+        if checkpoints is not None:
+            checkpoints.finish(run_result["status"])
 
-            # (6) Another small delay if desired
-            time.sleep(1)
+    return run_result
 
-        print("[INFO] All steps completed successfully.")
 
-    except Exception as e:
-        print(f"[ERROR] An error occurred during step execution: {e}")
+def _execute_planned_step(driver, planned, form_id, form_name):
+    """
+    Runs one planned step: alert check, adaptive wait, action, settle, alert check.
+    Each phase is timed as a span of the current step (see step_timing.py).
+    """
+    step = planned.step
+    step_number = planned.step_order
+    action_name = planned.action_name
+    selector_type = planned.selector_type
+    selector_value = planned.selector_value
+    step_value = planned.step_value
+    step_id = planned.step_id
+
+    logger.debug("Step #%s: Action='%s', Selector='%s', Value='%s', Condition='%s' => PASSED.", step_number, action_name, selector_value, step_value, planned.condition)
+
+    # (1) Check for any leftover/unexpected alerts BEFORE the step
+    with timed_span("alert-check"):
+        handle_unexpected_alerts(driver, action="dismiss")
+
+    # (2) Adaptive wait: if the step has a unique id and a target element, wait until
+    # the element is displayed and enabled (single-round-trip JS probe).
+    # Steps without a selector (goto, manual, ...) have nothing to wait for.
+    # The probe uses the selector that resolved this step last time, so a
+    # stale primary selector does not cost a full timeout on every run.
+    if planned.wait_budget:
+        probe_type, probe_value = get_selector_cache().preferred_selector(step_id, selector_type, selector_value)
+        test_action = build_readiness_probe(probe_type, probe_value)
+
+        with timed_span("wait"):
+            measured_wait = adaptive_wait_for_action(
+                driver,
+                action_test_fn=test_action,
+                max_wait=planned.wait_budget,  # Upper bound; the step's latency histogram may lower it
+                poll_interval=0.5,  # Poll every 0.5 seconds
+                step_id=step_id,
+                action_type=action_name,
+                form_id=form_id,
+                form_name=form_name
+            )
+        logger.debug("Adaptive wait measured %.2fs for step_id '%s' and action '%s'.", measured_wait, step_id, action_name)
+
+    # (3) Dispatch to the appropriate action function
+    #     (find_element uses the active step for fallbacks and the selector cache;
+    #     its lookups are timed as "locate" spans inside "act"). Only handlers
+    #     that are safe to repeat are re-run on transient errors ("retry" spans).
+    settle_options = planned.settle_options
+    with timed_span("settle"):
+        arm_settle(driver, settle_options)
+    set_active_step(step, planned.fallback_selectors)
+    try:
+        with timed_span("act"):
+            retry_classes = handler_retry_classes(action_name)
+            if retry_classes:
+                retry_call(
+                    lambda: planned.handler(driver, selector_type, selector_value, step_value, step),
+                    driver=driver,
+                    action_name=action_name,
+                    retry_classes=retry_classes,
+                )
+            else:
+                planned.handler(driver, selector_type, selector_value, step_value, step)
+    finally:
+        clear_active_step()
+
+    # (4) Let the page settle after the action (DOM quiet, network idle,
+    #     no overlay; armed before the action), or the legacy fixed delay if the step asks for it
+    with timed_span("settle"):
+        settle_after_action(driver, settle_options)
+
+    # (5) Check again for alerts triggered BY the step, and remember the site the
+    #     step ended on (a pooled session is cleared for every visited site)
+    with timed_span("alert-check"):
+        handle_unexpected_alerts(driver, action="dismiss")
+        note_visited_origin(driver)
+
+    # (6) Legacy sites: second fixed delay after the alert check
+    if settle_options["mode"] == "fixed":
+        with timed_span("settle"):
+            time.sleep(settle_options["delay"])
 
@@ -0,0 +1,685 @@
+# E:\CRM\automation_project\step_execution_service.py
+"""
+Resident execution service: a local daemon that keeps Python, the imports and a
+pool of warm browsers alive between forms.
+
+step_execution_main_runner.py starts a new interpreter (and a new browser) for
+every form. This service accepts jobs over HTTP on 127.0.0.1 (or a Unix socket),
+queues them, runs them on pooled browser sessions and streams the step-level
+progress events back to the caller.
+
+Usage:
+    python step_execution_service.py
+    python step_execution_service.py --port=8770 --workers=4 --profile=production
+    python step_execution_service.py --socket=/run/step_service.sock
+
+Options (each also readable from the environment):
+    --host=<addr>          STEP_SERVICE_HOST         (default: 127.0.0.1)
+    --port=<n>             STEP_SERVICE_PORT         (default: 8770)
+    --socket=<path>        STEP_SERVICE_SOCKET       Listen on a Unix socket instead of TCP
+    --workers=<n>          STEP_SERVICE_WORKERS      Concurrent browsers (default: one per core)
+    --max-queue=<n>        STEP_SERVICE_MAX_QUEUE    Queued jobs before POST /jobs answers 503 (default: 100)
+    --retain=<n>           STEP_SERVICE_RETAIN_JOBS  Finished jobs kept for GET /jobs/<id> (default: 500)
+    --profile=<name>       Default execution profile (see steps_shares_browser_manager)
+    --browser=<backend>    Default browser backend (firefox / chromium)
+    --headed               Show the browsers (default: headless)
+    STEP_SERVICE_TOKEN     When set, every request must send "Authorization: Bearer <token>"
+                           (or "X-Step-Service-Token: <token>").
+
+Endpoints:
+    POST   /jobs               Body: one execution input (form, condition_context, steps; optional
+                               job_id, start_step, debug, profile, browser, checkpoint_key, and
+                               resume=true to continue after the input's last checkpointed step).
+                               202 {"job_id", "status": "queued", "queue_position"}; 503 when the queue is full.
+    GET    /jobs               Every retained job (without events).
+    GET    /jobs/<id>          Status of one job and, once finished, its result record.
+    GET    /jobs/<id>/events   Progress events. ?since=<n> skips the first n events, ?wait=<seconds>
+                               long-polls until a new event arrives; ?stream=1 streams the events
+                               as JSON lines until the job has finished.
+    DELETE /jobs/<id>          Cancels a job that is still queued (409 once it runs).
+    GET    /metrics            Queue depth, worker utilization and job counts (Prometheus text format).
+    GET    /health             {"status": "ok", ...}
+    GET    /console            Operator console for the human tasks of manual, safe and email-link
+                               steps (GET /tasks, POST /tasks/<id>; see steps_shared_utils.human_tasks).
+                               With a token, open it as /console?token=<token>.
+
+A job waiting for an operator does not hold up the others: its worker slot
+(and browser pool slot) is handed to an extra worker until the task is answered.
+Its event stream gets "human_task_posted" / "human_task_resolved" events.
+"""
+
+import hmac
+import json
+import os
+import signal
+import socket
+import socketserver
+import sys
+import threading
+import time
+import uuid
+from collections import OrderedDict, deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qs
+
+from step_execution_selenium_flow.step_execution_parallel_runner import (
+    make_job, run_single_job, ProfilePools, DEFAULT_MAX_WORKERS,
+)
+from steps_shared_utils.debug_artifacts import flush_debug_artifacts
+from steps_shared_utils.human_tasks import get_human_task_queue, handle_console_request
+
+from steps_shared_utils.run_logging import get_logger
+
+logger = get_logger("execution_service")
+
+DEFAULT_HOST = os.getenv("STEP_SERVICE_HOST", "127.0.0.1")
+DEFAULT_PORT = int(os.getenv("STEP_SERVICE_PORT", "8770"))
+DEFAULT_SOCKET = os.getenv("STEP_SERVICE_SOCKET")
+DEFAULT_WORKERS = int(os.getenv("STEP_SERVICE_WORKERS", DEFAULT_MAX_WORKERS))
+DEFAULT_MAX_QUEUE = int(os.getenv("STEP_SERVICE_MAX_QUEUE", "100"))
+DEFAULT_RETAIN_JOBS = int(os.getenv("STEP_SERVICE_RETAIN_JOBS", "500"))
+SERVICE_TOKEN = os.getenv("STEP_SERVICE_TOKEN")
+
+# Longest ?wait= a client may ask for on GET /jobs/<id>/events.
+MAX_LONG_POLL_SECONDS = 60.0
+
+# Largest accepted POST /jobs body.
+MAX_BODY_BYTES = 20 * 1024 * 1024
+
+FINISHED_STATUSES = ("completed", "failed", "cancelled")
+
+
+class QueueFull(Exception):
+    """Raised by ExecutionService.submit() when max_queue jobs are already waiting."""
+
+
+class ServiceJob:
+    """
+    One submitted job: its status, progress events and (once finished) result record.
+    """
+
+    def __init__(self, job, profile=None, backend=None):
+        self.job = job
+        self.job_id = job["job_id"]
+        self.profile = profile
+        self.backend = backend
+        self.status = "queued"
+        self.submitted_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.result = None
+        self.events = []
+        self.changed = threading.Condition()
+
+    @property
+    def finished(self):
+        return self.status in FINISHED_STATUSES
+
+    def add_event(self, event):
+        with self.changed:
+            self.events.append(event)
+            self.changed.notify_all()
+
+    def set_status(self, status, result=None):
+        with self.changed:
+            self.status = status
+            if status == "running":
+                self.started_at = time.time()
+            elif status in FINISHED_STATUSES:
+                self.finished_at = time.time()
+                self.result = result
+            self.changed.notify_all()
+
+    def wait_for_events(self, since, timeout):
+        """
+        Blocks until there are more than 'since' events, the job has finished or
+        'timeout' seconds passed. Returns (events after 'since', finished).
+        """
+        deadline = time.monotonic() + timeout
+        with self.changed:
+            while len(self.events) <= since and not self.finished:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self.changed.wait(remaining)
+            return self.events[since:], self.finished
+
+    def describe(self, queue_position=None):
+        with self.changed:
+            info = {
+                "job_id": self.job_id,
+                "status": self.status,
+                "form_id": (self.job.get("form") or {}).get("id_uuid"),
+                "submitted_at": self.submitted_at,
+                "started_at": self.started_at,
+                "finished_at": self.finished_at,
+                "events": len(self.events),
+            }
+            if queue_position is not None:
+                info["queue_position"] = queue_position
+            if self.result is not None:
+                info["result"] = self.result
+            return info
+
+
+class ExecutionService:
+    """
+    The job queue and the worker threads that run the jobs on pooled browsers.
+    """
+
+    def __init__(self, workers=DEFAULT_WORKERS, max_queue=DEFAULT_MAX_QUEUE, retain_jobs=DEFAULT_RETAIN_JOBS,
+                 headless=True, profile=None, backend=None, max_jobs_per_session=50, pools=None):
+        self.workers = max(1, int(workers))
+        self.max_queue = max_queue
+        self.retain_jobs = retain_jobs
+        self.headless = headless
+        self.profile = profile
+        self.backend = backend
+        self.pools = pools or ProfilePools(size=self.workers, headless=headless, max_jobs_per_session=max_jobs_per_session)
+        self.started = time.monotonic()
+        self._jobs = OrderedDict()
+        self._queue = deque()
+        self._lock = threading.Condition()
+        self._busy = 0
+        self._suspended = 0
+        self._busy_seconds = 0.0
+        self._totals = {status: 0 for status in FINISHED_STATUSES}
+        self._job_seconds = 0.0
+        self._stopping = False
+        self._threads = []
+        self._worker_number = 0
+
+    def start(self):
+        human_tasks = get_human_task_queue()
+        human_tasks.attach_console()
+        human_tasks.add_listener(self._on_human_task)
+        with self._lock:
+            for _ in range(self.workers):
+                self._start_worker()
+        logger.info("Execution service started with %s worker(s).", self.workers)
+
+    def _start_worker(self):
+        """
+        Starts one worker thread. Caller must hold the lock.
+        """
+        self._worker_number += 1
+        thread = threading.Thread(target=self._worker, name=f"step-service-worker-{self._worker_number}", daemon=True)
+        self._threads.append(thread)
+        thread.start()
+
+    def _on_human_task(self, event, task):
+        """
+        A job of ours waiting for an operator gives its slot to an extra worker
+        (and browser) until the task is answered.
+        """
+        service_job = self.get(task.job_id) if task.job_id else None
+        if service_job is None or service_job.status != "running":
+            return
+        with self._lock:
+            if event == "posted":
+                self._suspended += 1
+                if not self._stopping:
+                    self._start_worker()
+            else:
+                self._suspended -= 1
+            self._lock.notify_all()
+            size = self.workers + self._suspended
+        self.pools.resize(size)
+        service_job.add_event({
+            "event": f"human_task_{event}",
+            "task_id": task.task_id,
+            "kind": task.kind,
+            "step_order": task.step_order,
+            "status": task.status,
+            "ts": time.time(),
+        })
+
+    def stop(self, timeout=None):
+        """
+        Stops taking jobs: queued jobs are cancelled, running jobs are allowed to
+        finish (up to 'timeout' seconds), then the browser pools are closed.
+        """
+        with self._lock:
+            self._stopping = True
+            cancelled = list(self._queue)
+            self._queue.clear()
+            self._lock.notify_all()
+            threads = list(self._threads)
+        for service_job in cancelled:
+            self._finish(service_job, "cancelled")
+        # Jobs waiting for an operator would never finish.
+        human_tasks = get_human_task_queue()
+        human_tasks.cancel_pending(lambda task: self.get(task.job_id) is not None, reason="service stopped")
+        human_tasks.remove_listener(self._on_human_task)
+        human_tasks.detach_console()
+        for thread in threads:
+            thread.join(timeout)
+        self.pools.close()
+        flush_debug_artifacts()
+        logger.info("Execution service stopped.")
+
+    def submit(self, data):
+        """
+        Queues one execution input. Returns (ServiceJob, queue position).
+        Raises QueueFull when max_queue jobs are already waiting, ValueError for
+        an unusable input.
+        """
+        if not isinstance(data, dict):
+            raise ValueError("Execution input must be a JSON object.")
+        steps = data.get("steps")
+        if not isinstance(steps, list):
+            raise ValueError("Execution input needs a 'steps' list.")
+        job = make_job(
+            {"steps": steps},
+            data.get("condition_context", {}),
+            job_id=data.get("job_id") or str(uuid.uuid4()),
+            start_step=data.get("start_step", 1),
+            form=data.get("form"),
+            debug=data.get("debug"),
+            checkpoint_key=data.get("checkpoint_key"),
+            resume=bool(data.get("resume")),
+        )
+        service_job = ServiceJob(job, profile=data.get("profile") or self.profile, backend=data.get("browser") or self.backend)
+        with self._lock:
+            if self._stopping:
+                raise QueueFull("The execution service is shutting down.")
+            if len(self._queue) >= self.max_queue:
+                raise QueueFull(f"{len(self._queue)} job(s) already queued.")
+            if service_job.job_id in self._jobs:
+                raise ValueError(f"Job '{service_job.job_id}' already exists.")
+            self._jobs[service_job.job_id] = service_job
+            self._queue.append(service_job)
+            position = len(self._queue)
+            self._lock.notify()
+        logger.info("Job '%s' queued at position %s.", service_job.job_id, position)
+        return service_job, position
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def queue_position(self, service_job):
+        with self._lock:
+            try:
+                return self._queue.index(service_job) + 1
+            except ValueError:
+                return None
+
+    def list_jobs(self):
+        with self._lock:
+            jobs = list(self._jobs.values())
+        return [service_job.describe() for service_job in jobs]
+
+    def cancel(self, job_id):
+        """
+        Cancels a queued job. Returns the ServiceJob (None if unknown); raises
+        RuntimeError when the job is already running or finished.
+        """
+        with self._lock:
+            service_job = self._jobs.get(job_id)
+            if service_job is None:
+                return None
+            if service_job not in self._queue:
+                raise RuntimeError(f"Job '{job_id}' is {service_job.status} and can no longer be cancelled.")
+            self._queue.remove(service_job)
+        self._finish(service_job, "cancelled")
+        logger.info("Job '%s' cancelled.", job_id)
+        return service_job
+
+    def _next_job(self):
+        """
+        Waits for a queued job and a free slot (jobs waiting for an operator do
+        not count). Returns None when this worker should exit: on shutdown, or
+        when it is surplus after an operator answered.
+        """
+        with self._lock:
+            while True:
+                if self._stopping:
+                    return None
+                if len(self._threads) > self.workers + self._suspended:
+                    self._threads.remove(threading.current_thread())
+                    return None
+                if self._queue and self._busy - self._suspended < self.workers:
+                    self._busy += 1
+                    return self._queue.popleft()
+                self._lock.wait()
+
+    def _worker(self):
+        while True:
+            service_job = self._next_job()
+            if service_job is None:
+                return
+            service_job.set_status("running")
+            start_time = time.monotonic()
+            try:
+                record = run_single_job(
+                    service_job.job,
+                    headless=self.headless,
+                    pool=self.pools,
+                    profile=service_job.profile,
+                    backend=service_job.backend,
+                    on_event=service_job.add_event,
+                )
+            except Exception as e:
+                # run_single_job() never raises; this only guards the worker thread.
+                record = {"job_id": service_job.job_id, "status": "failed", "error": f"{type(e).__name__}: {e}"}
+            elapsed = time.monotonic() - start_time
+            with self._lock:
+                self._busy -= 1
+                self._busy_seconds += elapsed
+                self._job_seconds += elapsed
+            self._finish(service_job, "completed" if record.get("status") == "completed" else "failed", record)
+            logger.info("Job '%s' %s in %.1fs.", service_job.job_id, service_job.status, elapsed)
+
+    def _finish(self, service_job, status, record=None):
+        service_job.set_status(status, record)
+        with self._lock:
+            self._totals[status] += 1
+            self._forget_old_jobs()
+
+    def _forget_old_jobs(self):
+        finished = [job_id for job_id, service_job in self._jobs.items() if service_job.finished]
+        for job_id in finished[:max(0, len(finished) - self.retain_jobs)]:
+            del self._jobs[job_id]
+
+    def metrics(self):
+        """
+        Returns the service gauges and counters as a dict.
+        """
+        with self._lock:
+            uptime = time.monotonic() - self.started
+            by_status = {"queued": 0, "running": 0}
+            for service_job in self._jobs.values():
+                by_status[service_job.status] = by_status.get(service_job.status, 0) + 1
+            return {
+                "uptime_seconds": round(uptime, 3),
+                "queue_depth": len(self._queue),
+                "max_queue": self.max_queue,
+                "workers": self.workers,
+                "workers_busy": self._busy,
+                "workers_waiting_for_operator": self._suspended,
+                "utilization": round(self._busy_seconds / (uptime * self.workers), 4) if uptime else 0.0,
+                "jobs": by_status,
+                "jobs_total": dict(self._totals),
+                "job_seconds_total": round(self._job_seconds, 3),
+            }
+
+
+def metrics_to_prometheus(metrics):
+    """
+    Renders metrics() in the Prometheus text exposition format.
+    """
+    lines = [
+        "# HELP step_service_queue_depth Jobs waiting for a worker.",
+        "# TYPE step_service_queue_depth gauge",
+        f"step_service_queue_depth {metrics['queue_depth']}",
+        "# HELP step_service_queue_capacity Jobs that may wait before submissions are refused.",
+        "# TYPE step_service_queue_capacity gauge",
+        f"step_service_queue_capacity {metrics['max_queue']}",
+        "# HELP step_service_workers Worker threads (one browser session each).",
+        "# TYPE step_service_workers gauge",
+        f"step_service_workers {metrics['workers']}",
+        "# HELP step_service_workers_busy Workers currently running a job.",
+        "# TYPE step_service_workers_busy gauge",
+        f"step_service_workers_busy {metrics['workers_busy']}",
+        "# HELP step_service_workers_waiting_for_operator Running jobs suspended on a human task.",
+        "# TYPE step_service_workers_waiting_for_operator gauge",
+        f"step_service_workers_waiting_for_operator {metrics['workers_waiting_for_operator']}",
+        "# HELP step_service_worker_utilization Share of worker time spent on jobs since start.",
+        "# TYPE step_service_worker_utilization gauge",
+        f"step_service_worker_utilization {metrics['utilization']}",
+        "# HELP step_service_jobs Retained jobs by status.",
+        "# TYPE step_service_jobs gauge",
+    ]
+    for status, count in sorted(metrics["jobs"].items()):
+        lines.append(f'step_service_jobs{{status="{status}"}} {count}')
+    lines += [
+        "# HELP step_service_jobs_finished_total Jobs finished since start by status.",
+        "# TYPE step_service_jobs_finished_total counter",
+    ]
+    for status, count in sorted(metrics["jobs_total"].items()):
+        lines.append(f'step_service_jobs_finished_total{{status="{status}"}} {count}')
+    lines += [
+        "# HELP step_service_job_seconds_total Time spent running jobs since start.",
+        "# TYPE step_service_job_seconds_total counter",
+        f"step_service_job_seconds_total {metrics['job_seconds_total']}",
+        "# HELP step_service_uptime_seconds Time since the service started.",
+        "# TYPE step_service_uptime_seconds gauge",
+        f"step_service_uptime_seconds {metrics['uptime_seconds']}",
+    ]
+    return "\n".join(lines) + "\n"
+
+
+class ServiceRequestHandler(BaseHTTPRequestHandler):
+    """
+    The HTTP API of the execution service (self.server.service is the ExecutionService).
+    """
+
+    server_version = "StepExecutionService/1.0"
+
+    def address_string(self):
+        # Unix socket clients have no (host, port) address.
+        return self.client_address[0] if isinstance(self.client_address, tuple) else "unix"
+
+    def log_message(self, format, *args):
+        logger.debug("%s %s", self.address_string(), format % args)
+
+    def _send_json(self, status, payload):
+        body = json.dumps(payload, ensure_ascii=False, default=str).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_error(self, status, message):
+        self._send_json(status, {"error": message})
+
+    def _authorized(self):
+        token = self.server.token
+        if not token:
+            return True
+        given = self.headers.get("X-Step-Service-Token") or self._route()[1].get("token") or ""
+        authorization = self.headers.get("Authorization") or ""
+        if authorization.startswith("Bearer "):
+            given = authorization[len("Bearer "):]
+        if hmac.compare_digest(given.encode("utf-8"), token.encode("utf-8")):
+            return True
+        self._send_error(401, "Missing or wrong service token.")
+        return False
+
+    def _route(self):
+        url = urlsplit(self.path)
+        parts = [part for part in url.path.split("/") if part]
+        return parts, {name: values[-1] for name, values in parse_qs(url.query).items()}
+
+    def _send_console(self, method, body=b""):
+        status, content_type, payload = handle_console_request(method, self.path, body)
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def do_GET(self):
+        if not self._authorized():
+            return
+        parts, query = self._route()
+        service = self.server.service
+        if parts[:1] in (["console"], ["tasks"]):
+            self._send_console("GET")
+        elif parts == ["health"]:
+            metrics = service.metrics()
+            self._send_json(200, {"status": "ok", "workers": metrics["workers"], "queue_depth": metrics["queue_depth"]})
+        elif parts == ["metrics"]:
+            body = metrics_to_prometheus(service.metrics()).encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        elif parts == ["jobs"]:
+            self._send_json(200, {"jobs": service.list_jobs()})
+        elif len(parts) in (2, 3) and parts[0] == "jobs":
+            service_job = service.get(parts[1])
+            if service_job is None:
+                self._send_error(404, f"Unknown job '{parts[1]}'.")
+            elif len(parts) == 2:
+                self._send_json(200, service_job.describe(service.queue_position(service_job)))
+            elif parts[2] == "events":
+                self._send_events(service_job, query)
+            else:
+                self._send_error(404, "Not found.")
+        else:
+            self._send_error(404, "Not found.")
+
+    def _send_events(self, service_job, query):
+        try:
+            since = max(0, int(query.get("since", 0)))
+            wait = min(MAX_LONG_POLL_SECONDS, max(0.0, float(query.get("wait", 0))))
+        except ValueError:
+            self._send_error(400, "'since' and 'wait' must be numbers.")
+            return
+
+        if query.get("stream") not in (None, "", "0", "false"):
+            # JSON lines until the job has finished; the connection is closed afterwards.
+            self.send_response(200)
+            self.send_header("Content-Type", "application/x-ndjson")
+            self.send_header("Connection", "close")
+            self.end_headers()
+            try:
+                finished = False
+                while not finished:
+                    events, finished = service_job.wait_for_events(since, MAX_LONG_POLL_SECONDS)
+                    for event in events:
+                        self.wfile.write((json.dumps(event, ensure_ascii=False, default=str) + "\n").encode("utf-8"))
+                    since += len(events)
+                    self.wfile.flush()
+            except (BrokenPipeError, ConnectionResetError):
+                logger.debug("Event stream of job '%s' closed by the client.", service_job.job_id)
+            self.close_connection = True
+            return
+
+        events, finished = service_job.wait_for_events(since, wait)
+        self._send_json(200, {
+            "job_id": service_job.job_id,
+            "status": service_job.status,
+            "events": events,
+            "next": since + len(events),
+            "finished": finished,
+        })
+
+    def do_POST(self):
+        if not self._authorized():
+            return
+        parts, _ = self._route()
+        length = int(self.headers.get("Content-Length") or 0)
+        if parts[:1] == ["tasks"]:
+            self._send_console("POST", self.rfile.read(length) if length else b"")
+            return
+        if parts != ["jobs"]:
+            self._send_error(404, "Not found.")
+            return
+        if length <= 0 or length > MAX_BODY_BYTES:
+            self._send_error(400 if length <= 0 else 413, "Expected one execution input as the JSON body.")
+            return
+        try:
+            data = json.loads(self.rfile.read(length).decode("utf-8"))
+            service_job, position = self.server.service.submit(data)
+        except QueueFull as e:
+            self._send_error(503, str(e))
+            return
+        except ValueError as e:
+            self._send_error(400, str(e))
+            return
+        self._send_json(202, {"job_id": service_job.job_id, "status": service_job.status, "queue_position": position})
+
+    def do_DELETE(self):
+        if not self._authorized():
+            return
+        parts, _ = self._route()
+        if len(parts) != 2 or parts[0] != "jobs":
+            self._send_error(404, "Not found.")
+            return
+        try:
+            service_job = self.server.service.cancel(parts[1])
+        except RuntimeError as e:
+            self._send_error(409, str(e))
+            return
+        if service_job is None:
+            self._send_error(404, f"Unknown job '{parts[1]}'.")
+        else:
+            self._send_json(200, service_job.describe())
+
+
+class UnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+def create_server(service, host=DEFAULT_HOST, port=DEFAULT_PORT, socket_path=None, token=SERVICE_TOKEN):
+    """
+    Returns the HTTP server of 'service' bound to host:port, or to 'socket_path'
+    (a Unix socket) when given. Call serve_forever() on it.
+    """
+    if socket_path:
+        if not hasattr(socket, "AF_UNIX"):
+            raise OSError("Unix sockets are not available on this platform; use --port instead.")
+        if os.path.exists(socket_path):
+            os.remove(socket_path)
+        server = UnixHTTPServer(socket_path, ServiceRequestHandler)
+    else:
+        server = ThreadingHTTPServer((host, port), ServiceRequestHandler)
+    server.service = service
+    server.token = token
+    return server
+
+
+def _get_option(args, name, default=None):
+    """
+    Returns the value of a "--name=value" option from 'args', or 'default'.
+    """
+    for arg in args:
+        if arg.startswith(name + "="):
+            return arg.split("=", 1)[1]
+    return default
+
+
+def main(argv=None):
+    args = sys.argv[1:] if argv is None else argv
+    socket_path = _get_option(args, "--socket", DEFAULT_SOCKET)
+    service = ExecutionService(
+        workers=int(_get_option(args, "--workers", DEFAULT_WORKERS)),
+        max_queue=int(_get_option(args, "--max-queue", DEFAULT_MAX_QUEUE)),
+        retain_jobs=int(_get_option(args, "--retain", DEFAULT_RETAIN_JOBS)),
+        headless="--headed" not in args,
+        profile=_get_option(args, "--profile"),
+        backend=_get_option(args, "--browser"),
+    )
+    server = create_server(
+        service,
+        host=_get_option(args, "--host", DEFAULT_HOST),
+        port=int(_get_option(args, "--port", DEFAULT_PORT)),
+        socket_path=socket_path,
+    )
+    service.start()
+
+    # SIGTERM (service managers) shuts down like Ctrl+C.
+    def on_sigterm(signum, frame):
+        raise KeyboardInterrupt
+    signal.signal(signal.SIGTERM, on_sigterm)
+
+    logger.info("Listening on %s.", socket_path or "http://%s:%s" % server.server_address[:2])
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        logger.info("Shutting down; running jobs are allowed to finish.")
+    finally:
+        server.server_close()
+        service.stop()
+        if socket_path and os.path.exists(socket_path):
+            os.remove(socket_path)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -2,6 +2,10 @@
 
 from selenium.common.exceptions import NoAlertPresentException
 
+from steps_shared_utils.run_logging import get_logger
+
+logger = get_logger(__name__)
+
 def handle_unexpected_alerts(driver, action="accept"):
     """
     Always attempts to switch to any open alert/confirm/prompt and clicks the "OK" (accept) button.
@@ -13,11 +17,11 @@ def handle_unexpected_alerts(driver, action="accept"):
     try:
         alert = driver.switch_to.alert
         alert_text = alert.text
-        print(f"[DEBUG alert_handler] Found unexpected alert: '{alert_text}'")
+        logger.debug("Found unexpected alert: '%s'", alert_text)
 
         # Always accept/click "OK"
         alert.accept()
-        print("[DEBUG alert_handler] Alert accepted (always confirm).")
+        logger.debug("Alert accepted (always confirm).")
 
         return True
 
@@ -25,5 +29,5 @@ def handle_unexpected_alerts(driver, action="accept"):
         # No alert, do nothing
         return False
     except Exception as e:
-        print(f"[WARNING alert_handler] Error handling alert: {e}")
+        logger.warning("Error handling alert: %s", e)
         return False
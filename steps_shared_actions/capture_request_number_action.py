@@ -4,12 +4,13 @@ import time
 from steps_shared_utils.element_utils import find_element
 from steps_shared_actions.alert_handler import handle_unexpected_alerts
 
-# We'll assume we store "request number" in a global dictionary, 
+# The "request number" is stored in the shared per-job EXECUTION_CONTEXT,
 # just like we do with OCR or other ephemeral data.
-# In practice, you might store it in EXECUTION_CONTEXT or some 
-# named dictionary.
+from steps_shared_utils.execution_context import EXECUTION_CONTEXT
 
-EXECUTION_CONTEXT = {}  # Or import a shared one if you prefer
+from steps_shared_utils.run_logging import get_logger
+
+logger = get_logger(__name__)
 
 def capture_request_number_action(driver, selector_type, selector_value, step_value, step):
     """
@@ -21,7 +22,7 @@ def capture_request_number_action(driver, selector_type, selector_value, step_va
 
     - If the same step is called twice, the new value overwrites the old one.
     """
-    print("[DEBUG] capture_request_number_action started.")
+    logger.debug("capture_request_number_action started.")
 
     # (A) Dismiss any leftover alerts first
     handle_unexpected_alerts(driver, action="dismiss")
@@ -38,13 +39,13 @@ def capture_request_number_action(driver, selector_type, selector_value, step_va
         # Possibly check if it's an <input> type
         request_number = element.get_attribute("value") or ""
 
-    print(f"[DEBUG] Extracted request_number='{request_number}' from the page.")
+    logger.debug("Extracted request_number='%s' from the page.", request_number)
 
     # (D) Store/overwrite in some global dictionary or in step
     EXECUTION_CONTEXT["REQUEST_NUMBER"] = request_number
-    print("[DEBUG] Stored in EXECUTION_CONTEXT['REQUEST_NUMBER'].")
+    logger.debug("Stored in EXECUTION_CONTEXT['REQUEST_NUMBER'].")
 
     # (E) Dismiss any new alert if it popped up
     handle_unexpected_alerts(driver, action="dismiss")
 
-    print("[DEBUG] capture_request_number_action done.")
+    logger.debug("capture_request_number_action done.")
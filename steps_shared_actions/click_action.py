@@ -2,14 +2,18 @@
 
 from steps_shared_utils.element_utils import find_element
 
+from steps_shared_utils.run_logging import get_logger
+
+logger = get_logger(__name__)
+
 def click_action(driver, selector_type, selector_value, step_value, step):
     """
     click_action(...)
 
     Finds an element by (selector_type, selector_value) and clicks it.
     """
-    print("[DEBUG] click_action() called.")
+    logger.debug("click_action() called.")
     element = find_element(driver, selector_type, selector_value)
     element.click()
-    print("[DEBUG] Element clicked successfully.")
+    logger.debug("Element clicked successfully.")
 
@@ -1,5 +1,9 @@
 from selenium.webdriver.common.by import By
 
+from steps_shared_utils.run_logging import get_logger
+
+logger = get_logger(__name__)
+
 def click_safe_area_action(driver, selector_type, selector_value, step_value, step):
     """
     click_safe_area_action(...)
@@ -14,7 +18,7 @@ def click_safe_area_action(driver, selector_type, selector_value, step_value, st
     'selector_type' / 'selector_value' might be ignored if the step doesn't need them.
     'step_value' might also be unused, unless you want to store some logic about where to click.
     """
-    print("[DEBUG] click_safe_area_action() called. Attempting to click a safe area on the page.")
+    logger.debug("click_safe_area_action() called. Attempting to click a safe area on the page.")
     try:
         # Approach A: Find <body> and click it
         # Sometimes <body>.click() might not be recognized if <body> is not truly clickable,
@@ -22,9 +26,9 @@ def click_safe_area_action(driver, selector_type, selector_value, step_value, st
 
         body_element = driver.find_element(By.CSS_SELECTOR, "body")
         body_element.click()
-        print("[DEBUG] Clicked <body> to dismiss potential pop-ups.")
+        logger.debug("Clicked <body> to dismiss potential pop-ups.")
     except Exception as e:
-        print(f"[WARNING] Could not click <body>: {e}. Trying an alternate JS approach.")
+        logger.warning("Could not click <body>: %s. Trying an alternate JS approach.", e)
 
         # Approach B: Use JavaScript to click at a small offset from top-left corner
         # This usually is safe if the top-left corner isn't covering any UI overlays.
@@ -40,7 +44,7 @@ def click_safe_area_action(driver, selector_type, selector_value, step_value, st
         return false;
         """
         result = driver.execute_script(script)
-        print(f"[DEBUG] JS click at (1,1) result = {result}. Possibly dismissed pop-up.")
+        logger.debug("JS click at (1,1) result = %s. Possibly dismissed pop-up.", result)
 
-    print("[DEBUG] click_safe_area_action completed. Any overlay/popup should now be closed.")
+    logger.debug("click_safe_area_action completed. Any overlay/popup should now be closed.")
 
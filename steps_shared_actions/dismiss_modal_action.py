@@ -2,6 +2,10 @@
 
 from selenium.webdriver.common.by import By
 
+from steps_shared_utils.run_logging import get_logger
+
+logger = get_logger(__name__)
+
 def dismiss_modal_action(driver, selector_type, selector_value, step_value, step):
     """
     Attempts to dismiss a modal popup by first clicking on its close button.
@@ -19,12 +23,12 @@ def dismiss_modal_action(driver, selector_type, selector_value, step_value, step
         # Adjust the CSS selector if needed.
         close_button = driver.find_element(By.CSS_SELECTOR, "div.modal-content button.close")
         close_button.click()
-        print("[DEBUG dismiss_modal_action] Modal dismissed by clicking close button.")
+        logger.debug("Modal dismissed by clicking close button.")
     except Exception as e:
-        print(f"[WARNING dismiss_modal_action] Failed to click close button: {e}. Trying JavaScript removal.")
+        logger.warning("Failed to click close button: %s. Trying JavaScript removal.", e)
         try:
             # Option 2: Remove the modal from the DOM via JavaScript.
             driver.execute_script("var modal = document.querySelector('div.modal-content'); if(modal){ modal.remove(); }")
-            print("[DEBUG dismiss_modal_action] Modal removed via JavaScript.")
+            logger.debug("Modal removed via JavaScript.")
         except Exception as e_js:
-            print(f"[ERROR dismiss_modal_action] Could not remove modal via JavaScript: {e_js}.")
+            logger.error("Could not remove modal via JavaScript: %s.", e_js)
@@ -7,6 +7,10 @@ from selenium.webdriver.support import expected_conditions as EC
 from steps_shared_utils.parse_ymd import parse_ymd
 from steps_shared_utils.element_utils import find_element
 
+from steps_shared_utils.run_logging import get_logger
+
+logger = get_logger(__name__)
+
 def enter_date_custom_dialog_action(driver, selector_type, selector_value, step_value, step):
     """
     A specialized custom datepicker approach for the site that uses:
@@ -24,12 +28,12 @@ def enter_date_custom_dialog_action(driver, selector_type, selector_value, step_
 
     # 1) Parse the user-provided date "YYYY-MM-DD"
     yyyy, mm, dd = parse_ymd(step_value)
-    print(f"[DEBUG] enter_date_custom_dialog_action: date to pick => {yyyy}-{mm:02d}-{dd:02d}")
+    logger.debug("enter_date_custom_dialog_action: date to pick => %s-%02d-%02d", yyyy, mm, dd)
 
     # 2) Click the main input/field to open the date window
     date_field = find_element(driver, selector_type, selector_value)
     date_field.click()
-    print("[DEBUG] Clicked the date input (#bdate) to open the scw calendar window.")
+    logger.debug("Clicked the date input (#bdate) to open the scw calendar window.")
 
     # 3) Wait for the table#scw (the overlay) to appear
     #    We'll wait up to 10 seconds. Adjust if site is slow.
@@ -38,9 +42,9 @@ def enter_date_custom_dialog_action(driver, selector_type, selector_value, step_
         calendar_table = wait.until(
             EC.visibility_of_element_located((By.CSS_SELECTOR, "table#scw"))
         )
-        print("[DEBUG] Found the custom date table #scw, presumably displayed now.")
+        logger.debug("Found the custom date table #scw, presumably displayed now.")
     except Exception as e:
-        print(f"[ERROR] Could not find table#scw overlay within 10s: {e}")
+        logger.error("Could not find table#scw overlay within 10s: %s", e)
         return  # or raise
 
     # 4) Pick the year (via select#scwYears)
@@ -51,9 +55,9 @@ def enter_date_custom_dialog_action(driver, selector_type, selector_value, step_
         select_obj = Select(year_select)
         # Convert yyyy to string, e.g. "1991"
         select_obj.select_by_visible_text(str(yyyy))
-        print(f"[DEBUG] Picked year {yyyy} from #scwYears.")
+        logger.debug("Picked year %s from #scwYears.", yyyy)
     except Exception as e:
-        print(f"[ERROR] Failed picking year {yyyy} in scwYears: {e}")
+        logger.error("Failed picking year %s in scwYears: %s", yyyy, e)
         return
 
     # 5) Pick the month (via select#scwMonths)
@@ -69,9 +73,9 @@ def enter_date_custom_dialog_action(driver, selector_type, selector_value, step_
         month_name = MONTH_NAMES.get(mm, "")
         select_obj = Select(month_select)
         select_obj.select_by_visible_text(month_name)
-        print(f"[DEBUG] Picked month '{month_name}' from #scwMonths.")
+        logger.debug("Picked month '%s' from #scwMonths.", month_name)
     except Exception as e:
-        print(f"[ERROR] Failed picking month {mm} in scwMonths: {e}")
+        logger.error("Failed picking month %s in scwMonths: %s", mm, e)
         return
 
     # 6) Pick the day (td.scwCells with text content=dd)
@@ -82,12 +86,12 @@ def enter_date_custom_dialog_action(driver, selector_type, selector_value, step_
         # day_xpath = f"//td[contains(@class,'scwCells') and text()='{dd}']"
         day_cell = driver.find_element(By.XPATH, day_xpath)
         day_cell.click()
-        print(f"[DEBUG] Picked day {dd} by clicking the cell with text()='{dd}'.")
+        logger.debug("Picked day %s by clicking the cell with text()='%s'.", dd, dd)
     except Exception as e:
-        print(f"[ERROR] Failed picking day {dd}: {e}")
+        logger.error("Failed picking day %s: %s", dd, e)
         return
 
     # 7) The calendar presumably closes automatically after picking a day
     #    If not, you might need to click a 'Close' button or do more steps
-    print(f"[INFO] Successfully selected date {yyyy}-{mm:02d}-{dd:02d} in the custom scw calendar.")
+    logger.info("Successfully selected date %s-%02d-%02d in the custom scw calendar.", yyyy, mm, dd)
 
@@ -7,6 +7,10 @@ from steps_shared_utils.parse_ymd import parse_ymd
 from steps_shared_utils.element_utils import find_element
 from steps_shared_actions.alert_handler import handle_unexpected_alerts
 
+from steps_shared_utils.run_logging import get_logger
+
+logger = get_logger(__name__)
+
 def enter_day_action(driver, selector_type, selector_value, step_value, step):
     """
     enter_day_action(driver, selector_type, selector_value, step_value, step)
@@ -15,7 +19,7 @@ def enter_day_action(driver, selector_type, selector_value, step_value, step):
     If it's a <select>, we do select_by_visible_text. 
     If it's an <input>, we do clear() + send_keys().
     """
-    print("[DEBUG] enter_day_action started.")
+    logger.debug("enter_day_action started.")
     yyyy, mm, dd = parse_ymd(step_value)
     day_str = f"{dd:02d}"
 
@@ -30,7 +34,7 @@ def enter_day_action(driver, selector_type, selector_value, step_value, step):
     else:
         _enter_text_day(driver, element, day_str)
 
-    print("[DEBUG] enter_day_action done.")
+    logger.debug("enter_day_action done.")
 
 
 # def _select_dropdown_day(driver, select_element, day_str):
@@ -75,14 +79,14 @@ def _select_dropdown_day(driver, select_element, day_str):
         try:
             # First, try selecting using the padded day_str (e.g., "01")
             select_obj.select_by_visible_text(day_str)
-            print(f"[DEBUG] Selected day '{day_str}' in dropdown (exact match).")
+            logger.debug("Selected day '%s' in dropdown (exact match).", day_str)
             return
         except NoSuchElementException:
             # Fallback: Try selecting using the day without leading zero
             day_without_zero = str(int(day_str))  # converts "01" to "1"
             try:
                 select_obj.select_by_visible_text(day_without_zero)
-                print(f"[DEBUG] Selected day '{day_without_zero}' in dropdown (fallback without leading zero).")
+                logger.debug("Selected day '%s' in dropdown (fallback without leading zero).", day_without_zero)
                 return
             except NoSuchElementException:
                 # If still not found, iterate over options as a final fallback
@@ -94,12 +98,12 @@ def _select_dropdown_day(driver, select_element, day_str):
                         break
                 if found_match:
                     select_obj.select_by_visible_text(found_match)
-                    print(f"[DEBUG] Found fallback day match '{found_match}'.")
+                    logger.debug("Found fallback day match '%s'.", found_match)
                 else:
                     raise Exception(f"No matching day found for '{day_str}' in dropdown.")
         handle_unexpected_alerts(driver, action="accept")
     except Exception as e:
-        print(f"[ERROR] Could not select day in <select>: {e}")
+        logger.error("Could not select day in <select>: %s", e)
         raise
 
 
@@ -115,7 +119,7 @@ def _enter_text_day(driver, element, day_str):
         element.send_keys(day_str)
         handle_unexpected_alerts(driver, action="dismiss")
 
-        print(f"[DEBUG] Typed day_str='{day_str}' into text field.")
+        logger.debug("Typed day_str='%s' into text field.", day_str)
     except Exception as e:
-        print(f"[ERROR] Could not enter day into text field: {e}")
+        logger.error("Could not enter day into text field: %s", e)
         raise
@@ -8,6 +8,10 @@ from steps_shared_utils.element_utils import find_element
 from steps_shared_actions.alert_handler import handle_unexpected_alerts
 from steps_shared_utils.wait_helpers import click_with_retry, wait_for_overlay_disappear  # type: ignore
 
+from steps_shared_utils.run_logging import get_logger
+
+logger = get_logger(__name__)
+
 
 MONTH_NAMES = {
     1: "January",   2: "February", 3: "March",     4: "April",
@@ -27,7 +31,7 @@ def enter_month_action(driver, selector_type, selector_value, step_value, step):
        also fallback to spelled-out months if numeric fails.
     4) if element is <input>, we do clear() + send_keys().
     """
-    print("[DEBUG] enter_month_action started.")
+    logger.debug("enter_month_action started.")
 
     yyyy, mm, dd = parse_ymd(step_value)
     month_format = step.get("month_format", "leading_zero").lower()
@@ -39,7 +43,7 @@ def enter_month_action(driver, selector_type, selector_value, step_value, step):
         # e.g. '03' for March
         month_str = f"{mm:02d}"
 
-    print(f"[DEBUG] Determined month_str='{month_str}' from step_value='{step_value}' using format='{month_format}'")
+    logger.debug("Determined month_str='%s' from step_value='%s' using format='%s'", month_str, step_value, month_format)
 
     # 1) find the element
     element = find_element(driver, selector_type, selector_value)
@@ -55,7 +59,7 @@ def enter_month_action(driver, selector_type, selector_value, step_value, step):
         # fallback to text approach
         _enter_text_month(driver, element, month_str)
 
-    print("[DEBUG] enter_month_action done.")
+    logger.debug("enter_month_action done.")
 
 
 def _select_dropdown_month(driver, select_element, month_str, mm_numeric):
@@ -76,7 +80,7 @@ def _select_dropdown_month(driver, select_element, month_str, mm_numeric):
         # Possibly wait for an overlay to vanish first
         wait_for_overlay_disappear(driver, overlay_id="overlay-background", timeout=10)
 
-        # Then attempt to click the <select> with retries
+        # Then attempt to click the <select>: 5 attempts, backing off up to 1s between them
         click_with_retry(driver, select_element, max_retries=5, delay=1.0)
         # 2) accept any alert
         handle_unexpected_alerts(driver, action="accept")
@@ -86,22 +90,22 @@ def _select_dropdown_month(driver, select_element, month_str, mm_numeric):
         # Attempt #1: direct exact match for month_str
         try:
             select_obj.select_by_visible_text(month_str)
-            print(f"[DEBUG] Chosen month '{month_str}' in dropdown (exact).")
+            logger.debug("Chosen month '%s' in dropdown (exact).", month_str)
         except NoSuchElementException:
-            print(f"[WARNING] No exact match for '{month_str}' in <select>. Trying fallback approach...")
+            logger.warning("No exact match for '%s' in <select>. Trying fallback approach...", month_str)
 
             # Attempt #2: partial or case-insensitive exact
             found_match = _try_fuzzy_match(select_obj, month_str)
             if not found_match:
-                print(f"[WARNING] Could not match '{month_str}'. Trying spelled-out fallback '{spelled_out_month}'...")
+                logger.warning("Could not match '%s'. Trying spelled-out fallback '%s'...", month_str, spelled_out_month)
                 # Attempt #3: spelled-out fallback (e.g. "October")
                 # This might succeed if the dropdown has "October" but our '10' was not found
                 try:
                     select_obj.select_by_visible_text(spelled_out_month)
-                    print(f"[DEBUG] Found spelled-out month '{spelled_out_month}' after fallback.")
+                    logger.debug("Found spelled-out month '%s' after fallback.", spelled_out_month)
                     found_match = spelled_out_month
                 except NoSuchElementException:
-                    print(f"[WARNING] No exact match for spelled-out month '{spelled_out_month}'. Trying partial on that...")
+                    logger.warning("No exact match for spelled-out month '%s'. Trying partial on that...", spelled_out_month)
 
                     # Attempt #4: partial/fuzzy on spelled-out month
                     found_match = _try_fuzzy_match(select_obj, spelled_out_month)
@@ -109,11 +113,11 @@ def _select_dropdown_month(driver, select_element, month_str, mm_numeric):
             if not found_match:
                 raise Exception(f"No matching month found for '{month_str}' or '{spelled_out_month}' in dropdown.")
             else:
-                print(f"[DEBUG] Found match '{found_match}' after fallback.")
+                logger.debug("Found match '%s' after fallback.", found_match)
 
         handle_unexpected_alerts(driver, action="accept")
     except Exception as e:
-        print(f"[ERROR] Could not select month in <select>: {e}")
+        logger.error("Could not select month in <select>: %s", e)
         raise
 
 
@@ -152,7 +156,7 @@ def _enter_text_month(driver, element, month_str):
         element.send_keys(month_str)
         handle_unexpected_alerts(driver, action="dismiss")
 
-        print(f"[DEBUG] Typed month_str='{month_str}' into text field.")
+        logger.debug("Typed month_str='%s' into text field.", month_str)
     except Exception as e:
-        print(f"[ERROR] Could not enter month into text field: {e}")
+        logger.error("Could not enter month into text field: %s", e)
         raise
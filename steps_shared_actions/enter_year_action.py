@@ -8,8 +8,12 @@ from steps_shared_utils.parse_ymd import parse_ymd
 from steps_shared_utils.element_utils import find_element
 from steps_shared_actions.alert_handler import handle_unexpected_alerts
 
+from steps_shared_utils.run_logging import get_logger
+
+logger = get_logger(__name__)
+
 def enter_year_action(driver, selector_type, selector_value, step_value, step):
-    print("[DEBUG] enter_year_action started.")
+    logger.debug("enter_year_action started.")
     yyyy, mm, dd = parse_ymd(step_value)
     year_str = str(yyyy)
 
@@ -20,8 +24,8 @@ def enter_year_action(driver, selector_type, selector_value, step_value, step):
     # 3) Attempt to select by visible text
     select_obj.select_by_visible_text(year_str)
 
-    print(f"[DEBUG] Selected option '{year_str}' for the year dropdown.")
-    print("[DEBUG] enter_year_action done.")
+    logger.debug("Selected option '%s' for the year dropdown.", year_str)
+    logger.debug("enter_year_action done.")
 
 
 def _enter_split_value(driver, selector_type, selector_value, partial_str):
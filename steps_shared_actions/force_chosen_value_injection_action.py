@@ -6,6 +6,10 @@ from selenium.common.exceptions import NoSuchElementException, WebDriverExceptio
 from steps_shared_utils.element_utils import find_element  # Use your unified find_element if desired
 from steps_shared_actions.alert_handler import handle_unexpected_alerts
 
+from steps_shared_utils.run_logging import get_logger
+
+logger = get_logger(__name__)
+
 def force_chosen_value_injection_action(driver, selector_type, selector_value, step_value, step):
     """
     force_chosen_value_injection_action(driver, selector_type, selector_value, step_value, step)
@@ -28,7 +32,7 @@ def force_chosen_value_injection_action(driver, selector_type, selector_value, s
       - You may need to adjust the exact HTML structure based on how your widget renders selected options.
       - This method bypasses the normal user interactions (clicking, waiting for dropdowns, etc.).
     """
-    print("[DEBUG] force_chosen_value_injection_action started.")
+    logger.debug("force_chosen_value_injection_action started.")
     
     # Dismiss any alerts that might interfere.
     handle_unexpected_alerts(driver)
@@ -36,15 +40,15 @@ def force_chosen_value_injection_action(driver, selector_type, selector_value, s
     # Locate the container element (e.g., the <ul> with class "chosen-choices").
     try:
         container = find_element(driver, selector_type, selector_value)
-        print("[DEBUG] force_chosen_value_injection_action: Found the widget container.")
+        logger.debug("force_chosen_value_injection_action: Found the widget container.")
     except Exception as e:
-        print(f"[ERROR] force_chosen_value_injection_action: Could not locate the widget container: {e}")
+        logger.error("force_chosen_value_injection_action: Could not locate the widget container: %s", e)
         return
 
     # The desired final value, e.g., "ALAND ISLANDS"
     desired_value = step_value.strip()
     if not desired_value:
-        print("[ERROR] force_chosen_value_injection_action: No value provided to inject.")
+        logger.error("force_chosen_value_injection_action: No value provided to inject.")
         return
 
     # Construct the final HTML to be injected.
@@ -69,11 +73,11 @@ def force_chosen_value_injection_action(driver, selector_type, selector_value, s
     """
     try:
         driver.execute_script(js_script, container, new_html)
-        print(f"[DEBUG] force_chosen_value_injection_action: Injected value '{desired_value}' into the widget.")
+        logger.debug("force_chosen_value_injection_action: Injected value '%s' into the widget.", desired_value)
     except Exception as e:
-        print(f"[ERROR] force_chosen_value_injection_action: Error during JS injection: {e}")
+        logger.error("force_chosen_value_injection_action: Error during JS injection: %s", e)
         return
 
     # Optionally, wait a short time for the widget to update.
     time.sleep(1)
-    print("[DEBUG] force_chosen_value_injection_action completed.")
+    logger.debug("force_chosen_value_injection_action completed.")
@@ -7,6 +7,10 @@ from selenium.common.exceptions import NoSuchElementException, WebDriverExceptio
 from steps_shared_actions.alert_handler import handle_unexpected_alerts
 from steps_shared_utils.element_utils import find_element  # use your unified find_element if desired
 
+from steps_shared_utils.run_logging import get_logger
+
+logger = get_logger(__name__)
+
 def force_date_injection_5days_action(driver, selector_type, selector_value, step_value, step):
     """
     force_date_injection_5days_action(driver, selector_type, selector_value, step_value, step)
@@ -28,20 +32,20 @@ def force_date_injection_5days_action(driver, selector_type, selector_value, ste
       selector_value might be the dynamic selector saved from element selection,
       and step_value can be ignored (or used as a placeholder).
     """
-    print("[DEBUG] force_date_injection_5days_action started.")
+    logger.debug("force_date_injection_5days_action started.")
 
     # 1. Calculate the date 5 days from now.
     target_date = datetime.now() + timedelta(days=5)
     # 2. Format the date as dd/MM/yyyy.
     formatted_date = target_date.strftime("%d/%m/%Y")
-    print(f"[DEBUG] Calculated target date: {formatted_date}")
+    logger.debug("Calculated target date: %s", formatted_date)
 
     # 3. Locate the date input element.
     try:
         element = find_element(driver, selector_type, selector_value)
-        print("[DEBUG] force_date_injection_5days_action: Date input element located.")
+        logger.debug("force_date_injection_5days_action: Date input element located.")
     except Exception as e:
-        print(f"[ERROR] force_date_injection_5days_action: Could not locate the date input element: {e}")
+        logger.error("force_date_injection_5days_action: Could not locate the date input element: %s", e)
         return
 
     # 4. Use JavaScript to remove the readonly attribute, set the value, and dispatch events.
@@ -57,11 +61,11 @@ def force_date_injection_5days_action(driver, selector_type, selector_value, ste
     try:
         handle_unexpected_alerts(driver)  # In case an alert is blocking
         driver.execute_script(js_script, element, formatted_date)
-        print(f"[DEBUG] force_date_injection_5days_action: Force-injected date '{formatted_date}' into the date field.")
+        logger.debug("force_date_injection_5days_action: Force-injected date '%s' into the date field.", formatted_date)
     except Exception as e:
-        print(f"[ERROR] force_date_injection_5days_action: Error during JS injection: {e}")
+        logger.error("force_date_injection_5days_action: Error during JS injection: %s", e)
         return
 
     # 5. Optionally wait for the page to process the change.
     time.sleep(1)
-    print("[DEBUG] force_date_injection_5days_action completed.")
+    logger.debug("force_date_injection_5days_action completed.")
@@ -7,6 +7,10 @@ from selenium.common.exceptions import NoSuchElementException
 from steps_shared_utils.parse_ymd import parse_ymd
 from steps_shared_actions.alert_handler import handle_unexpected_alerts
 
+from steps_shared_utils.run_logging import get_logger
+
+logger = get_logger(__name__)
+
 def force_date_injection_action(driver, selector_type, selector_value, step_value, step):
     """
     force_date_injection_action(driver, selector_type, selector_value, step_value, step)
@@ -22,7 +26,7 @@ def force_date_injection_action(driver, selector_type, selector_value, step_valu
     - If the site strictly requires datepicker usage, it may ignore or reset the field later.
     - Use with caution.
     """
-    print("[DEBUG] force_date_injection_action started.")
+    logger.debug("force_date_injection_action started.")
     handle_unexpected_alerts(driver)  # in case an alert is blocking
 
     # 1) Parse the "YYYY-MM-DD" => (yyyy, mm, dd)
@@ -32,12 +36,12 @@ def force_date_injection_action(driver, selector_type, selector_value, step_valu
     dd_str = f"{dd:02d}"
     mm_str = f"{mm:02d}"
     formatted_str = f"{dd_str}/{mm_str}/{yyyy}"
-    print(f"[DEBUG] Reformat {step_value} => '{formatted_str}'")
+    logger.debug("Reformat %s => '%s'", step_value, formatted_str)
 
     # 3) Locate the <input> via selector_type/selector_value
     input_el = _find_element_safely(driver, selector_type, selector_value)
     if not input_el:
-        print("[ERROR] Could not locate the date <input> for force injection.")
+        logger.error("Could not locate the date <input> for force injection.")
         return
 
     # 4) Use JavaScript to remove readOnly, set .value, dispatch events
@@ -49,12 +53,12 @@ def force_date_injection_action(driver, selector_type, selector_value, step_valu
         arguments[0].dispatchEvent(new Event('change', { bubbles: true }));
     """
     driver.execute_script(js_script, input_el, formatted_str)
-    print(f"[DEBUG] Force-injected '{formatted_str}' into the date field, triggered Angular events.")
+    logger.debug("Force-injected '%s' into the date field, triggered Angular events.", formatted_str)
 
     # 5) Optionally wait a bit so the site can react
     time.sleep(1)
 
-    print("[DEBUG] force_date_injection_action done.")
+    logger.debug("force_date_injection_action done.")
 
 
 def _find_element_safely(driver: WebDriver, sel_type: str, sel_value: str):
@@ -63,7 +67,7 @@ def _find_element_safely(driver: WebDriver, sel_type: str, sel_value: str):
     """
     try:
         if not sel_value:
-            print("[WARNING] No selector_value provided. Doing nothing.")
+            logger.warning("No selector_value provided. Doing nothing.")
             return None
 
         sel_type = sel_type.lower()
@@ -72,8 +76,8 @@ def _find_element_safely(driver: WebDriver, sel_type: str, sel_value: str):
         elif sel_type == 'css':
             return driver.find_element(By.CSS_SELECTOR, sel_value)
         else:
-            print(f"[ERROR] Unsupported selector_type '{sel_type}'. Use 'xpath' or 'css'.")
+            logger.error("Unsupported selector_type '%s'. Use 'xpath' or 'css'.", sel_type)
             return None
     except NoSuchElementException as e:
-        print(f"[ERROR] Element not found: {e}")
+        logger.error("Element not found: %s", e)
         return None
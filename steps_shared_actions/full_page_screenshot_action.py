@@ -3,12 +3,19 @@ import time
 from PIL import Image
 from io import BytesIO
 from steps_shared_actions.alert_handler import handle_unexpected_alerts
+from steps_shared_utils.steps_shares_browser_manager import get_full_page_screenshot_png
+
+from steps_shared_utils.run_logging import get_logger
+
+logger = get_logger(__name__)
 
 def full_page_screenshot_action(driver, selector_type, selector_value, step_value, step):
     """
-    Takes a full-page screenshot by scrolling vertically and stitching slices.
+    Takes a full-page screenshot. Browsers that capture the whole page natively
+    (Firefox, Chromium via the DevTools Protocol; see browser_supports) do it in
+    one call; otherwise the page is scrolled vertically and the slices are stitched.
     
-    Improvements:
+    Improvements of the stitching fallback:
     1) Each iteration, we re-check the scrollHeight in case the page grows.
     2) For the final slice, we do a partial offset if needed.
     3) Ensures we don't miss the very bottom of the page.
@@ -17,13 +24,24 @@ def full_page_screenshot_action(driver, selector_type, selector_value, step_valu
     Example usage in a step: "insert_value": "E:\\CRM\\screenshots\\my_page.png"
     """
 
-    print("[DEBUG] full_page_screenshot_action started.")
+    logger.debug("full_page_screenshot_action started.")
     handle_unexpected_alerts(driver, action="dismiss")
 
     # 1) Decide output path
     default_path = r"E:\CRM\screenshots\full_page_screenshot.png"
     screenshot_path = step_value.strip() if step_value.strip() else default_path
-    print(f"[DEBUG] Will save screenshot to '{screenshot_path}'")
+    logger.debug("Will save screenshot to '%s'", screenshot_path)
+
+    # Native capture: no window resizing, scrolling or sleeps.
+    png_data = get_full_page_screenshot_png(driver)
+    if png_data:
+        dir_part = os.path.dirname(screenshot_path)
+        if dir_part:
+            os.makedirs(dir_part, exist_ok=True)
+        with open(screenshot_path, "wb") as f:
+            f.write(png_data)
+        logger.debug("Full-page screenshot (native capture) saved to '%s'.", screenshot_path)
+        return
 
     # 2) Store original window state
     original_size = driver.get_window_size()
@@ -54,7 +72,7 @@ def full_page_screenshot_action(driver, selector_type, selector_value, step_valu
         # we'll set total_height to the max so we always capture the expanded height
         if new_total_height > total_height:
             total_height = new_total_height
-            print(f"[DEBUG] Page grew to new scrollHeight={total_height} at slice #{slice_count}")
+            logger.debug("Page grew to new scrollHeight=%s at slice #%s", total_height, slice_count)
 
         # 4c) Capture the screenshot of the current viewport
         png_data = driver.get_screenshot_as_png()
@@ -79,7 +97,7 @@ def full_page_screenshot_action(driver, selector_type, selector_value, step_valu
                 png_data = driver.get_screenshot_as_png()
                 screenshot_im = Image.open(BytesIO(png_data))
                 slices.append((final_pos, screenshot_im))
-                print(f"[DEBUG] Captured final partial slice at scroll={final_pos}")
+                logger.debug("Captured final partial slice at scroll=%s", final_pos)
 
             break
         else:
@@ -87,7 +105,7 @@ def full_page_screenshot_action(driver, selector_type, selector_value, step_valu
             current_scroll = next_scroll
 
     # 5) Now we know the final total_height. Let's build the big image
-    print(f"[DEBUG] Building final image with width={original_width}, height={total_height}")
+    logger.debug("Building final image with width=%s, height=%s", original_width, total_height)
     final_img = Image.new("RGB", (original_width, total_height), (255, 255, 255))
 
     # For each slice, paste it in at the correct offset
@@ -101,11 +119,10 @@ def full_page_screenshot_action(driver, selector_type, selector_value, step_valu
 
     # 7) Save final stitched image
     final_img.save(screenshot_path)
-    print(f"[DEBUG] Full-page screenshot saved to '{screenshot_path}'.")
+    logger.debug("Full-page screenshot saved to '%s'.", screenshot_path)
 
-    # 8) Return to a maximized window (or original)
-    driver.maximize_window()
-    # or to restore exactly:
-    # driver.set_window_size(original_size["width"], original_size["height"])
+    # 8) Restore the original window size (a fixed viewport of the execution
+    #    profile must survive the screenshot, so no maximize_window() here)
+    driver.set_window_size(original_size["width"], original_size["height"])
 
-    print("[DEBUG] full_page_screenshot_action done.")
+    logger.debug("full_page_screenshot_action done.")
@@ -1,4 +1,9 @@
 
+
+from steps_shared_utils.run_logging import get_logger
+
+logger = get_logger(__name__)
+
 def goto_action(driver, selector_type, selector_value, step_value, step):
     """
     goto_action(...)
@@ -6,6 +11,6 @@ def goto_action(driver, selector_type, selector_value, step_value, step):
     Navigates to a URL specified in 'step_value'.
     'selector_value' is ignored here (since goto only needs a URL).
     """
-    print(f"[DEBUG] goto_action() called. Navigating to {step_value}")
+    logger.debug("goto_action() called. Navigating to %s", step_value)
     driver.get(step_value)
 
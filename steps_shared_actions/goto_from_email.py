@@ -1,42 +1,59 @@
 # E:\CRM\automation_project\steps_shared_actions\goto_from_email_now_action.py
 
-import tkinter as tk
 from steps_shared_actions.alert_handler import handle_unexpected_alerts
+from steps_shared_utils.human_tasks import request_human_task, HumanTaskCancelled
+
+from steps_shared_utils.run_logging import get_logger
+
+logger = get_logger(__name__)
 
 def goto_from_email(driver, selector_type, selector_value, step_value, step):
     """
     goto_from_email_now_action(...)
 
-    This action displays a Tk popup at runtime, asking the user to paste
-    the new URL from their email (which contains a dynamic TOKEN, etc.).
+    This action asks the operator (console task, or a Tk popup without a
+    console; see steps_shared_utils.human_tasks) to paste the new URL from
+    their email (which contains a dynamic TOKEN, etc.).
     Then we do driver.get(...) to that URL in the same Selenium session.
 
     The 'selector_type'/'selector_value' aren't used. 'step_value' is ignored
     because the user link might be new each time. 
     """
-    print("[DEBUG] goto_from_email_now_action started.")
+    logger.debug("goto_from_email_now_action started.")
 
     # 1) Check if any leftover alert
     handle_unexpected_alerts(driver, action="accept")
 
-    # 2) Show a small Tk window to prompt user for the dynamic URL
-    link = _prompt_for_email_link()
+    # 2) Ask the operator for the dynamic URL (Cancel = no link, as before)
+    try:
+        response = request_human_task(
+            driver, "email_link", step,
+            title="Goto from Email",
+            instructions="Paste the unique link from the email.",
+            ask_for_link=True,
+            fallback=_prompt_for_email_link,
+        )
+        link = response.get("link") or ""
+    except HumanTaskCancelled:
+        link = ""
 
     # 3) If user gave something, navigate to it
     if link.strip():
-        print(f"[DEBUG] Navigating to user-provided link => {link}")
+        logger.debug("Navigating to user-provided link => %s", link)
         driver.get(link.strip())
     else:
-        print("[WARNING] No link provided. Doing nothing.")
+        logger.warning("No link provided. Doing nothing.")
 
-    print("[DEBUG] goto_from_email_now_action done.")
+    logger.debug("goto_from_email_now_action done.")
 
 
 def _prompt_for_email_link():
     """
     Displays a Tkinter dialog asking user to paste the unique link
-    from their email. Returns the string that user typed.
+    from their email. Returns {"action": "continue" | "cancel", "link": ...}.
     """
+    import tkinter as tk
+
     root = tk.Tk()
     root.title("Goto from Email")
     root.geometry("600x200")
@@ -71,6 +88,6 @@ def _prompt_for_email_link():
     root.mainloop()
 
     if user_closed["closed"]:
-        # user closed or canceled => return empty string
-        return ""
-    return link_var.get()
+        # user closed or canceled => no link
+        return {"action": "cancel", "link": ""}
+    return {"action": "continue", "link": link_var.get()}
@@ -1,6 +1,11 @@
 # E:\CRM\automation_project\steps_shared_actions\handle_unknown_action.py
 
+
+from steps_shared_utils.run_logging import get_logger
+
+logger = get_logger(__name__)
+
 def handle_unknown_action(driver, selector_type, selector_value, step_value, step):
     step_order = step.get("step_order", "?")
     unknown_action = step.get("action_type", "?")
-    print(f"[WARNING] Unknown action '{unknown_action}' at step #{step_order}. Doing nothing.")
+    logger.warning("Unknown action '%s' at step #%s. Doing nothing.", unknown_action, step_order)
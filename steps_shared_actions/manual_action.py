@@ -1,28 +1,52 @@
 # E:\CRM\automation_project\steps_shared_actions\manual_action.py
 
-import tkinter as tk
-from tkinter import scrolledtext, messagebox
+from steps_shared_utils.human_tasks import request_human_task
+
+from steps_shared_utils.run_logging import get_logger
+
+logger = get_logger(__name__)
 #from steps_shared_actions.alert_handler import handle_unexpected_alerts  # optional, if you want to check alerts
 
 def manual_action(driver, selector_type, selector_value, step_value, step):
     """
-    A run-time action for 'manual' steps. Displays a pop-up with the step's description,
-    waits for user confirmation, then proceeds.
+    A run-time action for 'manual' steps. Posts a human task with the step's description
+    (see steps_shared_utils.human_tasks), waits for the operator's confirmation, then proceeds.
+    Only this job waits; without an operator console the Tk dialog below is shown.
 
-    Improvements:
+    Tk dialog:
     1) Properly imports tkinter as 'tk', removing the error about 'module 'tk' has no attribute 'Tk'.
     2) Two buttons: "Continue" (go next) or "Cancel" (stop execution).
     3) Optional text area for the user to leave notes.
     4) Scrollable text for long descriptions.
     5) Window stays on top, so user doesn't lose it behind the browser (optional).
     """
-    print("[DEBUG manual_action] Called for a manual step.")
+    logger.debug("Called for a manual step.")
     
     description_text = step.get('description', 'No description provided.')
 
     # (A) Optional: Check for leftover alert before the manual step
     # handle_unexpected_alerts(driver, action="accept")
 
+    request_human_task(
+        driver, "manual", step,
+        title="Manual Step",
+        instructions="Perform the required action in the browser, then continue (or cancel to stop execution).",
+        fallback=lambda: _show_manual_dialog(description_text),
+    )
+
+    logger.debug("User clicked 'Continue'. Proceeding...")
+
+    # (C) Optional: Check for any new alert after manual step
+    # handle_unexpected_alerts(driver, action="accept")
+
+
+def _show_manual_dialog(description_text):
+    """
+    The Tk dialog of a manual step. Returns {"action": "continue" | "cancel", "notes": ...}.
+    """
+    import tkinter as tk
+    from tkinter import scrolledtext, messagebox
+
     # Create the Tk root window
     root = tk.Tk()
     root.title("Manual Step")
@@ -57,8 +81,8 @@ def manual_action(driver, selector_type, selector_value, step_value, step):
     user_notes = scrolledtext.ScrolledText(root, wrap=tk.WORD, width=70, height=3)
     user_notes.pack(fill=tk.X, padx=10, pady=(0,10))
 
-    # We’ll store the user’s notes if needed
-    user_notes_var = {"text": ""}
+    # The user's answer; closing the window counts as Cancel.
+    response = {"action": "cancel", "notes": ""}
 
     # Button frame for Continue / Cancel
     button_frame = tk.Frame(root)
@@ -66,16 +90,17 @@ def manual_action(driver, selector_type, selector_value, step_value, step):
 
     # This function is called when user clicks Continue
     def on_continue():
-        user_notes_var["text"] = user_notes.get("1.0", tk.END).strip()
+        response["action"] = "continue"
+        response["notes"] = user_notes.get("1.0", tk.END).strip()
         root.destroy()
 
     # This function is called when user clicks Cancel
     def on_cancel():
         # If you want to confirm the user truly wants to stop:
         if messagebox.askyesno("Confirm Cancel", "Do you want to stop execution entirely?"):
-            # We can raise an exception or set some global var to break out of the step flow
+            # request_human_task() raises HumanTaskCancelled for us; an exception
+            # raised inside a Tk callback would not leave mainloop().
             root.destroy()
-            raise Exception("[MANUAL ACTION] User cancelled automation.")
         # else do nothing, remain in the same window
 
     continue_btn = tk.Button(button_frame, text="Continue", width=12, command=on_continue)
@@ -85,13 +110,4 @@ def manual_action(driver, selector_type, selector_value, step_value, step):
     cancel_btn.pack(side=tk.LEFT, padx=5)
 
     root.mainloop()
-
-    # Once the user clicked Continue, the window is destroyed, and we proceed here
-    # (B) If you want to do something with user_notes_var["text"], like:
-    if user_notes_var["text"]:
-        print(f"[DEBUG manual_action] User notes: {user_notes_var['text']}")
-
-    print("[DEBUG manual_action] User clicked 'Continue'. Proceeding...")
-
-    # (C) Optional: Check for any new alert after manual step
-    # handle_unexpected_alerts(driver, action="accept")
+    return response
@@ -14,8 +14,12 @@ from selenium.webdriver.common.keys import Keys
 
 from steps_shared_utils.element_utils import find_element
 from steps_shared_actions.alert_handler import handle_unexpected_alerts
+from steps_shared_utils.execution_context import EXECUTION_CONTEXT
+from steps_shared_utils.ocr_worker_service import recognize_with_fallback
 
-EXECUTION_CONTEXT = {}
+from steps_shared_utils.run_logging import get_logger
+
+logger = get_logger(__name__)
 
 def ocr_captcha_action(driver, selector_type, selector_value, step_value, step):
     """
@@ -24,12 +28,12 @@ def ocr_captcha_action(driver, selector_type, selector_value, step_value, step):
     1) Finds the <img> element by (selector_type, selector_value).
     2) Scrolls it into view (if needed).
     3) Takes an element screenshot (Selenium 4+).
-    4) Runs PaddleOCR externally.
+    4) Runs PaddleOCR in the resident OCR worker (one-shot subprocess if it is down).
     5) Shows a correction popup.
     6) Stores final text in EXECUTION_CONTEXT["last_ocr_result"].
     """
 
-    print("[DEBUG] ocr_captcha_action started.")
+    logger.debug("ocr_captcha_action started.")
     # 1) Handle leftover/unexpected alerts
     handle_unexpected_alerts(driver, action="dismiss")
 
@@ -46,17 +50,20 @@ def ocr_captcha_action(driver, selector_type, selector_value, step_value, step):
     # Convert to a PIL image
     cropped_img = Image.open(io.BytesIO(png_data))
 
-    # 5) Convert PIL -> base64 -> run external OCR
-    b64_str = _pil_image_to_base64(cropped_img)
-    recognized_text = _run_paddle_ocr_in_subprocess(b64_str)
-    print(f"[DEBUG] Subprocess recognized => {recognized_text}")
+    # 5) Run OCR in the resident worker (model already loaded); if it is not
+    #    running, fall back to PIL -> base64 -> external OCR subprocess
+    recognized_text = recognize_with_fallback(
+        png_data,
+        lambda png: _run_paddle_ocr_in_subprocess(_pil_image_to_base64(cropped_img)),
+    )
+    logger.debug("OCR recognized => %s", recognized_text)
 
     # 6) Show correction popup
     final_text = _show_ocr_correction_dialog(cropped_img, recognized_text)
     EXECUTION_CONTEXT["last_ocr_result"] = final_text
-    print(f"[DEBUG] Stored OCR result => {final_text}")
+    logger.debug("Stored OCR result => %s", final_text)
 
-    print("[DEBUG] ocr_captcha_action done.")
+    logger.debug("ocr_captcha_action done.")
 
 
 def _pil_image_to_base64(pil_image):
@@ -78,11 +85,11 @@ def _run_paddle_ocr_in_subprocess(image_b64: str) -> str:
     try:
         result = subprocess.run(cmd, capture_output=True, text=True)
         if result.returncode != 0:
-            print(f"[ERROR] paddle_ocr_api.py failed: {result.stderr.strip()}")
+            logger.error("paddle_ocr_api.py failed: %s", result.stderr.strip())
             return ""
         return result.stdout.strip()
     except Exception as e:
-        print(f"[ERROR] Subprocess call failed: {e}")
+        logger.error("Subprocess call failed: %s", e)
         return ""
 
 
@@ -160,7 +167,7 @@ def _save_paddleocr_training_data(pil_image, final_text):
     full_path = os.path.join(save_folder, filename)
 
     pil_image.save(full_path, format="PNG")
-    print(f"[DEBUG] Saved training image => {full_path}, text => {final_text}")
+    logger.debug("Saved training image => %s, text => %s", full_path, final_text)
 
     try:
         from steps_shared_utils.paddleocr_db_manager import get_paddleocr_connection
@@ -170,6 +177,6 @@ def _save_paddleocr_training_data(pil_image, final_text):
                     INSERT INTO paddleocr_training_data (image_path, corrected_text, language, image_name)
                     VALUES (%s, %s, %s, %s)
                 """, (save_folder, final_text, "en", filename))
-        print("[DEBUG] Inserted new row into paddleocr_training_data.")
+        logger.debug("Inserted new row into paddleocr_training_data.")
     except Exception as e:
-        print("[ERROR] Failed to insert into paddleocr_training_data:", e)
+        logger.error("Failed to insert into paddleocr_training_data: %s", e)
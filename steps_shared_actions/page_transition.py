@@ -2,8 +2,12 @@
 
 from steps_shared_utils.element_utils import find_element
 
+from steps_shared_utils.run_logging import get_logger
+
+logger = get_logger(__name__)
+
 def page_transition_action(driver, selector_type, selector_value, step_value, step):
-    print("[DEBUG] page_transition_action() called.")
+    logger.debug("page_transition_action() called.")
     element = find_element(driver, selector_type, selector_value)
     element.click()
-    print("[DEBUG] Element clicked successfully (page_transition).")
+    logger.debug("Element clicked successfully (page_transition).")
@@ -1,5 +1,17 @@
-import tkinter as tk
-from tkinter import scrolledtext, messagebox
+from steps_shared_utils.human_tasks import request_human_task
+
+from steps_shared_utils.run_logging import get_logger
+
+logger = get_logger(__name__)
+
+# Everything the operator must confirm before a safe step may continue.
+SAFE_CHECKLIST = [
+    "Request number saved",
+    "Paid",
+    "Receipt saved",
+    "Recorded in CRM"
+]
+
 
 def safe_action(driver, selector_type, selector_value, step_value, step):
     """
@@ -11,15 +23,36 @@ def safe_action(driver, selector_type, selector_value, step_value, step):
       3. Receipt saved
       4. Recorded in CRM
       
-    The window displays instructions, the step's description, and the checklist.
-    The "Continue" button is disabled until all items are checked.
+    The task is posted to the operator console (see steps_shared_utils.human_tasks)
+    with the step's description, a screenshot and the checklist; without a console
+    a Tk window shows them. "Continue" needs all items checked.
     If the user cancels, an exception is raised.
     """
-    print("[DEBUG safe_action] Called for a safe (manual) step.")
+    logger.debug("Called for a safe (manual) step.")
 
     # Retrieve the step's description for user reference.
     description_text = step.get('description', 'No description provided.')
 
+    request_human_task(
+        driver, "safe", step,
+        title="Safe Action - Manual Intervention Required",
+        instructions=(
+            "Complete the sensitive operation in the browser (e.g., enter the credit card number, "
+            "take a screenshot, etc.), then check every item of the checklist."
+        ),
+        checklist=SAFE_CHECKLIST,
+        fallback=lambda: _show_safe_dialog(description_text),
+    )
+    logger.debug("User confirmed safe action; proceeding.")
+
+
+def _show_safe_dialog(description_text):
+    """
+    The Tk dialog of a safe step. Returns {"action": "continue" | "cancel", "notes": ...}.
+    """
+    import tkinter as tk
+    from tkinter import scrolledtext, messagebox
+
     # Create the main TK window with larger dimensions.
     root = tk.Tk()
     root.title("Safe Action - Manual Intervention Required")
@@ -51,12 +84,7 @@ def safe_action(driver, selector_type, selector_value, step_value, step):
     checklist_frame.pack(padx=10, pady=10, anchor=tk.W)
 
     # Define checklist items.
-    items = [
-        "Request number saved",
-        "Paid",
-        "Receipt saved",
-        "Recorded in CRM"
-    ]
+    items = SAFE_CHECKLIST
     
     # Create a dictionary to hold the BooleanVars for each item.
     checklist_vars = {}
@@ -114,10 +142,6 @@ def safe_action(driver, selector_type, selector_value, step_value, step):
     root.mainloop()
 
     if user_choice.get() == "continue":
-        if user_notes["text"]:
-            print(f"[DEBUG safe_action] User notes: {user_notes['text']}")
-        print("[DEBUG safe_action] User confirmed safe action; proceeding.")
-        return  # Proceed with execution.
-    else:
-        print("[DEBUG safe_action] User cancelled safe action.")
-        raise Exception("User cancelled safe action.")
+        return {"action": "continue", "notes": user_notes["text"], "checked": list(items)}
+    logger.debug("User cancelled safe action.")
+    return {"action": "cancel", "notes": user_notes["text"]}
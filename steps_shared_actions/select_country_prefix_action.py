@@ -6,6 +6,10 @@ from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from steps_shared_utils.element_utils import find_element
 
+from steps_shared_utils.run_logging import get_logger
+
+logger = get_logger(__name__)
+
 
 def select_country_prefix_action(driver, selector_type, selector_value, step_value, step):
     """
@@ -22,21 +26,21 @@ def select_country_prefix_action(driver, selector_type, selector_value, step_val
     'step_value' is the country name to match (e.g. "Israel").
     'selector_type/selector_value' should locate the .selected-flag container.
     """
-    print("[DEBUG] select_country_prefix_action started.")
+    logger.debug("select_country_prefix_action started.")
     country_name = step_value.strip()
     if not country_name:
-        print("[ERROR] No country name provided in step_value. Doing nothing.")
+        logger.error("No country name provided in step_value. Doing nothing.")
         return
 
     # 1) Locate .selected-flag
     selected_flag_el = find_element(driver, selector_type, selector_value)
     if not selected_flag_el:
-        print("[ERROR] Could not locate .selected-flag element. Exiting action.")
+        logger.error("Could not locate .selected-flag element. Exiting action.")
         return
 
     # 2) Click .selected-flag to open the list
     selected_flag_el.click()
-    print("[DEBUG] Clicked the .selected-flag element, expecting the country list to appear.")
+    logger.debug("Clicked the .selected-flag element, expecting the country list to appear.")
 
     # 3) Wait for the .country-list to become visible
     #    We assume the .country-list is a sibling or in the same container
@@ -45,9 +49,9 @@ def select_country_prefix_action(driver, selector_type, selector_value, step_val
         country_list_el = WebDriverWait(driver, 5).until(
             EC.visibility_of_element_located((By.CSS_SELECTOR, "ul.country-list:not(.hide)"))
         )
-        print("[DEBUG] Found visible country list.")
+        logger.debug("Found visible country list.")
     except Exception as e:
-        print(f"[ERROR] Timed out waiting for country list to appear: {e}")
+        logger.error("Timed out waiting for country list to appear: %s", e)
         return
 
     # 4) Find the <li> item that contains the user-provided country name
@@ -61,12 +65,12 @@ def select_country_prefix_action(driver, selector_type, selector_value, step_val
             break
 
     if match_li:
-        print(f"[DEBUG] Found matching country: {match_li.text}")
+        logger.debug("Found matching country: %s", match_li.text)
         match_li.click()
-        print("[DEBUG] Clicked the matching country <li>.")
+        logger.debug("Clicked the matching country <li>.")
     else:
-        print(f"[ERROR] Could not find any <li> containing '{country_name}'.")
+        logger.error("Could not find any <li> containing '%s'.", country_name)
         # optionally raise an exception or do something else
 
-    print("[DEBUG] select_country_prefix_action done.")
+    logger.debug("select_country_prefix_action done.")
 
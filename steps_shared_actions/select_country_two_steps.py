@@ -5,6 +5,10 @@ from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 
+from steps_shared_utils.run_logging import get_logger
+
+logger = get_logger(__name__)
+
 def select_country_two_steps(driver, selector_type, selector_value, step_value, step):
     """
     Action: SELECT_COUNTRY_TWO_STEPS
@@ -31,7 +35,7 @@ def select_country_two_steps(driver, selector_type, selector_value, step_value,
       step_value     : The country name to be typed (e.g. "ISRAEL" or "GERMANY").
       step           : The step dictionary (for logging/debugging).
     """
-    print(f"[DEBUG select_country_two_steps] Called with country '{step_value}'.")
+    logger.debug("Called with country '%s'.", step_value)
 
     # Detect new autocomplete input by checking if the selector_value contains a known substring.
     if "autocomplete-applicant-address-country" in selector_value or \
@@ -45,12 +49,12 @@ def select_country_two_steps(driver, selector_type, selector_value, step_value,
                 input_field = driver.find_element(By.CSS_SELECTOR, selector_value)
         except Exception as e:
             msg = f"[ERROR select_country_two_steps] Could not locate autocomplete input using {selector_type} '{selector_value}': {e}"
-            print(msg)
+            logger.error(msg)
             raise Exception(msg)
         
         input_field.clear()
         input_field.send_keys(step_value)
-        print(f"[DEBUG select_country_two_steps] Entered country name: '{step_value}' in autocomplete input.")
+        logger.debug("Entered country name: '%s' in autocomplete input.", step_value)
 
         # Wait for the autocomplete result to appear (support mat-option)
         try:
@@ -60,18 +64,18 @@ def select_country_two_steps(driver, selector_type, selector_value, step_value,
                     By.XPATH, f"//mat-option[contains(normalize-space(.), '{step_value.upper()}')] | //li[normalize-space(text())='{step_value}']"
                 ))
             )
-            print("[DEBUG select_country_two_steps] Found autocomplete result element matching the country.")
+            logger.debug("Found autocomplete result element matching the country.")
         except Exception as e:
             msg = f"[ERROR select_country_two_steps] Could not find autocomplete result element for '{step_value}': {e}"
-            print(msg)
+            logger.error(msg)
             raise Exception(msg)
 
         try:
             result.click()
-            print("[DEBUG select_country_two_steps] Clicked on the autocomplete result element.")
+            logger.debug("Clicked on the autocomplete result element.")
         except Exception as e:
             msg = f"[ERROR select_country_two_steps] Failed to click the autocomplete result element: {e}"
-            print(msg)
+            logger.error(msg)
             raise Exception(msg)
         
         # Optionally, wait for the input's value to update.
@@ -79,9 +83,9 @@ def select_country_two_steps(driver, selector_type, selector_value, step_value,
             WebDriverWait(driver, 5).until(
                 lambda d: d.find_element(By.CSS_SELECTOR, selector_value).get_attribute("value").strip().lower() == step_value.lower()
             )
-            print("[DEBUG select_country_two_steps] Autocomplete input value updated to the selected country.")
+            logger.debug("Autocomplete input value updated to the selected country.")
         except Exception as e:
-            print(f"[WARNING select_country_two_steps] Timeout waiting for input value update: {e}")
+            logger.warning("Timeout waiting for input value update: %s", e)
         return
 
 
@@ -94,41 +98,41 @@ def select_country_two_steps(driver, selector_type, selector_value, step_value,
                 widget = driver.find_element(By.CSS_SELECTOR, selector_value)
         except Exception as e:
             msg = f"[ERROR select_country_two_steps] Could not locate country widget using {selector_type} '{selector_value}': {e}"
-            print(msg)
+            logger.error(msg)
             raise Exception(msg)
         
         widget.click()
-        print("[DEBUG select_country_two_steps] Clicked on the country widget.")
+        logger.debug("Clicked on the country widget.")
 
         try:
             # Adjust the CSS selector as needed based on your page's DOM.
             search_input = WebDriverWait(driver, 5).until(
                 EC.presence_of_element_located((By.CSS_SELECTOR, "div#country_visited_chosen input"))
             )
-            print("[DEBUG select_country_two_steps] Search input located.")
+            logger.debug("Search input located.")
         except Exception as e:
             msg = f"[ERROR select_country_two_steps] Search input not found: {e}"
-            print(msg)
+            logger.error(msg)
             raise Exception(msg)
 
         search_input.clear()
         search_input.send_keys(step_value)
-        print(f"[DEBUG select_country_two_steps] Entered country name: '{step_value}'.")
+        logger.debug("Entered country name: '%s'.", step_value)
 
         try:
             result = WebDriverWait(driver, 5).until(
                 EC.presence_of_element_located((By.XPATH, f"//em[translate(normalize-space(text()), 'ABCDEFGHIJKLMNOPQRSTUVWXYZ', 'abcdefghijklmnopqrstuvwxyz')='{step_value.lower()}']"))
             )
-            print("[DEBUG select_country_two_steps] Found result element matching the country.")
+            logger.debug("Found result element matching the country.")
         except Exception as e:
             msg = f"[ERROR select_country_two_steps] Could not find result element for '{step_value}': {e}"
-            print(msg)
+            logger.error(msg)
             raise Exception(msg)
 
         try:
             result.click()
-            print("[DEBUG select_country_two_steps] Clicked on the result element.")
+            logger.debug("Clicked on the result element.")
         except Exception as e:
             msg = f"[ERROR select_country_two_steps] Failed to click the result element: {e}"
-            print(msg)
+            logger.error(msg)
             raise Exception(msg)
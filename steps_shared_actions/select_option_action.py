@@ -1,108 +1,157 @@
 # E:\CRM\automation_project\steps_shared_actions\select_option_action.py
 
-import time
-from selenium.webdriver.support.ui import Select
-from selenium.common.exceptions import NoSuchElementException, WebDriverException
+import threading
+from collections import OrderedDict
 from steps_shared_utils.element_utils import find_element
+from steps_shared_utils.retry_policy import retry_call
 from steps_shared_actions.alert_handler import handle_unexpected_alerts
 
+from steps_shared_utils.run_logging import get_logger
+
+logger = get_logger(__name__)
+
+# Option texts per <select> element, keyed by WebElement.id. Element ids are only
+# valid for the page they were found on, so entries naturally expire with the page.
+# Shared by the parallel runner's worker threads, hence the lock.
+_OPTION_TEXTS_CACHE = OrderedDict()
+_OPTION_TEXTS_CACHE_SIZE = 32
+_OPTION_TEXTS_CACHE_LOCK = threading.Lock()
+
+# Visible text of every option, whitespace-normalized like select_by_visible_text.
+_OPTION_TEXTS_JS = """
+var opts = arguments[0].options, texts = [];
+for (var i = 0; i < opts.length; i++) {
+    texts.push((opts[i].text || '').replace(/\\s+/g, ' ').trim());
+}
+return texts;
+"""
+
+# Returns [option, alreadySelected] for options[index] if its text is still the
+# expected one, otherwise null (the option list changed).
+_OPTION_AT_JS = """
+var opt = arguments[0].options[arguments[1]];
+if (!opt || (opt.text || '').replace(/\\s+/g, ' ').trim() !== arguments[2]) { return null; }
+return [opt, opt.selected];
+"""
+
+
+def _get_option_texts(driver, select_element, refresh=False):
+    """
+    Returns (texts, from_cache): the option texts of a <select>, from the cache or
+    with one script call (always a script call when refresh=True).
+    """
+    key = select_element.id
+    if not refresh:
+        with _OPTION_TEXTS_CACHE_LOCK:
+            texts = _OPTION_TEXTS_CACHE.get(key)
+            if texts is not None:
+                _OPTION_TEXTS_CACHE.move_to_end(key)
+                return texts, True
+
+    texts = driver.execute_script(_OPTION_TEXTS_JS, select_element) or []
+    with _OPTION_TEXTS_CACHE_LOCK:
+        _OPTION_TEXTS_CACHE[key] = texts
+        _OPTION_TEXTS_CACHE.move_to_end(key)
+        if len(_OPTION_TEXTS_CACHE) > _OPTION_TEXTS_CACHE_SIZE:
+            _OPTION_TEXTS_CACHE.popitem(last=False)
+    return texts, False
+
+
+def _match_option(texts, user_input):
+    """
+    Runs the match cascade over the option texts and returns (index, description),
+    or (None, None):
+      1) exact match, 2) case-insensitive match, 3) title-case, 4) substring (case-insensitive).
+    """
+    if user_input in texts:
+        return texts.index(user_input), "exact match"
+
+    user_input_lower = user_input.lower()
+    lowered = [t.lower() for t in texts]
+    if user_input_lower in lowered:
+        return lowered.index(user_input_lower), "case-insensitive match"
+
+    title_case_value = user_input.title()
+    if title_case_value != user_input and title_case_value in texts:
+        return texts.index(title_case_value), "title-case fallback"
+
+    for i, text in enumerate(lowered):
+        if user_input_lower in text:
+            return i, "substring match"
+
+    return None, None
+
+
+def _select_option_at(driver, select_element, index, expected_text):
+    """
+    Selects options[index] with a native click (so change events fire as for a user).
+    Returns False if the option at that index no longer has the expected text.
+    """
+    result = driver.execute_script(_OPTION_AT_JS, select_element, index, expected_text)
+    if not result:
+        return False
+    option, already_selected = result
+    if not already_selected:
+        option.click()
+    return True
+
 def select_option_action(driver, selector_type, selector_value, step_value, step):
     """
     Attempts to select an <option> by visible text in a <select> element.
-    Retries if an alert appears blocking the click/focus.
+    Re-clicks if an alert appears blocking the click/focus; stale, blocked or
+    alert-interrupted attempts are retried by the retry policy
+    (see steps_shared_utils.retry_policy).
 
     Updated to always accept alerts (OK), so the selection is never cancelled.
     """
-    print("[DEBUG] select_option_action() called (robust version).")
-
-    max_retries = 2
-    attempt = 0
-
-    while attempt < max_retries:
-        attempt += 1
-        try:
-            # STEP A: Find the <select> element
-            element = find_element(driver, selector_type, selector_value)
-
-            # Optional: click/focus it first, in case that triggers an alert
-            element.click()
-
-            # STEP B: Check if an alert popped up immediately, always accept
-            alert_found = handle_unexpected_alerts(driver, action="accept")
-            if alert_found:
-                print("[DEBUG] Retrying <select> click after accepting alert.")
-                element = find_element(driver, selector_type, selector_value)
-                element.click()
-
-            # STEP C: Do the actual selection logic
-            select = Select(element)
-
-            # 1) Attempt exact match
-            try:
-                select.select_by_visible_text(step_value)
-                print(f"[DEBUG] Selected option '{step_value}' (exact match).")
-                # Check for post-selection alert, always accept
-                handle_unexpected_alerts(driver, action="accept")
-                return  # success
-            except Exception:
-                print(f"[WARNING] Exact match not found for '{step_value}'. Trying fallback approaches...")
-
-            # 2) Case-insensitive exact match
-            user_input_lower = step_value.strip().lower()
-            matched_text = None
-            for opt in select.options:
-                if opt.text.strip().lower() == user_input_lower:
-                    matched_text = opt.text.strip()
-                    break
-
-            if matched_text:
-                select.select_by_visible_text(matched_text)
-                print(f"[DEBUG] Selected option '{matched_text}' (case-insensitive match).")
-                handle_unexpected_alerts(driver, action="accept")
-                return
-
-            # 3) Title-case fallback
-            title_case_value = step_value.strip().title()
-            if title_case_value != step_value:
-                print(f"[INFO] Trying title-case fallback: '{title_case_value}'")
-                try:
-                    select.select_by_visible_text(title_case_value)
-                    print(f"[DEBUG] Selected option '{title_case_value}' (title-case fallback).")
-                    handle_unexpected_alerts(driver, action="accept")
-                    return
-                except Exception:
-                    pass
-
-            # 4) Partial substring match (case-insensitive)
-            partial_match = None
-            for opt in select.options:
-                opt_text_lower = opt.text.strip().lower()
-                if user_input_lower in opt_text_lower:
-                    partial_match = opt.text.strip()
-                    break
-
-            if partial_match:
-                select.select_by_visible_text(partial_match)
-                print(f"[DEBUG] Selected option '{partial_match}' (substring match).")
-                handle_unexpected_alerts(driver, action="accept")
-                return
-
-            # 5) No match found with any approach
-            msg = f"No matching option found for '{step_value}' in <select> (all attempts)."
-            print(f"[ERROR] {msg}")
-            raise Exception(msg)
-
-        except (NoSuchElementException, WebDriverException) as e:
-            print(f"[WARNING] Attempt #{attempt} failed in select_option_action: {e}")
-            alert_found = handle_unexpected_alerts(driver, action="accept")
-
-            if attempt >= max_retries and not alert_found:
-                raise Exception(f"[ERROR] Could not complete select_option_action after {attempt} attempts. {e}")
-
-        except Exception as e:
-            raise e
-
-        # Optional short sleep before retry
-        time.sleep(1)
-
-    raise Exception("[ERROR] select_option_action failed after max retries.")
+    logger.debug("select_option_action() called (robust version).")
+    retry_call(
+        lambda: _select_option_once(driver, selector_type, selector_value, step_value),
+        driver=driver,
+        action_name="select_option",
+    )
+
+
+def _select_option_once(driver, selector_type, selector_value, step_value):
+    # STEP A: Find the <select> element
+    element = find_element(driver, selector_type, selector_value)
+
+    # Optional: click/focus it first, in case that triggers an alert
+    element.click()
+
+    # STEP B: Check if an alert popped up immediately, always accept
+    alert_found = handle_unexpected_alerts(driver, action="accept")
+    if alert_found:
+        logger.debug("Retrying <select> click after accepting alert.")
+        element = find_element(driver, selector_type, selector_value)
+        element.click()
+
+    # STEP C: Do the actual selection logic.
+    # All option texts come back in one script call (cached per <select>),
+    # the match cascade runs in Python, and only the chosen option is clicked.
+    user_input = " ".join(step_value.split())
+    texts, from_cache = _get_option_texts(driver, element)
+    index, how = _match_option(texts, user_input)
+    if from_cache and how != "exact match":
+        # A looser match from cached texts could pick the wrong option if an
+        # exact one was added since: only click it after re-reading the options.
+        selected = False
+    else:
+        selected = index is not None and _select_option_at(driver, element, index, texts[index])
+
+    if not selected and from_cache:
+        # The options may have changed since they were cached (e.g. a dependent
+        # dropdown was reloaded): read them again and retry once.
+        texts, _ = _get_option_texts(driver, element, refresh=True)
+        index, how = _match_option(texts, user_input)
+        selected = index is not None and _select_option_at(driver, element, index, texts[index])
+
+    if not selected:
+        # No match found with any approach
+        msg = f"No matching option found for '{step_value}' in <select> (all attempts)."
+        logger.error("%s", msg)
+        raise Exception(msg)
+
+    logger.debug("Selected option '%s' (%s).", texts[index], how)
+    # Check for post-selection alert, always accept
+    handle_unexpected_alerts(driver, action="accept")
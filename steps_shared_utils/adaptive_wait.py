@@ -3,71 +3,161 @@ from selenium.common.exceptions import TimeoutException
 
 # Import the update and get functions from the configuration module.
 from steps_shared_utils.step_wait_config import update_step_config, get_step_config
+from steps_shared_utils.wait_histogram import choose_timeout, choose_first_poll_delay
+from steps_shared_utils.step_timing import mark_timeout
 
-def adaptive_wait_for_action(driver, action_test_fn, max_wait=7.0, poll_interval=0.5, step_id=None, action_type=None, form_id=None, form_name=None):
+from steps_shared_utils.run_logging import get_logger
+
+logger = get_logger(__name__)
+
+# Percentile of the recorded latencies used as the timeout (times TIMEOUT_MARGIN).
+WAIT_QUANTILE = 0.95
+TIMEOUT_MARGIN = 1.5
+
+# Polling schedule: "backoff" checks immediately, then waits INITIAL_POLL_INTERVAL,
+# multiplying by BACKOFF_FACTOR after each miss up to poll_interval.
+# "fixed" waits poll_interval between every check (the old behaviour).
+POLL_STRATEGY = "backoff"
+INITIAL_POLL_INTERVAL = 0.02
+BACKOFF_FACTOR = 2.0
+
+# One round-trip readiness check: locate the element and test that it is
+# displayed and enabled, all inside the page.
+_READINESS_PROBE_JS = """
+var selectorType = arguments[0], selectorValue = arguments[1], el = null;
+try {
+    if (selectorType === 'xpath') {
+        el = document.evaluate(selectorValue, document, null, XPathResult.FIRST_ORDERED_NODE_TYPE, null).singleNodeValue;
+    } else {
+        el = document.querySelector(selectorValue);
+    }
+} catch (e) { return false; }
+if (!el || !el.getClientRects().length) { return false; }
+var cs = window.getComputedStyle(el);
+if (cs.visibility === 'hidden' || cs.display === 'none' || parseFloat(cs.opacity) === 0) { return false; }
+return !el.disabled;
+"""
+
+
+def build_readiness_probe(selector_type, selector_value):
+    """
+    Returns an action_test_fn for adaptive_wait_for_action that checks, in a single
+    WebDriver round-trip, that the element exists, is displayed and is enabled
+    (instead of find_element + is_displayed + is_enabled = three round-trips).
+    """
+    selector_type = "xpath" if (selector_type or "xpath").lower() == "xpath" else "css"
+
+    def probe(driver):
+        return bool(driver.execute_script(_READINESS_PROBE_JS, selector_type, selector_value))
+
+    return probe
+
+
+def _poll_delays(strategy, poll_interval, initial_interval=INITIAL_POLL_INTERVAL, factor=BACKOFF_FACTOR):
+    """
+    Yields the sleep before each re-check: geometric backoff capped at poll_interval,
+    or a flat poll_interval for the "fixed" strategy.
+    """
+    if strategy == "fixed":
+        while True:
+            yield poll_interval
+    delay = min(initial_interval, poll_interval)
+    while True:
+        yield delay
+        delay = min(delay * factor, poll_interval)
+
+
+def adaptive_wait_for_action(driver, action_test_fn, max_wait=7.0, poll_interval=0.5, step_id=None, action_type=None, form_id=None, form_name=None, wait_quantile=WAIT_QUANTILE, poll_strategy=POLL_STRATEGY, seed_from_history=True):
     """
     Wait adaptively for an action to become performable.
     
     This function repeatedly calls the provided action_test_fn (a non-destructive test
-    of the output action) at intervals of poll_interval seconds, up to a maximum of max_wait seconds.
+    of the output action), up to a maximum of max_wait seconds. With the default
+    "backoff" poll_strategy the first check is immediate and the gap between checks
+    grows geometrically (20 ms, 40 ms, 80 ms, ...) up to poll_interval, so an element
+    that is ready after 20 ms no longer costs a full poll_interval.
     
-    Before starting, it checks the configuration JSON for an existing optimal wait time for this
-    specific form/step/action. If found, that value is used as the max_wait. Otherwise, it defaults
-    to 7 seconds.
+    Before starting, it looks up the latency histogram recorded for this specific
+    form/step/action (see wait_histogram.py). Once enough samples exist:
+      - the timeout becomes the wait_quantile (p95 by default) latency times TIMEOUT_MARGIN,
+        never more than max_wait, and
+      - the first check is delayed until the point before which the element has
+        (almost) never been ready. A wait that is ready at that first check is
+        recorded as "early" (its real latency may be shorter), so the delay
+        comes back down when the page gets faster.
+    Without enough history (or with seed_from_history=False), max_wait is used and
+    the first check is immediate.
+
+    A wait that times out is recorded as a censored sample, not as a measurement,
+    so a single slow page does not inflate future timeouts.
     
     Parameters:
       driver         : Selenium WebDriver instance.
       action_test_fn : A callable that accepts the driver and returns True if the action can be performed.
       max_wait       : Default maximum time (in seconds) to wait (used if no config is available).
-      poll_interval  : Time (in seconds) between test attempts.
+      poll_interval  : Time (in seconds) between test attempts ("fixed"), or the cap of the backoff.
       step_id        : The unique identifier for the step (from form_steps::id_uuid).
       action_type    : The type of action (e.g., "click", "enter_text", "select_date").
       form_id        : The unique identifier for the form (if available).
       form_name      : The name of the form (if available).
+      wait_quantile  : Latency percentile used for the timeout (0.95 = p95, 0.99 = p99).
+      poll_strategy  : "backoff" (default) or "fixed".
+      seed_from_history : Delay the first check based on the recorded latencies.
       
     Returns:
       measured_wait : The time (in seconds) that it took for the action to become performable.
-                     If the action never becomes ready, returns max_wait.
+                     If the action never becomes ready, returns the timeout that was used.
     """
-    # Use the existing optimal wait time from the JSON config if available.
-    if form_id and step_id and action_type:
+    # Derive the timeout and first-poll delay from the recorded latency histogram.
+    first_poll_delay = 0.0
+    if step_id and action_type:
         existing_config = get_step_config(form_id, step_id, action_type, default_wait=max_wait)
-        if existing_config.get("optimal_wait", 0) > 0:
-            max_wait = existing_config["optimal_wait"]
-        else:
-            max_wait = max_wait  # Use the default passed in (7.0s in this case)
+        max_wait = choose_timeout(existing_config, max_wait, quantile=wait_quantile, margin=TIMEOUT_MARGIN)
+        if seed_from_history:
+            first_poll_delay = choose_first_poll_delay(existing_config)
     
-    print(f"[DEBUG adaptive_wait] Called for step_id '{step_id}', action '{action_type}', form_id '{form_id}', form_name '{form_name}' with max_wait={max_wait}s.")
-    print(f"[DEBUG adaptive_wait] Starting adaptive wait for step_id '{step_id}', action '{action_type}'. Poll interval: {poll_interval}s.")
+    logger.debug("Called for step_id '%s', action '%s', form_id '%s', form_name '%s' with max_wait=%.2fs.", step_id, action_type, form_id, form_name, max_wait)
+    logger.debug("Starting adaptive wait for step_id '%s', action '%s'. Poll strategy: %s (max interval %ss), first poll after %.2fs.", step_id, action_type, poll_strategy, poll_interval, first_poll_delay)
     
     start_time = time.time()
-    elapsed = 0
+    if first_poll_delay > 0:
+        time.sleep(min(first_poll_delay, max_wait))
+    elapsed = time.time() - start_time
     attempts = 0
     success = False
+    delays = _poll_delays(poll_strategy, poll_interval)
     
-    while elapsed < max_wait:
+    # Always test at least once, even if the first-poll delay used up the budget.
+    while True:
         attempts += 1
         try:
             if action_test_fn(driver):
                 success = True
+                elapsed = time.time() - start_time
                 break
         except Exception as e:
-            print(f"[DEBUG adaptive_wait] Attempt {attempts} raised exception: {e}")
-        time.sleep(poll_interval)
+            logger.debug("Attempt %s raised exception: %s", attempts, e)
+        elapsed = time.time() - start_time
+        if elapsed >= max_wait:
+            break
+        time.sleep(min(next(delays), max_wait - elapsed))
         elapsed = time.time() - start_time
-        print(f"[DEBUG adaptive_wait] Attempt {attempts}: elapsed time = {elapsed:.2f}s")
+        logger.debug("Attempt %s: elapsed time = %.2fs", attempts, elapsed)
     
     measured_wait = elapsed if success else max_wait
+    # Ready at the first check after the delay: the real latency was not observed.
+    early = success and attempts == 1 and first_poll_delay > 0
     if success:
-        print(f"[DEBUG adaptive_wait] Action became performable after {measured_wait:.2f}s in {attempts} attempts.")
+        logger.debug("Action became performable after %.2fs in %s attempts.", measured_wait, attempts)
     else:
-        print(f"[WARNING adaptive_wait] Action did not become performable after {max_wait}s (attempts: {attempts}). Using max_wait as measured time.")
+        logger.warning("Action did not become performable after %.2fs (attempts: %s). Recording a censored (timed-out) sample.", max_wait, attempts)
+        mark_timeout()
     
-    # Update configuration for this step and action.
+    # Update configuration for this step and action (timeouts are recorded as censored).
     if step_id and action_type:
-        update_step_config(step_id, action_type, measured_wait, form_id=form_id, form_name=form_name)
-        print(f"[DEBUG adaptive_wait] Updated wait configuration for step_id '{step_id}', action '{action_type}'.")
+        update_step_config(step_id, action_type, measured_wait, form_id=form_id, form_name=form_name, timed_out=not success, early=early)
+        logger.debug("Updated wait configuration for step_id '%s', action '%s'.", step_id, action_type)
     else:
-        print("[DEBUG adaptive_wait] step_id or action_type not provided; configuration not updated.")
+        logger.debug("step_id or action_type not provided; configuration not updated.")
     
     return measured_wait
@@ -0,0 +1,147 @@
+# E:\CRM\automation_project\steps_shared_utils\condition_engine.py
+"""
+Compiled evaluation of step conditions.
+
+A step's "condition" is either empty, one key of CONDITION_EXPRESSIONS
+("IS_MINOR_TRUE") or a JSON list of keys ('["IS_MINOR_TRUE", "HAS_SECOND_PASSPORT"]'),
+which must all hold (logical AND).
+
+Instead of parsing the condition and calling eval() on the expression source for
+every step, this module:
+  - parses each condition string once (lru_cache),
+  - compiles each registry expression once into a code object (lru_cache),
+  - memoizes the result per condition for one ConditionEvaluator, i.e. per run
+    and condition_context (call update_context() if the context changes).
+
+Debug lines are only built when asked for (the executor does so when the run
+captures debug artifacts).
+"""
+
+import json
+from functools import lru_cache
+
+from steps_shared_utils.steps_shared_conditions_registry import CONDITION_EXPRESSIONS
+
+from steps_shared_utils.run_logging import get_logger
+
+logger = get_logger(__name__)
+
+@lru_cache(maxsize=None)
+def compile_expression(expr_code):
+    """
+    Returns the compiled code object of a registry expression, or None if it does not compile.
+    """
+    try:
+        return compile(expr_code, f"<condition {expr_code!r}>", "eval")
+    except SyntaxError as e:
+        logger.warning("Could not compile condition '%s': %s", expr_code, e)
+        return None
+
+
+def _as_keys(items):
+    # Non-string entries are invalid keys; None marks them so they are skipped.
+    return tuple(item if isinstance(item, str) else None for item in items)
+
+
+@lru_cache(maxsize=1024)
+def parse_condition(expr_key):
+    """
+    Normalizes a condition string into (is_list, keys):
+      ""                    -> (False, ())
+      "IS_MINOR_TRUE"       -> (False, ("IS_MINOR_TRUE",))
+      '["A", "B"]'          -> (True, ("A", "B"))   (non-string entries become None)
+    A string that looks like a list but is not valid JSON is treated as a single key.
+    """
+    stripped = expr_key.strip()
+    if not stripped:
+        return False, ()
+    if stripped.startswith('[') and stripped.endswith(']'):
+        try:
+            parsed = json.loads(stripped)
+            if isinstance(parsed, list):
+                return True, _as_keys(parsed)
+        except ValueError:
+            pass
+    return False, (expr_key,)
+
+
+class ConditionEvaluator:
+    """
+    Evaluates step conditions against one condition_context, memoizing the results.
+    """
+
+    def __init__(self, condition_context=None):
+        self.update_context(condition_context)
+
+    def update_context(self, condition_context):
+        """
+        Replaces the context (copied once) and forgets the memoized results.
+        """
+        self._context = dict(condition_context or {})
+        self._memo = {}
+
+    def evaluate(self, expr_key, debug_lines=None):
+        """
+        Returns True if the condition holds (an empty condition always holds).
+        Pass a list as debug_lines to get a trace of the evaluation appended to it.
+        """
+        if not expr_key:
+            if debug_lines is not None:
+                debug_lines.append("No condition provided. Returning True.")
+            return True
+
+        if isinstance(expr_key, list):
+            is_list, keys = True, _as_keys(expr_key)
+        elif isinstance(expr_key, str):
+            is_list, keys = parse_condition(expr_key)
+        else:
+            if debug_lines is not None:
+                debug_lines.append("expr_key is not a valid non-empty string. Returning True.")
+            return True
+
+        memo_key = (is_list, keys)
+        if debug_lines is None and memo_key in self._memo:
+            return self._memo[memo_key]
+
+        if is_list:
+            if debug_lines is not None:
+                debug_lines.append("Condition is a list. Evaluating each condition (logical AND).")
+            result = True
+            for key in keys:
+                if not key or not key.strip():
+                    if debug_lines is not None:
+                        debug_lines.append("Skipping invalid condition key: {}".format(key))
+                    continue
+                if not self._evaluate_key(key, debug_lines):
+                    result = False
+                    break
+        elif keys:
+            result = self._evaluate_key(keys[0], debug_lines)
+        else:
+            result = True
+
+        if debug_lines is not None:
+            debug_lines.append("Returning {}.".format(result))
+        self._memo[memo_key] = result
+        return result
+
+    def _evaluate_key(self, key, debug_lines):
+        expr_code = CONDITION_EXPRESSIONS.get(key, "")
+        if debug_lines is not None:
+            debug_lines.append("Evaluating key: '{}' -> Expression: '{}'".format(key, expr_code))
+        if not expr_code:
+            if debug_lines is not None:
+                debug_lines.append("[WARNING] Condition key '{}' not found in registry.".format(key))
+            return False
+        code = compile_expression(expr_code)
+        if code is None:
+            return False
+        try:
+            result = bool(eval(code, {"__builtins__": {}}, self._context))
+        except Exception as e:
+            if debug_lines is not None:
+                debug_lines.append("[WARNING] Could not eval condition '{}' from key '{}': {}".format(expr_code, key, e))
+            return False
+        if debug_lines is not None:
+            debug_lines.append("Result of '{}' with context {}: {}".format(expr_code, self._context, result))
+        return result
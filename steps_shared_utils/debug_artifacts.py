@@ -0,0 +1,184 @@
+# E:\CRM\automation_project\steps_shared_utils\debug_artifacts.py
+"""
+Debug artifacts of a run (received input, condition traces, ...).
+
+The executor used to pretty-print the whole steps payload to a .txt file and
+open it with os.startfile() on every run and on every conditional step. That is
+synchronous disk I/O in the step loop, and os.startfile does not exist on Linux.
+
+Now artifacts are:
+  - off by default: enable with STEP_DEBUG_ARTIFACTS=1, or per run with
+    debug_run(enabled=True) (main runner: --debug, jobs: "debug": True),
+  - built lazily: pass a callable and it is only called when the run captures,
+  - written by one background thread into debug_runs/<run_id>/,
+  - capped: MAX_ARTIFACT_BYTES per file, MAX_RUN_BYTES per run, and only the
+    newest MAX_RUN_DIRS run directories are kept.
+
+STEP_DEBUG_OPEN=1 additionally opens each written file (Windows desktops only).
+"""
+
+import atexit
+import os
+import queue
+import shutil
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+
+from steps_shared_utils.run_logging import get_logger
+
+logger = get_logger(__name__)
+
+DEBUG_ARTIFACTS_ENABLED = os.getenv("STEP_DEBUG_ARTIFACTS", "0") == "1"
+DEBUG_OPEN_ARTIFACTS = os.getenv("STEP_DEBUG_OPEN", "0") == "1"
+
+# debug_runs/ in the project root, unless STEP_DEBUG_DIR says otherwise.
+DEBUG_RUNS_DIR = os.getenv(
+    "STEP_DEBUG_DIR",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "debug_runs"),
+)
+
+MAX_ARTIFACT_BYTES = 1024 * 1024
+MAX_RUN_BYTES = 20 * 1024 * 1024
+MAX_RUN_DIRS = 20
+
+_TRUNCATED_NOTE = "\n... [truncated by debug_artifacts: MAX_ARTIFACT_BYTES reached]\n"
+
+_LOCAL = threading.local()
+_QUEUE = queue.Queue()
+_WRITER = None
+_WRITER_LOCK = threading.Lock()
+
+
+class _DebugRun:
+    def __init__(self, run_id):
+        self.run_id = run_id
+        self.directory = os.path.join(DEBUG_RUNS_DIR, run_id)
+        self.bytes_written = 0
+        self.capped = False
+
+
+def _current_run():
+    return getattr(_LOCAL, "run", None)
+
+
+def debug_enabled():
+    """
+    True if the run executing in this thread captures debug artifacts.
+    """
+    return _current_run() is not None
+
+
+@contextmanager
+def debug_run(enabled=None, run_id=None):
+    """
+    Starts capturing debug artifacts for the run executing in this thread.
+
+      enabled : True/False to opt in/out for this run; None uses STEP_DEBUG_ARTIFACTS.
+      run_id  : Directory name under DEBUG_RUNS_DIR (default: timestamp + short uuid).
+
+    Nested use (e.g. the main runner and then run_steps_crm_format) keeps the
+    outer run. Yields the run id, or None when the run does not capture.
+    """
+    if _current_run() is not None:
+        yield _current_run().run_id
+        return
+    if enabled is None:
+        enabled = DEBUG_ARTIFACTS_ENABLED
+    if not enabled:
+        yield None
+        return
+
+    run = _DebugRun(run_id or time.strftime("%Y%m%d-%H%M%S-") + uuid.uuid4().hex[:8])
+    _LOCAL.run = run
+    _enqueue(("rotate", None, None, None))
+    logger.debug("Capturing debug artifacts in %s", run.directory)
+    try:
+        yield run.run_id
+    finally:
+        _LOCAL.run = None
+
+
+def write_debug_artifact(name, content, append=False):
+    """
+    Queues 'content' for debug_runs/<run_id>/<name>. Does nothing (and does not
+    build the content) when the current run does not capture.
+
+      content : str, list of lines, or a callable returning either (built lazily).
+      append  : Append to the file instead of replacing it.
+    """
+    run = _current_run()
+    if run is None or run.capped:
+        return
+    if callable(content):
+        content = content()
+    if isinstance(content, (list, tuple)):
+        content = "\n".join(str(line) for line in content)
+    data = content.encode("utf-8", errors="replace")
+    if len(data) > MAX_ARTIFACT_BYTES:
+        data = data[:MAX_ARTIFACT_BYTES] + _TRUNCATED_NOTE.encode("utf-8")
+    if run.bytes_written + len(data) > MAX_RUN_BYTES:
+        run.capped = True
+        logger.warning("Run '%s' reached MAX_RUN_BYTES; no more artifacts are written.", run.run_id)
+        return
+    run.bytes_written += len(data)
+    _enqueue(("write", run.directory, name, (data, append)))
+
+
+def flush_debug_artifacts(timeout=5.0):
+    """
+    Waits (up to 'timeout' seconds) until the queued artifacts are on disk.
+    """
+    deadline = time.time() + timeout
+    while _QUEUE.unfinished_tasks and time.time() < deadline:
+        time.sleep(0.02)
+
+
+def _enqueue(item):
+    global _WRITER
+    with _WRITER_LOCK:
+        if _WRITER is None:
+            _WRITER = threading.Thread(target=_writer_loop, name="debug-artifacts", daemon=True)
+            _WRITER.start()
+            atexit.register(flush_debug_artifacts)
+    _QUEUE.put(item)
+
+
+def _writer_loop():
+    while True:
+        kind, directory, name, payload = _QUEUE.get()
+        try:
+            if kind == "rotate":
+                _rotate_run_dirs()
+            else:
+                data, append = payload
+                os.makedirs(directory, exist_ok=True)
+                path = os.path.join(directory, name)
+                with open(path, "ab" if append else "wb") as f:
+                    f.write(data)
+                    if append:
+                        f.write(b"\n")
+                if DEBUG_OPEN_ARTIFACTS and hasattr(os, "startfile"):
+                    os.startfile(path)
+        except Exception as e:
+            logger.error("Could not write debug artifact '%s': %s", name, e)
+        finally:
+            _QUEUE.task_done()
+
+
+def _rotate_run_dirs():
+    """
+    Deletes the oldest run directories so that at most MAX_RUN_DIRS remain
+    (the run just started has not created its directory yet).
+    """
+    if not os.path.isdir(DEBUG_RUNS_DIR):
+        return
+    run_dirs = [
+        os.path.join(DEBUG_RUNS_DIR, entry)
+        for entry in os.listdir(DEBUG_RUNS_DIR)
+        if os.path.isdir(os.path.join(DEBUG_RUNS_DIR, entry))
+    ]
+    run_dirs.sort(key=os.path.getmtime)
+    for old_dir in run_dirs[:max(0, len(run_dirs) - (MAX_RUN_DIRS - 1))]:
+        shutil.rmtree(old_dir, ignore_errors=True)
@@ -1,62 +1,108 @@
 # E:\CRM\automation_project\steps_shared_utils\element_utils.py
 
+import os
+import json
+import threading
+import time
+from selenium.common.exceptions import (
+    InvalidSelectorException,
+    JavascriptException,
+    StaleElementReferenceException,
+    TimeoutException,
+    WebDriverException,
+)
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 
-def find_element(driver, primary_selector_type, primary_selector_value, fallback_selectors=None, wait_time=5, extracted_info=None):
+from steps_shared_utils.run_logging import get_logger
+from steps_shared_utils.step_timing import timed_span, mark_timeout
+
+logger = get_logger(__name__)
+
+# "race" evaluates every candidate selector in one injected script per poll, bounded
+# by a single overall deadline; "sequential" waits up to wait_time per candidate.
+FIND_STRATEGY = os.getenv("STEP_FIND_STRATEGY", "race")
+
+# "race": seconds during which only the first candidate (the primary selector, or
+# the cache's proven one) may match, so a broad fallback already in the DOM does
+# not win over a primary that renders a moment later.
+FIND_PRIMARY_GRACE = float(os.getenv("STEP_FIND_PRIMARY_GRACE", "1.0"))
+
+# Returns [element, index] for the first candidate (in priority order) that matches,
+# or null if none does yet. Only the first candidate is checked until arguments[1]
+# is true; the other candidates must match exactly one element (an ambiguous
+# fallback is skipped). Invalid selectors are skipped.
+_RACE_SELECTORS_JS = """
+var candidates = arguments[0], allowFallbacks = arguments[1];
+var limit = allowFallbacks ? candidates.length : Math.min(candidates.length, 1);
+for (var i = 0; i < limit; i++) {
+    var type = candidates[i][0], value = candidates[i][1], el = null, count = 0;
+    try {
+        if (type === 'xpath') {
+            var snapshot = document.evaluate(value, document, null, XPathResult.ORDERED_NODE_SNAPSHOT_TYPE, null);
+            count = snapshot.snapshotLength;
+            el = count ? snapshot.snapshotItem(0) : null;
+        } else {
+            var matches = document.querySelectorAll(value);
+            count = matches.length;
+            el = count ? matches[0] : null;
+        }
+    } catch (e) { el = null; }
+    if (el && el.nodeType === 1 && (i === 0 || count === 1)) { return [el, i]; }
+}
+return null;
+"""
+
+# The step currently being executed by this thread (see set_active_step).
+_ACTIVE_STEP = threading.local()
+
+
+def set_active_step(step, fallback_selectors=None):
     """
-    Attempts to locate an element using a primary selector, manual fallback selectors,
-    and additional automatically generated selectors from the extracted_info.
-    
-    Parameters:
-      driver: The Selenium WebDriver instance.
-      primary_selector_type: A string indicating the type of the primary selector ("xpath" or "css").
-      primary_selector_value: The primary selector string.
-      fallback_selectors: (Optional) A list of tuples [(selector_type, selector_value), ...]
-                          that will be attempted in order if the primary selector fails.
-      wait_time: Maximum time in seconds to wait for each selector (default is 5 seconds).
-      extracted_info: (Optional) A dictionary with extra information about the element as extracted
-                      during selection. Expected keys include:
-                        - "xpath"
-                        - "css_selector"
-                        - "tag_name"
-                        - "attributes" (may include "id", "name", "placeholder", etc.)
-                        - "dataset" (the element.dataset object)
-                        - "parent_info": A dictionary that may contain "css_selector"
-                        - "text_content"
-    
-    Returns:
-      The first WebElement found using one of the provided or derived selectors.
-    
-    Raises:
-      Exception if no element is found using any of the provided or derived selectors.
-    
-    Example:
-      extracted = {
-          "xpath": "//*[@id='email']",
-          "css_selector": "input#email",
-          "tag_name": "input",
-          "attributes": {
-              "id": "email",
-              "name": "email",
-              "placeholder": "Email"
-          },
-          "dataset": {},
-          "parent_info": { "css_selector": "div#emailContainer" },
-          "text_content": ""
-      }
-      
-      element = find_element(
-          driver,
-          "xpath", "//*[@id='email']",
-          fallback_selectors=[
-              ("css", "input[placeholder='Email']"),
-              ("css", "div#email > app-text-input input[placeholder='Email']")
-          ],
-          wait_time=5,
-          extracted_info=extracted
-      )
+    Tells find_element() which step is running in this thread. Lookups of that
+    step's own selector then also use its element_attributes for derived fallbacks
+    and go through the self-healing selector cache (keyed by the step's id_uuid).
+
+    fallback_selectors: (Optional) the candidates already derived by the execution
+    plan; they are used as-is instead of being derived again on every lookup.
+    """
+    _ACTIVE_STEP.step = step
+    _ACTIVE_STEP.fallback_selectors = fallback_selectors
+
+
+def clear_active_step():
+    _ACTIVE_STEP.step = None
+    _ACTIVE_STEP.fallback_selectors = None
+
+
+def _active_step_for(selector_type, selector_value):
+    """
+    Returns the active step if (selector_type, selector_value) is its own selector.
+    """
+    step = getattr(_ACTIVE_STEP, "step", None)
+    if not step or not step.get("id_uuid") or step.get("selector_value") != selector_value:
+        return None
+    if (step.get("selector_type") or "xpath").lower() != (selector_type or "").lower():
+        return None
+    return step
+
+
+def get_step_element_attributes(step):
+    attributes = step.get("element_attributes")
+    if isinstance(attributes, str):
+        try:
+            attributes = json.loads(attributes)
+        except ValueError:
+            return None
+    return attributes if isinstance(attributes, dict) else None
+
+
+def build_selector_candidates(primary_selector_type, primary_selector_value, fallback_selectors=None, extracted_info=None):
+    """
+    Returns the ordered list of (selector_type, selector_value) candidates for an element:
+    the primary selector, the manual fallbacks, then selectors derived from extracted_info
+    (see find_element for the expected keys). Duplicates are dropped.
     """
     # Start with the primary selector.
     selectors = [(primary_selector_type, primary_selector_value)]
@@ -123,7 +169,182 @@ def find_element(driver, primary_selector_type, primary_selector_value, fallback
             candidate = ("xpath", f"//*[contains(normalize-space(text()), '{text_content}')]")
             if not any(sel[0].lower() == "xpath" and sel[1] == candidate[1] for sel in selectors):
                 selectors.append(candidate)
+
+    return selectors
+
+
+def find_element(driver, primary_selector_type, primary_selector_value, fallback_selectors=None, wait_time=5, extracted_info=None, strategy=None):
+    """
+    Attempts to locate an element using a primary selector, manual fallback selectors,
+    and additional automatically generated selectors from the extracted_info.
+
+    With the default "race" strategy all candidates are checked together in one
+    injected script per poll (the first candidate in priority order that matches wins),
+    so the worst case is wait_time instead of N x wait_time. The first candidate
+    gets a head start (STEP_FIND_PRIMARY_GRACE seconds) before any fallback may
+    win, and a fallback only wins when it matches a single element. The
+    "sequential" strategy tries each candidate with its own wait_time, as before.
+    
+    Parameters:
+      driver: The Selenium WebDriver instance.
+      primary_selector_type: A string indicating the type of the primary selector ("xpath" or "css").
+      primary_selector_value: The primary selector string.
+      fallback_selectors: (Optional) A list of tuples [(selector_type, selector_value), ...]
+                          that will be attempted in order if the primary selector fails.
+      wait_time: Maximum time in seconds to wait (overall for "race", per selector for
+                 "sequential"; default is 5 seconds).
+      extracted_info: (Optional) A dictionary with extra information about the element as extracted
+                      during selection. Expected keys include:
+                        - "xpath"
+                        - "css_selector"
+                        - "tag_name"
+                        - "attributes" (may include "id", "name", "placeholder", etc.)
+                        - "dataset" (the element.dataset object)
+                        - "parent_info": A dictionary that may contain "css_selector"
+                        - "text_content"
+      strategy: (Optional) "race" or "sequential"; defaults to FIND_STRATEGY.
     
+    Returns:
+      The first WebElement found using one of the provided or derived selectors.
+    
+    Raises:
+      Exception if no element is found using any of the provided or derived selectors.
+    
+    Example:
+      extracted = {
+          "xpath": "//*[@id='email']",
+          "css_selector": "input#email",
+          "tag_name": "input",
+          "attributes": {
+              "id": "email",
+              "name": "email",
+              "placeholder": "Email"
+          },
+          "dataset": {},
+          "parent_info": { "css_selector": "div#emailContainer" },
+          "text_content": ""
+      }
+      
+      element = find_element(
+          driver,
+          "xpath", "//*[@id='email']",
+          fallback_selectors=[
+              ("css", "input[placeholder='Email']"),
+              ("css", "div#email > app-text-input input[placeholder='Email']")
+          ],
+          wait_time=5,
+          extracted_info=extracted
+      )
+    """
+    element, _ = find_element_with_selector(
+        driver,
+        primary_selector_type,
+        primary_selector_value,
+        fallback_selectors=fallback_selectors,
+        wait_time=wait_time,
+        extracted_info=extracted_info,
+        strategy=strategy,
+    )
+    return element
+
+
+def find_element_with_selector(driver, primary_selector_type, primary_selector_value, fallback_selectors=None, wait_time=5, extracted_info=None, strategy=None):
+    """
+    Same as find_element(), but returns (element, (selector_type, selector_value))
+    so the caller knows which candidate actually matched.
+
+    When the primary selector is the active step's own selector (see set_active_step),
+    the candidates are reordered by the selector cache and the outcome is recorded there.
+    """
+    step = _active_step_for(primary_selector_type, primary_selector_value)
+    planned_fallbacks = getattr(_ACTIVE_STEP, "fallback_selectors", None) if step else None
+    if step and fallback_selectors is None and extracted_info is None and planned_fallbacks is not None:
+        selectors = [(primary_selector_type, primary_selector_value)] + list(planned_fallbacks)
+    else:
+        if step and extracted_info is None:
+            extracted_info = get_step_element_attributes(step)
+        selectors = build_selector_candidates(
+            primary_selector_type,
+            primary_selector_value,
+            fallback_selectors=fallback_selectors,
+            extracted_info=extracted_info,
+        )
+
+    cache = None
+    if step:
+        # Imported here to keep element_utils free of file I/O at import time.
+        from steps_shared_utils.selector_cache import get_selector_cache
+        cache = get_selector_cache()
+        selectors = cache.order_candidates(step["id_uuid"], selectors)
+
+    strategy = (strategy or FIND_STRATEGY).lower()
+    start_time = time.monotonic()
+    with timed_span("locate"):
+        try:
+            if strategy == "race":
+                element, matched = _race_selectors(driver, selectors, wait_time)
+            else:
+                element, matched = _try_selectors_sequentially(driver, selectors, wait_time)
+        except WebDriverException:
+            # Alert, dead session, ...: not a lookup timeout and says nothing about the selectors.
+            raise
+        except Exception:
+            # No candidate matched within wait_time: the whole lookup was a timeout.
+            mark_timeout()
+            if cache:
+                cache.record(step["id_uuid"], selectors, None, time.monotonic() - start_time)
+            raise
+
+    if cache:
+        cache.record(
+            step["id_uuid"], selectors, matched, time.monotonic() - start_time,
+            primary=(primary_selector_type, primary_selector_value),
+        )
+    return element, matched
+
+
+def _race_selectors(driver, selectors, wait_time):
+    """
+    Polls all candidates in one script call until one matches or wait_time runs out.
+    Fallbacks are only accepted once the first candidate had FIND_PRIMARY_GRACE
+    seconds (at most half of wait_time) to appear.
+    """
+    candidates = []
+    for sel_type, sel_value in selectors:
+        sel_type = (sel_type or "").lower()
+        if sel_type not in ("xpath", "css"):
+            logger.debug("find_element: Skipping unsupported selector_type '%s' ('%s').", sel_type, sel_value)
+            continue
+        if sel_value:
+            candidates.append([sel_type, sel_value])
+
+    if candidates:
+        start = time.monotonic()
+        # Leave the fallbacks part of the wait even when wait_time is short.
+        grace = min(FIND_PRIMARY_GRACE, wait_time / 2)
+        # Only "not there yet" is retried or turned into the no-element error; alerts,
+        # dead sessions and the like propagate unchanged so retry_policy sees them.
+        wait = WebDriverWait(
+            driver, wait_time, poll_frequency=0.1,
+            ignored_exceptions=(JavascriptException, StaleElementReferenceException),
+        )
+        try:
+            element, index = wait.until(
+                lambda d: d.execute_script(_RACE_SELECTORS_JS, candidates, time.monotonic() - start >= grace) or False
+            )
+            if index > 0:
+                logger.debug("find_element: Primary selector failed; matched fallback %s '%s'.", candidates[index][0], candidates[index][1])
+            return element, tuple(candidates[index])
+        except TimeoutException as e:
+            logger.debug("find_element: No element found using any of %s selector(s) within %ss: %s", len(candidates), wait_time, e)
+
+    raise Exception("find_element: No element found using the provided selectors.")
+
+
+def _try_selectors_sequentially(driver, selectors, wait_time):
+    """
+    Tries each candidate in order, waiting up to wait_time for each one.
+    """
     # print(f"[DEBUG] find_element: Trying the following selectors in order: {selectors}")
     
     # Iterate through the list of selectors.
@@ -137,8 +358,9 @@ def find_element(driver, primary_selector_type, primary_selector_value, fallback
             else:
                 raise ValueError(f"Unsupported selector_type: {sel_type}")
             # print(f"[DEBUG] find_element: Found element using {sel_type} '{sel_value}'.")
-            return element
-        except Exception as e:
-            print(f"[DEBUG] find_element: No element found using {sel_type} '{sel_value}': {e}")
+            return element, (sel_type.lower(), sel_value)
+        except (TimeoutException, JavascriptException, StaleElementReferenceException,
+                InvalidSelectorException, ValueError) as e:
+            logger.debug("find_element: No element found using %s '%s': %s", sel_type, sel_value, e)
     
     raise Exception("find_element: No element found using the provided selectors.")
@@ -0,0 +1,343 @@
+# E:\CRM\automation_project\steps_shared_utils\execution_checkpoints.py
+"""
+Step-level checkpoints of a run, so a crashed run resumes where it stopped.
+
+Checkpoints are written for runs that ask for them: resume=True (main runner
+and batch runner --resume; with nothing to resume the run starts at step 1 and
+records one), an execution input with its own "checkpoint_key", or every run
+when STEP_CHECKPOINTS=1. After every completed step the executor then writes
+<key>.json to the checkpoint directory (atomically: temp file + os.replace).
+The file holds:
+
+  - the completed steps (step_order, step_id, action, seconds)
+  - the values captured so far (EXECUTION_CONTEXT: REQUEST_NUMBER, last_ocr_result, ...)
+  - the browser state: current URL, cookies, localStorage and sessionStorage
+
+The files therefore contain the client's session cookies and tokens, i.e.
+credentials. They are only readable by the current user (directory 0700,
+files 0600, on systems with POSIX permissions), and a checkpoint older than
+STEP_CHECKPOINT_MAX_AGE is neither resumed nor kept: it is deleted when a run
+looks for it and whenever a new checkpoint is started.
+
+A resumed run loads the checkpoint of the same execution input, restores the
+captured values and the browser state, and continues with the first step after
+the last completed one. A checkpoint is removed when its run completes; a
+failed run keeps it (up to STEP_CHECKPOINT_MAX_AGE) for the next attempt.
+
+The key of a checkpoint is derived from the execution input (form id, steps with
+their client values, condition_context), so re-submitting the same input finds
+it. An input may set its own "checkpoint_key" (e.g. the CRM's application id).
+
+Configuration (environment):
+  STEP_CHECKPOINTS         : "1" to checkpoint every run (default "0": only on request).
+  STEP_CHECKPOINT_DIR      : Directory of the checkpoint files (default: <project>/execution_checkpoints).
+  STEP_CHECKPOINT_KEEP     : "1" to keep the checkpoint of a completed run.
+  STEP_CHECKPOINT_MAX_AGE  : Seconds after which a checkpoint is deleted (default 86400).
+"""
+
+import hashlib
+import json
+import os
+import re
+import tempfile
+import time
+from urllib.parse import urlsplit
+
+from steps_shared_utils.execution_context import EXECUTION_CONTEXT
+
+from steps_shared_utils.run_logging import get_logger
+
+logger = get_logger(__name__)
+
+CHECKPOINTS_ENABLED = os.getenv("STEP_CHECKPOINTS", "0") == "1"
+CHECKPOINT_KEEP_COMPLETED = os.getenv("STEP_CHECKPOINT_KEEP", "0") == "1"
+CHECKPOINT_MAX_AGE = float(os.getenv("STEP_CHECKPOINT_MAX_AGE", "86400"))
+
+# execution_checkpoints/ in the project root, unless STEP_CHECKPOINT_DIR says otherwise.
+CHECKPOINT_DIR = os.getenv(
+    "STEP_CHECKPOINT_DIR",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "execution_checkpoints"),
+)
+
+CHECKPOINT_VERSION = 1
+
+# One round trip for the URL and both storages.
+_SNAPSHOT_SCRIPT = """
+function dump(storage) {
+  var values = {};
+  try {
+    for (var i = 0; i < storage.length; i++) {
+      var key = storage.key(i);
+      values[key] = storage.getItem(key);
+    }
+  } catch (e) {}
+  return values;
+}
+return {url: window.location.href, local: dump(window.localStorage), session: dump(window.sessionStorage)};
+"""
+
+_RESTORE_STORAGE_SCRIPT = """
+var local = arguments[0], session = arguments[1];
+try {
+  for (var key in local) { window.localStorage.setItem(key, local[key]); }
+  for (var key in session) { window.sessionStorage.setItem(key, session[key]); }
+} catch (e) {}
+"""
+
+
+def input_fingerprint(steps_data, condition_context=None, form=None):
+    """
+    Hash of one execution input (steps with their client values, condition_context,
+    form id). A checkpoint is only resumed for the same input.
+    """
+    raw = json.dumps(
+        {
+            "form_id": (form or {}).get("id_uuid"),
+            "steps": steps_data.get("steps", []),
+            "condition_context": condition_context or {},
+        },
+        sort_keys=True,
+        default=str,
+    ).encode("utf-8")
+    return hashlib.sha1(raw).hexdigest()
+
+
+def checkpoint_key(steps_data, condition_context=None, form=None, key=None):
+    """
+    The file name (without .json) of the checkpoint of an execution input:
+    'key' when given, else "<form id>-<input fingerprint>".
+    """
+    if key:
+        return re.sub(r"[^A-Za-z0-9_.-]", "_", str(key))
+    form_id = re.sub(r"[^A-Za-z0-9_.-]", "_", str((form or {}).get("id_uuid") or "form"))
+    return f"{form_id}-{input_fingerprint(steps_data, condition_context, form)[:16]}"
+
+
+def checkpoint_path(key, directory=None):
+    return os.path.join(directory or CHECKPOINT_DIR, f"{key}.json")
+
+
+def _is_expired(path, now=None):
+    try:
+        return (now or time.time()) - os.path.getmtime(path) > CHECKPOINT_MAX_AGE
+    except OSError:
+        return False
+
+
+def purge_expired_checkpoints(directory=None):
+    """
+    Deletes the checkpoints older than STEP_CHECKPOINT_MAX_AGE (and leftover
+    temp files). Returns the number of files deleted.
+    """
+    directory = directory or CHECKPOINT_DIR
+    try:
+        names = os.listdir(directory)
+    except OSError:
+        return 0
+    now = time.time()
+    removed = 0
+    for name in names:
+        if not (name.endswith(".json") or name.startswith(".checkpoint.")):
+            continue
+        path = os.path.join(directory, name)
+        if _is_expired(path, now):
+            try:
+                os.remove(path)
+                removed += 1
+            except OSError as e:
+                logger.error("Failed to remove expired checkpoint '%s': %s", path, e)
+    if removed:
+        logger.info("Removed %s expired checkpoint file(s) from '%s'.", removed, directory)
+    return removed
+
+
+def load_checkpoint(key, fingerprint=None, directory=None):
+    """
+    Returns the checkpoint dict stored under 'key', or None (missing, unreadable,
+    expired, or written for another input than 'fingerprint').
+    """
+    path = checkpoint_path(key, directory)
+    if not os.path.exists(path):
+        return None
+    if _is_expired(path):
+        logger.warning("Ignoring checkpoint '%s': it is older than %ss.", path, CHECKPOINT_MAX_AGE)
+        remove_checkpoint(key, directory)
+        return None
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            checkpoint = json.load(f)
+    except Exception as e:
+        logger.error("Failed to load checkpoint '%s': %s", path, e)
+        return None
+    if checkpoint.get("version") != CHECKPOINT_VERSION:
+        logger.warning("Ignoring checkpoint '%s' of version %s.", path, checkpoint.get("version"))
+        return None
+    if fingerprint and checkpoint.get("input_fingerprint") != fingerprint:
+        logger.warning("Ignoring checkpoint '%s': it was written for a different execution input.", path)
+        return None
+    return checkpoint
+
+
+def remove_checkpoint(key, directory=None):
+    path = checkpoint_path(key, directory)
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+    except OSError as e:
+        logger.error("Failed to remove checkpoint '%s': %s", path, e)
+
+
+def _write_atomic(path, data):
+    directory = os.path.dirname(path) or "."
+    if not os.path.isdir(directory):
+        os.makedirs(directory, mode=0o700, exist_ok=True)
+        os.chmod(directory, 0o700)
+    # mkstemp() creates the file readable by the current user only (0600).
+    fd, tmp_path = tempfile.mkstemp(prefix=".checkpoint.", suffix=".tmp", dir=directory)
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(data, f, indent=2, default=str)
+        os.replace(tmp_path, path)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def snapshot_browser_state(driver):
+    """
+    Returns {"url", "cookies", "local_storage", "session_storage"} of the current page.
+    Parts that cannot be read are left empty.
+    """
+    state = {"url": None, "cookies": [], "local_storage": {}, "session_storage": {}}
+    try:
+        page = driver.execute_script(_SNAPSHOT_SCRIPT) or {}
+        state["url"] = page.get("url")
+        state["local_storage"] = page.get("local") or {}
+        state["session_storage"] = page.get("session") or {}
+    except Exception as e:
+        logger.debug("Could not read the page storage for the checkpoint: %s", e)
+    try:
+        state["cookies"] = driver.get_cookies()
+    except Exception as e:
+        logger.debug("Could not read the cookies for the checkpoint: %s", e)
+    return state
+
+
+def restore_browser_state(driver, state):
+    """
+    Puts a snapshot_browser_state() back into the browser: opens the site, adds
+    the cookies and storage, then loads the saved URL.
+    """
+    url = (state or {}).get("url")
+    if not url or not url.startswith(("http://", "https://")):
+        logger.warning("Checkpoint has no page URL; the browser state is not restored.")
+        return
+    origin = "{0.scheme}://{0.netloc}/".format(urlsplit(url))
+    driver.get(origin)
+    restored = 0
+    for cookie in state.get("cookies") or []:
+        # Cookies can only be added for the domain of the open page.
+        cookie = {k: v for k, v in cookie.items() if k != "sameSite" or v in ("Strict", "Lax", "None")}
+        try:
+            driver.add_cookie(cookie)
+            restored += 1
+        except Exception as e:
+            logger.debug("Skipping cookie '%s': %s", cookie.get("name"), e)
+    try:
+        driver.execute_script(_RESTORE_STORAGE_SCRIPT, state.get("local_storage") or {}, state.get("session_storage") or {})
+    except Exception as e:
+        logger.debug("Could not restore the page storage: %s", e)
+    driver.get(url)
+    logger.info("Restored browser state: %s cookie(s), page '%s'.", restored, url)
+
+
+def next_step_after(steps, last_completed_step):
+    """
+    The step_order to resume from: the first one after 'last_completed_step'
+    (None when every step was completed).
+    """
+    remaining = sorted(
+        int(step.get("step_order", 0)) for step in steps
+        if int(step.get("step_order", 0)) > int(last_completed_step)
+    )
+    return remaining[0] if remaining else None
+
+
+class CheckpointRecorder:
+    """
+    Writes the checkpoint of one run after every completed step. Expired
+    checkpoints of other runs are deleted when a recorder is created.
+    """
+
+    def __init__(self, key, fingerprint, run_id=None, form_id=None, previous=None, directory=None):
+        purge_expired_checkpoints(directory)
+        self.key = key
+        self.path = checkpoint_path(key, directory)
+        self.directory = directory
+        self.data = {
+            "version": CHECKPOINT_VERSION,
+            "key": key,
+            "input_fingerprint": fingerprint,
+            "form_id": form_id,
+            "run_ids": list((previous or {}).get("run_ids", [])) + [run_id],
+            "status": "running",
+            "updated_at": None,
+            "last_completed_step": (previous or {}).get("last_completed_step"),
+            "completed_steps": list((previous or {}).get("completed_steps", [])),
+            "execution_context": dict((previous or {}).get("execution_context", {})),
+            "browser": (previous or {}).get("browser"),
+        }
+
+    def record_step(self, driver, step_order, step_id=None, action=None, seconds=None):
+        """
+        Saves the state after step 'step_order' completed. A checkpoint that
+        cannot be written is logged and never fails the run.
+        """
+        self.data["last_completed_step"] = step_order
+        self.data["completed_steps"].append({
+            "step_order": step_order,
+            "step_id": step_id,
+            "action": action,
+            "seconds": seconds,
+            "finished_at": time.time(),
+        })
+        self.data["execution_context"] = dict(EXECUTION_CONTEXT)
+        self.data["browser"] = snapshot_browser_state(driver)
+        self._save()
+
+    def finish(self, status):
+        """
+        Completed runs drop their checkpoint (unless STEP_CHECKPOINT_KEEP=1);
+        failed runs keep it for resuming.
+        """
+        self.data["status"] = status
+        if status == "completed" and not CHECKPOINT_KEEP_COMPLETED:
+            remove_checkpoint(self.key, self.directory)
+        elif self.data["completed_steps"]:
+            self._save()
+
+    def _save(self):
+        self.data["updated_at"] = time.time()
+        try:
+            _write_atomic(self.path, self.data)
+        except Exception as e:
+            logger.error("Failed to write checkpoint '%s': %s", self.path, e)
+
+
+def prepare_resume(driver, steps_data, checkpoint, start_step=1):
+    """
+    Restores the captured values and the browser state of 'checkpoint' and
+    returns the step_order to continue from (None = nothing left to run).
+    """
+    EXECUTION_CONTEXT.update(checkpoint.get("execution_context") or {})
+    last_completed = checkpoint.get("last_completed_step")
+    if last_completed is None:
+        return start_step
+    resume_step = next_step_after(steps_data.get("steps", []), last_completed)
+    if resume_step is None:
+        return None
+    restore_browser_state(driver, checkpoint.get("browser"))
+    logger.info("Resuming at step #%s (step #%s was the last completed one).", resume_step, last_completed)
+    return max(start_step, resume_step)
@@ -0,0 +1,58 @@
+# E:\CRM\automation_project\steps_shared_utils\execution_context.py
+"""
+Per-job storage for values captured while a form runs (OCR text, request number, ...).
+
+The actions used to keep these values in plain module-level dicts. That is fine
+while one process runs one form, but once several jobs run in parallel threads
+the jobs would overwrite each other's values. ThreadLocalContext behaves like a
+dict, but every thread sees its own copy, so each worker thread (= one job)
+keeps its captured values isolated.
+"""
+
+import threading
+from collections.abc import MutableMapping
+
+
+class ThreadLocalContext(MutableMapping):
+    """
+    A dict-like object whose contents are private to the calling thread.
+    """
+
+    def __init__(self):
+        self._local = threading.local()
+
+    def _data(self):
+        data = getattr(self._local, "data", None)
+        if data is None:
+            data = {}
+            self._local.data = data
+        return data
+
+    def __getitem__(self, key):
+        return self._data()[key]
+
+    def __setitem__(self, key, value):
+        self._data()[key] = value
+
+    def __delitem__(self, key):
+        del self._data()[key]
+
+    def __iter__(self):
+        return iter(self._data())
+
+    def __len__(self):
+        return len(self._data())
+
+    def __repr__(self):
+        return f"ThreadLocalContext({self._data()!r})"
+
+
+# Shared by all actions that need to pass captured values to later steps.
+EXECUTION_CONTEXT = ThreadLocalContext()
+
+
+def reset_execution_context():
+    """
+    Clears the values captured by the current thread (call before starting a new job).
+    """
+    EXECUTION_CONTEXT.clear()
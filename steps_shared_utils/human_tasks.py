@@ -0,0 +1,415 @@
+# E:\CRM\automation_project\steps_shared_utils\human_tasks.py
+"""
+Human-in-the-loop tasks for the manual, safe and email-link steps.
+
+Those steps used to open a blocking Tk window inside the executor thread: one
+dialog per process, and every other job idle until the operator clicked. Now
+such a step posts a HumanTask (description, checklist, a screenshot of the
+browser) to a process-wide queue and waits for the answer; only its own job
+waits. An operator console services the tasks of every worker:
+
+  - the execution service serves it at http://127.0.0.1:<port>/console
+  - the batch runner starts it with --console=<port>
+  - start_operator_console(port) starts it anywhere else
+
+While no console is running (e.g. the one-shot main runner), a step falls back
+to its Tk dialog; dialogs of parallel jobs are shown one after the other.
+
+The queue lives in one process: worker processes (the parallel runner's
+"process" mode) cannot reach the console of their parent and always use the
+Tk dialogs (see reset_for_worker_process).
+
+Usage (inside an action handler):
+
+    response = request_human_task(
+        driver, "manual", step,
+        title="Manual Step",
+        instructions="Perform the action in the browser, then continue.",
+        fallback=lambda: _show_manual_dialog(description),
+    )
+    response["notes"]   # the operator's notes
+
+A cancelled task raises HumanTaskCancelled.
+
+Configuration (environment):
+  STEP_HUMAN_TASKS        : "auto" (default: console when one runs, else Tk), "console" or "tk".
+  STEP_HUMAN_TASK_TIMEOUT : Seconds to wait for an operator (default 0 = forever).
+  STEP_OPERATOR_CONSOLE_PORT : Default port of start_operator_console() (8771).
+"""
+
+import json
+import os
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from steps_shared_utils.run_logging import get_logger, current_log_context
+from steps_shared_utils.step_timing import timed_span
+
+logger = get_logger(__name__)
+
+HUMAN_TASK_MODE = os.getenv("STEP_HUMAN_TASKS", "auto").lower()
+HUMAN_TASK_TIMEOUT = float(os.getenv("STEP_HUMAN_TASK_TIMEOUT", "0")) or None
+DEFAULT_CONSOLE_PORT = int(os.getenv("STEP_OPERATOR_CONSOLE_PORT", "8771"))
+
+CONSOLE_HTML_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "human_tasks_console.html")
+
+TASK_KINDS = ("manual", "safe", "email_link")
+
+# Finished tasks kept for the console's history.
+RETAIN_FINISHED_TASKS = 200
+
+
+class HumanTaskCancelled(Exception):
+    """Raised in the waiting step when the operator cancels its task."""
+
+
+class HumanTask:
+    """
+    One request for an operator, answered with resolve().
+    """
+
+    def __init__(self, kind, title, description, instructions=None, checklist=None, ask_for_link=False,
+                 screenshot=None, step_order=None, context=None):
+        self.task_id = uuid.uuid4().hex[:12]
+        self.kind = kind
+        self.title = title
+        self.description = description
+        self.instructions = instructions
+        self.checklist = list(checklist or [])
+        self.ask_for_link = ask_for_link
+        self.screenshot = screenshot
+        self.step_order = step_order
+        self.context = context or {}
+        self.thread_ident = threading.get_ident()
+        self.created_at = time.time()
+        self.resolved_at = None
+        self.status = "pending"
+        self.response = None
+        self._done = threading.Event()
+
+    @property
+    def job_id(self):
+        return self.context.get("job_id")
+
+    def wait(self, timeout=None):
+        return self._done.wait(timeout)
+
+    def to_dict(self):
+        return {
+            "task_id": self.task_id,
+            "kind": self.kind,
+            "title": self.title,
+            "description": self.description,
+            "instructions": self.instructions,
+            "checklist": self.checklist,
+            "ask_for_link": self.ask_for_link,
+            "has_screenshot": self.screenshot is not None,
+            "step_order": self.step_order,
+            "run_id": self.context.get("run_id"),
+            "job_id": self.context.get("job_id"),
+            "form_id": self.context.get("form_id"),
+            "status": self.status,
+            "created_at": self.created_at,
+            "resolved_at": self.resolved_at,
+            "response": self.response,
+        }
+
+
+class HumanTaskQueue:
+    """
+    The pending and recently answered tasks of this process.
+
+    Listeners (add_listener) are called with ("posted" | "resolved", task), e.g.
+    so the execution service can free the worker slot of a waiting job.
+    """
+
+    def __init__(self):
+        self._tasks = {}
+        self._lock = threading.Lock()
+        self._listeners = []
+        self._consoles = 0
+
+    # -- consoles -----------------------------------------------------------
+
+    def attach_console(self):
+        """
+        Declares that an operator console services this queue (tasks are then
+        queued instead of shown as Tk dialogs).
+        """
+        with self._lock:
+            self._consoles += 1
+
+    def detach_console(self):
+        with self._lock:
+            self._consoles = max(0, self._consoles - 1)
+
+    @property
+    def has_console(self):
+        return self._consoles > 0
+
+    # -- listeners ----------------------------------------------------------
+
+    def add_listener(self, listener):
+        with self._lock:
+            self._listeners.append(listener)
+
+    def remove_listener(self, listener):
+        with self._lock:
+            if listener in self._listeners:
+                self._listeners.remove(listener)
+
+    def _notify(self, event, task):
+        with self._lock:
+            listeners = list(self._listeners)
+        for listener in listeners:
+            try:
+                listener(event, task)
+            except Exception as e:
+                logger.warning("Human task listener failed on '%s': %s", event, e)
+
+    # -- tasks --------------------------------------------------------------
+
+    def post(self, task):
+        with self._lock:
+            self._tasks[task.task_id] = task
+            self._forget_old_tasks()
+        logger.info("Waiting for an operator: %s task '%s' (step #%s).", task.kind, task.task_id, task.step_order)
+        self._notify("posted", task)
+        return task
+
+    def get(self, task_id):
+        with self._lock:
+            return self._tasks.get(task_id)
+
+    def list_tasks(self, status=None):
+        with self._lock:
+            tasks = list(self._tasks.values())
+        return [task for task in tasks if status is None or task.status == status]
+
+    def resolve(self, task_id, action, notes="", link="", checked=None):
+        """
+        Answers a pending task: action "continue" or "cancel". Continuing a task
+        with a checklist requires every item in 'checked'.
+        Returns the task; raises KeyError (unknown task) or ValueError.
+        """
+        if action not in ("continue", "cancel"):
+            raise ValueError("action must be 'continue' or 'cancel'.")
+        with self._lock:
+            task = self._tasks.get(task_id)
+            if task is None:
+                raise KeyError(task_id)
+            if task.status != "pending":
+                raise ValueError(f"Task '{task_id}' is already {task.status}.")
+            checked = list(checked or [])
+            missing = [item for item in task.checklist if item not in checked]
+            if action == "continue" and missing:
+                raise ValueError(f"Checklist incomplete: {', '.join(missing)}.")
+            task.status = "done" if action == "continue" else "cancelled"
+            task.response = {"action": action, "notes": (notes or "").strip(), "link": (link or "").strip(), "checked": checked}
+            task.resolved_at = time.time()
+            task._done.set()
+        logger.info("Operator %s task '%s' after %.1fs.", "completed" if action == "continue" else "cancelled",
+                    task_id, task.resolved_at - task.created_at)
+        self._notify("resolved", task)
+        return task
+
+    def cancel_pending(self, predicate=None, reason="cancelled"):
+        """
+        Cancels every pending task (matching 'predicate'), e.g. on shutdown.
+        """
+        for task in self.list_tasks("pending"):
+            if predicate is None or predicate(task):
+                try:
+                    self.resolve(task.task_id, "cancel", notes=reason)
+                except (KeyError, ValueError):
+                    pass
+
+    def _forget_old_tasks(self):
+        finished = [task_id for task_id, task in self._tasks.items() if task.status != "pending"]
+        for task_id in finished[:max(0, len(finished) - RETAIN_FINISHED_TASKS)]:
+            del self._tasks[task_id]
+
+
+_QUEUE = None
+_QUEUE_LOCK = threading.Lock()
+
+# Set in worker processes, whose queue no console serves.
+_WORKER_PROCESS = False
+
+# Tk is not thread-safe and one dialog at a time is all an operator can handle.
+_TK_LOCK = threading.Lock()
+
+
+def get_human_task_queue():
+    """
+    Returns the process-wide HumanTaskQueue, creating it on first use.
+    """
+    global _QUEUE
+    with _QUEUE_LOCK:
+        if _QUEUE is None:
+            _QUEUE = HumanTaskQueue()
+        return _QUEUE
+
+
+def reset_for_worker_process():
+    """
+    Initializer of worker processes: drops the queue (and its console count)
+    inherited from the parent, so tasks are not posted where no console can
+    see them; the steps use their Tk dialogs instead.
+    """
+    global _QUEUE, _WORKER_PROCESS
+    with _QUEUE_LOCK:
+        _QUEUE = HumanTaskQueue()
+        _WORKER_PROCESS = True
+
+
+def _capture_screenshot(driver):
+    try:
+        return driver.get_screenshot_as_png()
+    except Exception as e:
+        logger.debug("No screenshot for the human task: %s", e)
+        return None
+
+
+def _use_console(queue):
+    if _WORKER_PROCESS:
+        return False
+    if HUMAN_TASK_MODE == "console":
+        return True
+    if HUMAN_TASK_MODE == "tk":
+        return False
+    return queue.has_console
+
+
+def request_human_task(driver, kind, step, title, instructions=None, checklist=None, ask_for_link=False,
+                       fallback=None, timeout=None):
+    """
+    request_human_task(driver, kind, step, title, instructions=None, checklist=None, ask_for_link=False,
+                       fallback=None, timeout=None)
+
+    Asks an operator to act and waits for the answer.
+
+    Parameters:
+      kind         : "manual", "safe" or "email_link".
+      step         : The step dict (its description and step_order are shown).
+      checklist    : Items the operator must tick before continuing.
+      ask_for_link : Ask the operator for a URL (returned as response["link"]).
+      fallback     : Callable showing the Tk dialog when no console runs; it
+                     returns a response dict ({"action", "notes", "link"}).
+      timeout      : Seconds to wait (default STEP_HUMAN_TASK_TIMEOUT, None = forever).
+
+    Returns the response dict; raises HumanTaskCancelled when the operator
+    cancels and TimeoutError when nobody answered in time.
+    """
+    queue = get_human_task_queue()
+    description = step.get("description") or "No description provided."
+
+    with timed_span("human-wait"):
+        if not _use_console(queue) and fallback is not None:
+            with _TK_LOCK:
+                response = fallback()
+        else:
+            task = queue.post(HumanTask(
+                kind, title, description,
+                instructions=instructions,
+                checklist=checklist,
+                ask_for_link=ask_for_link,
+                screenshot=_capture_screenshot(driver),
+                step_order=step.get("step_order"),
+                context=current_log_context(),
+            ))
+            timeout = HUMAN_TASK_TIMEOUT if timeout is None else timeout
+            if not task.wait(timeout):
+                queue.cancel_pending(lambda pending: pending is task, reason="timed out")
+                raise TimeoutError(f"No operator answered the {kind} task '{task.task_id}' within {timeout}s.")
+            response = task.response
+
+    if not response or response.get("action") != "continue":
+        raise HumanTaskCancelled(f"Operator cancelled the {kind} step.")
+    if response.get("notes"):
+        logger.debug("Operator notes: %s", response["notes"])
+    return response
+
+
+# -- operator console -------------------------------------------------------
+
+def handle_console_request(method, path, body=b""):
+    """
+    The operator console API, shared by the execution service and the standalone
+    console server. Returns (status, content type, body bytes).
+
+      GET  /console                    The operator web page.
+      GET  /tasks[?status=pending]     Tasks as JSON.
+      GET  /tasks/<id>/screenshot.png  The browser screenshot of a task.
+      POST /tasks/<id>                 {"action": "continue"|"cancel", "notes", "link", "checked": [...]}
+    """
+    queue = get_human_task_queue()
+    route, _, query = path.partition("?")
+    parts = [part for part in route.split("/") if part]
+
+    if method == "GET" and parts in ([], ["console"]):
+        with open(CONSOLE_HTML_PATH, "rb") as f:
+            return 200, "text/html; charset=utf-8", f.read()
+    if method == "GET" and parts == ["tasks"]:
+        status = "pending" if "status=pending" in query else None
+        tasks = sorted(queue.list_tasks(status), key=lambda task: task.created_at)
+        return _json_response(200, {"tasks": [task.to_dict() for task in tasks]})
+    if len(parts) >= 2 and parts[0] == "tasks":
+        task = queue.get(parts[1])
+        if task is None:
+            return _json_response(404, {"error": f"Unknown task '{parts[1]}'."})
+        if method == "GET" and parts[2:] == ["screenshot.png"]:
+            if task.screenshot is None:
+                return _json_response(404, {"error": "This task has no screenshot."})
+            return 200, "image/png", task.screenshot
+        if method == "GET" and len(parts) == 2:
+            return _json_response(200, task.to_dict())
+        if method == "POST" and len(parts) == 2:
+            try:
+                answer = json.loads(body.decode("utf-8") or "{}")
+                task = queue.resolve(task.task_id, answer.get("action"), notes=answer.get("notes", ""),
+                                     link=answer.get("link", ""), checked=answer.get("checked"))
+            except (KeyError, ValueError, AttributeError) as e:
+                return _json_response(400, {"error": str(e)})
+            return _json_response(200, task.to_dict())
+    return _json_response(404, {"error": "Not found."})
+
+
+def _json_response(status, payload):
+    return status, "application/json; charset=utf-8", json.dumps(payload, ensure_ascii=False, default=str).encode("utf-8")
+
+
+class _ConsoleRequestHandler(BaseHTTPRequestHandler):
+
+    def log_message(self, format, *args):
+        logger.debug("%s %s", self.address_string(), format % args)
+
+    def _handle(self, method):
+        length = int(self.headers.get("Content-Length") or 0)
+        body = self.rfile.read(length) if length else b""
+        status, content_type, payload = handle_console_request(method, self.path, body)
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def do_GET(self):
+        self._handle("GET")
+
+    def do_POST(self):
+        self._handle("POST")
+
+
+def start_operator_console(host="127.0.0.1", port=DEFAULT_CONSOLE_PORT):
+    """
+    Serves the operator console in a background thread and routes the human
+    tasks of this process to it. Returns the server (shutdown() to stop it).
+    """
+    server = ThreadingHTTPServer((host, port), _ConsoleRequestHandler)
+    threading.Thread(target=server.serve_forever, name="operator-console", daemon=True).start()
+    get_human_task_queue().attach_console()
+    logger.info("Operator console: http://%s:%s/console", *server.server_address[:2])
+    return server
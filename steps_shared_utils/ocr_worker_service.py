@@ -0,0 +1,283 @@
+# E:\CRM\automation_project\steps_shared_utils\ocr_worker_service.py
+"""
+Resident OCR worker.
+
+ocr_captcha_action used to start a new Python interpreter running paddle_ocr_api.py
+for every captcha, which reloads the PaddleOCR model each time and passes the PNG
+as a base64 command-line argument. This module keeps one worker process alive
+that loads the model once and answers OCR requests over a local TCP socket.
+
+Start it once per machine (it only listens on 127.0.0.1):
+
+    python -m steps_shared_utils.ocr_worker_service [--port 8765]
+
+or let recognize_with_fallback() start it in the background on first use.
+
+Wire protocol (both directions): a 4-byte big-endian header length, the JSON
+header, then the raw payload bytes announced in the header.
+
+    request : {"op": "ocr", "sizes": [n1, n2, ...]}  + image1 bytes + image2 bytes ...
+              {"op": "ping"}
+    response: {"ok": true, "texts": ["...", ...]}  or  {"ok": false, "error": "..."}
+
+Several crops can be sent in one request; they are recognized in one pass of
+the model thread. Requests from several runner threads/processes are served
+concurrently, while the model itself is only used by one thread.
+"""
+
+import argparse
+import io
+import json
+import os
+import queue
+import socket
+import socketserver
+import struct
+import subprocess
+import sys
+import threading
+import time
+
+from steps_shared_utils.run_logging import get_logger
+
+logger = get_logger("steps_shared_utils.ocr_worker_service")
+
+OCR_SERVICE_HOST = "127.0.0.1"
+OCR_SERVICE_PORT = int(os.getenv("OCR_SERVICE_PORT", "8765"))
+
+# Set OCR_SERVICE=0 to always use the one-shot subprocess.
+OCR_SERVICE_ENABLED = os.getenv("OCR_SERVICE", "1") == "1"
+
+# Start the worker in the background when it is not running yet.
+OCR_SERVICE_AUTOSTART = os.getenv("OCR_SERVICE_AUTOSTART", "1") == "1"
+
+# Requests larger than this are rejected (protects the worker from garbage input).
+MAX_PAYLOAD_BYTES = 32 * 1024 * 1024
+
+_HEADER_LENGTH = struct.Struct(">I")
+
+_AUTOSTART_LOCK = threading.Lock()
+_AUTOSTART_TIME = 0.0
+
+
+# -- framing ------------------------------------------------------------------
+
+def _recv_exact(sock, size):
+    chunks = []
+    remaining = size
+    while remaining:
+        chunk = sock.recv(min(remaining, 1024 * 1024))
+        if not chunk:
+            raise ConnectionError("OCR service connection closed mid-message.")
+        chunks.append(chunk)
+        remaining -= len(chunk)
+    return b"".join(chunks)
+
+
+def _send_message(sock, header, payload=b""):
+    raw_header = json.dumps(header).encode("utf-8")
+    sock.sendall(_HEADER_LENGTH.pack(len(raw_header)) + raw_header + payload)
+
+
+def _recv_message(sock):
+    """
+    Returns (header, payload) of one framed message.
+    """
+    (header_length,) = _HEADER_LENGTH.unpack(_recv_exact(sock, _HEADER_LENGTH.size))
+    header = json.loads(_recv_exact(sock, header_length).decode("utf-8"))
+    sizes = header.get("sizes") or []
+    total = sum(sizes)
+    if total > MAX_PAYLOAD_BYTES:
+        raise ValueError(f"OCR request too large ({total} bytes).")
+    payload = _recv_exact(sock, total) if total else b""
+    return header, payload
+
+
+def _split_payload(payload, sizes):
+    images = []
+    offset = 0
+    for size in sizes:
+        images.append(payload[offset:offset + size])
+        offset += size
+    return images
+
+
+# -- server -------------------------------------------------------------------
+
+class _OcrModel:
+    """
+    Loads PaddleOCR once and runs every recognition on a single model thread.
+    """
+
+    def __init__(self, lang="en"):
+        self.lang = lang
+        self._requests = queue.Queue()
+        self._ocr = None
+        self._thread = threading.Thread(target=self._loop, name="ocr-model", daemon=True)
+
+    def start(self):
+        # Imported here so that clients never pay for (or need) paddle and numpy.
+        from paddleocr import PaddleOCR
+        logger.debug("Loading PaddleOCR model (lang='%s')...", self.lang)
+        start_time = time.monotonic()
+        self._ocr = PaddleOCR(use_angle_cls=False, lang=self.lang, show_log=False)
+        logger.debug("Model loaded in %.2fs.", time.monotonic() - start_time)
+        self._thread.start()
+
+    def recognize(self, images):
+        """
+        Queues a batch of PNG images and blocks until the model thread has read them.
+        """
+        done = threading.Event()
+        slot = {"images": images, "done": done}
+        self._requests.put(slot)
+        done.wait()
+        if "error" in slot:
+            raise RuntimeError(slot["error"])
+        return slot["texts"]
+
+    def _loop(self):
+        while True:
+            slot = self._requests.get()
+            try:
+                slot["texts"] = [self._recognize_one(image) for image in slot["images"]]
+            except Exception as e:
+                slot["error"] = f"{type(e).__name__}: {e}"
+            finally:
+                slot["done"].set()
+
+    def _recognize_one(self, png_bytes):
+        import numpy as np
+        from PIL import Image
+
+        # PaddleOCR expects BGR arrays (OpenCV layout).
+        image = np.array(Image.open(io.BytesIO(png_bytes)).convert("RGB"))[:, :, ::-1]
+        result = self._ocr.ocr(image, cls=False)
+        lines = (result or [None])[0] or []
+        return "".join(text for _, (text, _confidence) in lines).strip()
+
+
+class _OcrRequestHandler(socketserver.BaseRequestHandler):
+
+    def handle(self):
+        try:
+            header, payload = _recv_message(self.request)
+            op = header.get("op")
+            if op == "ping":
+                _send_message(self.request, {"ok": True})
+            elif op == "ocr":
+                images = _split_payload(payload, header.get("sizes") or [])
+                texts = self.server.model.recognize(images)
+                _send_message(self.request, {"ok": True, "texts": texts})
+            else:
+                _send_message(self.request, {"ok": False, "error": f"Unknown op: {op}"})
+        except Exception as e:
+            logger.error("Request failed: %s", e)
+            try:
+                _send_message(self.request, {"ok": False, "error": str(e)})
+            except OSError:
+                pass
+
+
+class _OcrServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+def serve(host=OCR_SERVICE_HOST, port=OCR_SERVICE_PORT, lang="en"):
+    """
+    Loads the model and serves OCR requests until interrupted.
+    """
+    model = _OcrModel(lang=lang)
+    model.start()
+    with _OcrServer((host, port), _OcrRequestHandler) as server:
+        server.model = model
+        logger.info("Listening on %s:%s.", host, port)
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            logger.info("Stopped.")
+
+
+# -- client -------------------------------------------------------------------
+
+def _request(header, payload=b"", timeout=30.0, host=OCR_SERVICE_HOST, port=OCR_SERVICE_PORT):
+    with socket.create_connection((host, port), timeout=timeout) as sock:
+        _send_message(sock, header, payload)
+        response, _ = _recv_message(sock)
+    if not response.get("ok"):
+        raise RuntimeError(f"OCR service error: {response.get('error')}")
+    return response
+
+
+def is_ocr_service_running(timeout=0.5):
+    """
+    Returns True if a worker answers a ping on OCR_SERVICE_PORT.
+    """
+    try:
+        _request({"op": "ping"}, timeout=timeout)
+        return True
+    except (OSError, ValueError, RuntimeError):
+        return False
+
+
+def recognize_images(png_images, timeout=30.0):
+    """
+    Sends one or more PNG images (bytes) to the worker in a single request and
+    returns the recognized texts in the same order.
+    Raises OSError if the worker is not reachable.
+    """
+    png_images = list(png_images)
+    response = _request(
+        {"op": "ocr", "sizes": [len(image) for image in png_images]},
+        b"".join(png_images),
+        timeout=timeout,
+    )
+    return response.get("texts", [])
+
+
+def start_ocr_service_in_background():
+    """
+    Launches the worker as a detached process (at most once per minute per process).
+    The model takes a while to load, so callers should not wait for it.
+    """
+    global _AUTOSTART_TIME
+    with _AUTOSTART_LOCK:
+        if time.time() - _AUTOSTART_TIME < 60:
+            return
+        _AUTOSTART_TIME = time.time()
+    project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    kwargs = {"cwd": project_root, "stdout": subprocess.DEVNULL, "stderr": subprocess.DEVNULL}
+    if os.name == "nt":
+        kwargs["creationflags"] = subprocess.CREATE_NEW_PROCESS_GROUP | subprocess.DETACHED_PROCESS
+    else:
+        kwargs["start_new_session"] = True
+    try:
+        subprocess.Popen([sys.executable, "-m", "steps_shared_utils.ocr_worker_service"], **kwargs)
+        logger.debug("Started OCR worker in the background.")
+    except Exception as e:
+        logger.warning("Could not start OCR worker: %s", e)
+
+
+def recognize_with_fallback(png_bytes, fallback):
+    """
+    Recognizes one PNG through the worker; if the worker is disabled or down,
+    calls fallback(png_bytes) instead (and starts the worker for next time).
+    """
+    if OCR_SERVICE_ENABLED:
+        try:
+            return recognize_images([png_bytes])[0]
+        except (OSError, RuntimeError, ValueError, IndexError) as e:
+            logger.warning("OCR worker unavailable (%s); using subprocess.", e)
+            if OCR_SERVICE_AUTOSTART and isinstance(e, ConnectionRefusedError):
+                start_ocr_service_in_background()
+    return fallback(png_bytes)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Resident PaddleOCR worker for captcha steps.")
+    parser.add_argument("--host", default=OCR_SERVICE_HOST)
+    parser.add_argument("--port", type=int, default=OCR_SERVICE_PORT)
+    parser.add_argument("--lang", default="en")
+    args = parser.parse_args()
+    serve(args.host, args.port, args.lang)
@@ -0,0 +1,303 @@
+# E:\CRM\automation_project\steps_shared_utils\retry_policy.py
+"""
+Central retry policy for the action handlers.
+
+retry_call() runs one operation (a click, typing into a field, a whole action
+handler); when it raises, the error is classified and, if its class is
+retryable for that call, the operation is run again after a short jittered
+backoff (and a recovery step, e.g. closing the alert that got in the way).
+Errors that are not worth retrying (a wrong selector value, a cancelled manual
+step, a dead session) fail right away.
+
+Retries belong as close to the failing operation as possible: the actions
+retry their own clicks and keystrokes (enter_text, select_option, the date
+actions, click_with_retry). The executor only re-runs a whole handler for the
+actions in HANDLER_RETRY_CLASSES, whose handlers are a single interaction that
+is safe to repeat (goto, click, ...); multi-step handlers are never restarted
+from the top.
+
+Error classes:
+
+  stale             StaleElementReferenceException (page re-rendered the element)
+  intercepted       ElementClickInterceptedException (overlay, spinner, animation)
+  not_interactable  ElementNotInteractableException / InvalidElementStateException
+  alert             UnexpectedAlertPresentException (recovery: the alert is closed)
+  timeout           TimeoutException, NoSuchElementException, find_element() finding nothing
+  navigation        Page load errors (net::ERR_..., error pages); only retried for goto
+  fatal             Everything else; never retried
+
+Budgets:
+  - per class and step : RetryRule.max_retries
+  - per run (form)     : RetryBudget, at most STEP_RETRY_BUDGET retries and
+                         STEP_RETRY_BUDGET_SECONDS seconds of backoff per run
+
+Nested retry_call()s each retry their own operation with their own rule and
+share the run's budget; an error an inner call already gave up on is not
+retried again by an outer one.
+
+Configuration (environment):
+  STEP_RETRY_BUDGET         : Retries per run (default 20).
+  STEP_RETRY_BUDGET_SECONDS : Backoff seconds per run (default 30).
+"""
+
+import os
+import random
+import threading
+import time
+from contextlib import contextmanager
+
+from selenium.common.exceptions import (
+    ElementClickInterceptedException, ElementNotInteractableException, InvalidElementStateException,
+    InvalidSessionIdException, NoSuchElementException, NoSuchWindowException, StaleElementReferenceException,
+    TimeoutException, UnexpectedAlertPresentException, WebDriverException,
+)
+
+from steps_shared_utils.run_logging import get_logger
+from steps_shared_utils.step_timing import timed_span
+
+logger = get_logger(__name__)
+
+RETRY_BUDGET = int(os.getenv("STEP_RETRY_BUDGET", "20"))
+RETRY_BUDGET_SECONDS = float(os.getenv("STEP_RETRY_BUDGET_SECONDS", "30"))
+
+ERROR_CLASSES = ("stale", "intercepted", "not_interactable", "alert", "timeout", "navigation", "fatal")
+
+# Messages of WebDriverExceptions raised when a page failed to load.
+_NAVIGATION_MARKERS = ("net::err_", "reached error page", "about:neterror", "ns_error_", "err_connection", "err_name_not_resolved")
+
+# Messages of the plain exceptions raised by find_element() and the actions when nothing matched.
+_NOT_FOUND_MARKERS = ("no element found",)
+
+
+class RetryRule:
+    """
+    How one error class is retried: up to max_retries times per step, waiting
+    base_delay * multiplier ** (retry - 1) seconds (capped at max_delay), of which
+    a random 'jitter' share is dropped so parallel jobs do not retry in lockstep.
+    """
+
+    __slots__ = ("max_retries", "base_delay", "max_delay", "multiplier", "jitter")
+
+    def __init__(self, max_retries, base_delay, max_delay, multiplier=2.0, jitter=0.5):
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.multiplier = multiplier
+        self.jitter = jitter
+
+    def delay(self, retry):
+        delay = min(self.max_delay, self.base_delay * self.multiplier ** (retry - 1))
+        return delay * (1.0 - self.jitter * random.random())
+
+
+DEFAULT_RULES = {
+    "stale": RetryRule(max_retries=3, base_delay=0.1, max_delay=1.0),
+    "intercepted": RetryRule(max_retries=3, base_delay=0.25, max_delay=2.0),
+    "not_interactable": RetryRule(max_retries=2, base_delay=0.25, max_delay=2.0),
+    "alert": RetryRule(max_retries=2, base_delay=0.05, max_delay=0.5),
+    "timeout": RetryRule(max_retries=1, base_delay=0.5, max_delay=2.0),
+    "navigation": RetryRule(max_retries=2, base_delay=1.0, max_delay=5.0),
+}
+
+# Error classes retried by a retry_call() that does not name its own.
+DEFAULT_RETRY_CLASSES = frozenset(("stale", "intercepted", "not_interactable", "alert", "timeout"))
+
+# Actions (registry names) whose whole handler the executor may run again, and
+# for which errors. Only single-interaction handlers that fail before they
+# change anything are listed; every other handler (multi-step date and country
+# pickers, operator steps, the captcha) is run once and retries inside itself.
+HANDLER_RETRY_CLASSES = {
+    "goto": DEFAULT_RETRY_CLASSES | {"navigation"},
+    "click": DEFAULT_RETRY_CLASSES,
+    "click_safe_area": DEFAULT_RETRY_CLASSES,
+    "dismiss_modal": DEFAULT_RETRY_CLASSES,
+    "capture_request_number": DEFAULT_RETRY_CLASSES,
+    "full_page_screenshot": DEFAULT_RETRY_CLASSES,
+    "force_date_injection": DEFAULT_RETRY_CLASSES,
+    "force_date_injection_5days_action": DEFAULT_RETRY_CLASSES,
+    "force_chosen_value_injection_action": DEFAULT_RETRY_CLASSES,
+}
+
+# Set on an error an inner retry_call() gave up on, so outer calls do not retry it again.
+_HANDLED_ATTR = "_step_retry_handled"
+
+_LOCAL = threading.local()
+
+
+def _already_handled(error):
+    seen = set()
+    while error is not None and id(error) not in seen:
+        seen.add(id(error))
+        if getattr(error, _HANDLED_ATTR, False):
+            return True
+        error = error.__cause__ or error.__context__
+    return False
+
+
+def classify_error(error):
+    """
+    Returns the error class (see ERROR_CLASSES) of an exception, following
+    'raise ... from' / 'during handling' chains of wrapped errors.
+    """
+    seen = set()
+    while error is not None and id(error) not in seen:
+        seen.add(id(error))
+        error_class = _classify_one(error)
+        if error_class != "fatal":
+            return error_class
+        error = error.__cause__ or error.__context__
+    return "fatal"
+
+
+def _classify_one(error):
+    if isinstance(error, StaleElementReferenceException):
+        return "stale"
+    if isinstance(error, ElementClickInterceptedException):
+        return "intercepted"
+    if isinstance(error, (ElementNotInteractableException, InvalidElementStateException)):
+        return "not_interactable"
+    if isinstance(error, UnexpectedAlertPresentException):
+        return "alert"
+    if isinstance(error, (TimeoutException, NoSuchElementException)):
+        return "timeout"
+    if isinstance(error, (InvalidSessionIdException, NoSuchWindowException)):
+        return "fatal"
+    message = str(error).lower()
+    if isinstance(error, WebDriverException) and any(marker in message for marker in _NAVIGATION_MARKERS):
+        return "navigation"
+    if type(error) is Exception and any(marker in message for marker in _NOT_FOUND_MARKERS):
+        return "timeout"
+    return "fatal"
+
+
+class RetryBudget:
+    """
+    Retries left for one run (form), and what was spent, by error class.
+    """
+
+    def __init__(self, max_retries=RETRY_BUDGET, max_seconds=RETRY_BUDGET_SECONDS):
+        self.max_retries = max_retries
+        self.max_seconds = max_seconds
+        self.retries = 0
+        self.seconds = 0.0
+        self.by_class = {}
+        self.exhausted = False
+
+    def allows(self, delay):
+        if self.retries >= self.max_retries or self.seconds + delay > self.max_seconds:
+            self.exhausted = True
+            return False
+        return True
+
+    def spend(self, error_class, seconds):
+        self.retries += 1
+        self.seconds += seconds
+        entry = self.by_class.setdefault(error_class, {"count": 0, "seconds": 0.0})
+        entry["count"] += 1
+        entry["seconds"] += seconds
+
+    def summary(self):
+        return {
+            "count": self.retries,
+            "seconds": round(self.seconds, 4),
+            "by_class": {name: {"count": e["count"], "seconds": round(e["seconds"], 4)} for name, e in self.by_class.items()},
+            "exhausted": self.exhausted,
+        }
+
+
+def current_retry_budget():
+    """
+    The RetryBudget of the run executing in this thread, or None.
+    """
+    return getattr(_LOCAL, "budget", None)
+
+
+@contextmanager
+def retry_budget_run(budget=None):
+    """
+    Shares one RetryBudget between every retry_call() of the run executing in
+    this thread. Nested use keeps the outer budget. Yields the budget.
+    """
+    outer = current_retry_budget()
+    if outer is not None:
+        yield outer
+        return
+    _LOCAL.budget = budget or RetryBudget()
+    try:
+        yield _LOCAL.budget
+    finally:
+        _LOCAL.budget = None
+
+
+def handler_retry_classes(action_name):
+    """
+    The error classes for which the executor re-runs the handler of 'action_name'
+    (empty: the handler runs once).
+    """
+    return HANDLER_RETRY_CLASSES.get(action_name, frozenset())
+
+
+def _recover(driver, error_class):
+    """
+    What to do before the next attempt, besides waiting.
+    """
+    if driver is None:
+        return
+    if error_class in ("alert", "intercepted", "not_interactable"):
+        # Imported here: alert_handler lives with the actions.
+        from steps_shared_actions.alert_handler import handle_unexpected_alerts
+        handle_unexpected_alerts(driver, action="accept")
+
+
+def retry_call(fn, driver=None, action_name=None, retry_classes=None, rules=None, max_retries=None, max_delay=None):
+    """
+    retry_call(fn, driver=None, action_name=None, retry_classes=None, rules=None, max_retries=None, max_delay=None)
+
+    Calls fn() and retries it according to the policy.
+
+    Parameters:
+      driver        : Used for the recovery steps (closing alerts).
+      action_name   : Named in the log messages.
+      retry_classes : The retryable classes (default DEFAULT_RETRY_CLASSES).
+      rules         : Overrides DEFAULT_RULES (dict class -> RetryRule).
+      max_retries   : Retries per class of this call, replacing the rules' own
+                      max_retries (for callers with an explicit attempt count).
+      max_delay     : Caps the backoff per retry of this call.
+
+    The last error is re-raised once the class is not retryable, its rule or
+    the run's RetryBudget is used up; it is then marked so that enclosing
+    retry_call()s do not retry it again.
+    """
+    retry_classes = DEFAULT_RETRY_CLASSES if retry_classes is None else frozenset(retry_classes)
+    rules = rules or DEFAULT_RULES
+    budget = current_retry_budget() or RetryBudget()
+    retries_by_class = {}
+
+    while True:
+        try:
+            return fn()
+        except Exception as e:
+            error = e
+
+        if _already_handled(error):
+            raise error
+        error_class = classify_error(error)
+        rule = rules.get(error_class)
+        if error_class not in retry_classes or rule is None:
+            raise error
+        retry = retries_by_class.get(error_class, 0) + 1
+        limit = rule.max_retries if max_retries is None else max_retries
+        delay = rule.delay(retry) if max_delay is None else min(max_delay, rule.delay(retry))
+        if retry > limit or not budget.allows(delay):
+            if budget.exhausted:
+                logger.warning("Retry budget of the run is used up (%s retries); not retrying %s.", budget.retries, action_name or "the call")
+            setattr(error, _HANDLED_ATTR, True)
+            raise error
+        retries_by_class[error_class] = retry
+
+        logger.warning("%s failed (%s, retry %s/%s in %.2fs): %s", action_name or "Call", error_class, retry, limit, delay, error)
+        start = time.monotonic()
+        with timed_span("retry"):
+            time.sleep(delay)
+            _recover(driver, error_class)
+        budget.spend(error_class, time.monotonic() - start)
@@ -0,0 +1,241 @@
+# E:\CRM\automation_project\steps_shared_utils\run_logging.py
+"""
+Logging for the step runners.
+
+Every module gets a logger with get_logger(__name__) and logs with lazy
+%-formatting:
+
+    logger = get_logger(__name__)
+    logger.debug("Found element using %s '%s'.", sel_type, sel_value)
+
+so a message below the active level costs one level check and nothing is
+formatted. Records are handed to a QueueHandler; a single QueueListener thread
+formats and writes them, so parallel runner threads never contend for stdout.
+
+Configuration (environment):
+  STEP_LOG_LEVEL   : DEBUG / INFO (default) / WARNING / ERROR
+  STEP_LOG_FORMAT  : "text" (default, "[LEVEL module run=...] message") or "json" (JSON lines)
+  STEP_LOG_FILE    : Optional file to write to instead of stdout.
+  STEP_DEBUG_FORMS : Comma-separated form ids or names that log at DEBUG even
+                     when the global level is higher.
+
+Correlation ids (run_id, job_id, form_id) are attached to every record logged
+inside log_context(...), per thread.
+"""
+
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+
+ROOT_LOGGER_NAME = "steps"
+
+LOG_LEVEL = os.getenv("STEP_LOG_LEVEL", "INFO").upper()
+LOG_FORMAT = os.getenv("STEP_LOG_FORMAT", "text").lower()
+LOG_FILE = os.getenv("STEP_LOG_FILE")
+DEBUG_FORMS = {f.strip() for f in os.getenv("STEP_DEBUG_FORMS", "").split(",") if f.strip()}
+
+_CONTEXT_FIELDS = ("run_id", "job_id", "form_id")
+
+_LOCAL = threading.local()
+_LISTENER = None
+_CONFIGURE_LOCK = threading.Lock()
+
+# The configured level, and how many threads currently run a debug context.
+_LEVEL = logging.INFO
+_DEBUG_CONTEXTS = 0
+
+
+def _context():
+    ctx = getattr(_LOCAL, "ctx", None)
+    if ctx is None:
+        ctx = {}
+        _LOCAL.ctx = ctx
+    return ctx
+
+
+def current_log_context():
+    """
+    Returns a copy of this thread's correlation fields (run_id, job_id, form_id).
+    """
+    return {k: v for k, v in _context().items() if k in _CONTEXT_FIELDS}
+
+
+def new_run_id():
+    return uuid.uuid4().hex[:12]
+
+
+def is_debug_form(form):
+    """
+    True if the form (dict with id_uuid / form_name) is listed in STEP_DEBUG_FORMS.
+    """
+    if not DEBUG_FORMS or not form:
+        return False
+    return form.get("id_uuid") in DEBUG_FORMS or form.get("form_name") in DEBUG_FORMS
+
+
+@contextmanager
+def log_context(debug=None, **fields):
+    """
+    Attaches correlation fields (run_id, job_id, form_id) to every record logged
+    by this thread inside the block. debug=True lets DEBUG records of this thread
+    through even when the global level is higher (per-form debugging).
+    """
+    ctx = _context()
+    saved = dict(ctx)
+    ctx.update({k: v for k, v in fields.items() if v is not None})
+    if debug is not None:
+        ctx["debug"] = debug
+    enables_debug = bool(debug) and not saved.get("debug")
+    if enables_debug:
+        _debug_context_entered(+1)
+    try:
+        yield ctx
+    finally:
+        ctx.clear()
+        ctx.update(saved)
+        if enables_debug:
+            _debug_context_entered(-1)
+
+
+def _debug_context_entered(delta):
+    """
+    While any thread runs a debug context the logger must let DEBUG records
+    through to the filter (which still drops them for the other threads).
+    """
+    global _DEBUG_CONTEXTS
+    with _CONFIGURE_LOCK:
+        _DEBUG_CONTEXTS += delta
+        _apply_logger_level()
+
+
+def _apply_logger_level():
+    root = logging.getLogger(ROOT_LOGGER_NAME)
+    root.setLevel(logging.DEBUG if _DEBUG_CONTEXTS else _LEVEL)
+
+
+class _ContextFilter(logging.Filter):
+    """
+    Copies the thread's correlation ids onto the record and applies the global
+    level to everything except threads running a per-form debug context.
+    """
+
+    def __init__(self, level):
+        super().__init__()
+        self.level = level
+
+    def filter(self, record):
+        ctx = _context()
+        for field in _CONTEXT_FIELDS:
+            setattr(record, field, ctx.get(field))
+        if record.levelno < self.level and not ctx.get("debug"):
+            return False
+        return True
+
+
+class _TextFormatter(logging.Formatter):
+    """
+    Keeps the historical console look: "[DEBUG click_action] message".
+    """
+
+    def format(self, record):
+        module = record.name.rsplit(".", 1)[-1]
+        tags = "".join(
+            f" {field.split('_')[0]}={getattr(record, field)}"
+            for field in _CONTEXT_FIELDS if getattr(record, field, None)
+        )
+        line = f"[{record.levelname} {module}{tags}] {record.getMessage()}"
+        if record.exc_info:
+            line += "\n" + self.formatException(record.exc_info)
+        return line
+
+
+class _JsonFormatter(logging.Formatter):
+    """
+    One JSON object per line.
+    """
+
+    def format(self, record):
+        entry = {
+            "ts": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(record.created)) + f".{int(record.msecs):03d}",
+            "level": record.levelname,
+            "logger": record.name,
+            "thread": record.threadName,
+            "msg": record.getMessage(),
+        }
+        for field in _CONTEXT_FIELDS:
+            value = getattr(record, field, None)
+            if value:
+                entry[field] = value
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+def configure_logging(level=None, fmt=None, log_file=None):
+    """
+    (Re)configures the "steps" logger tree: a non-blocking QueueHandler feeding
+    one QueueListener that writes text or JSON lines. Called automatically on
+    import with the environment settings; call again to override them.
+    """
+    global _LISTENER, _LEVEL
+    level = logging.getLevelName((level or LOG_LEVEL).upper())
+    if not isinstance(level, int):
+        level = logging.INFO
+    fmt = (fmt or LOG_FORMAT).lower()
+    log_file = log_file or LOG_FILE
+
+    with _CONFIGURE_LOCK:
+        if _LISTENER is not None:
+            _LISTENER.stop()
+
+        if log_file:
+            output = logging.FileHandler(log_file, encoding="utf-8")
+        else:
+            output = logging.StreamHandler(sys.stdout)
+        output.setFormatter(_JsonFormatter() if fmt == "json" else _TextFormatter())
+
+        log_queue = queue.SimpleQueue()
+        queue_handler = logging.handlers.QueueHandler(log_queue)
+        queue_handler.addFilter(_ContextFilter(level))
+
+        root = logging.getLogger(ROOT_LOGGER_NAME)
+        root.handlers[:] = [queue_handler]
+        root.propagate = False
+        # Below the level the logger itself rejects records before any formatting.
+        _LEVEL = level
+        _apply_logger_level()
+
+        _LISTENER = logging.handlers.QueueListener(log_queue, output)
+        _LISTENER.start()
+
+
+def shutdown_logging():
+    """
+    Writes out the queued records and stops the listener thread.
+    """
+    global _LISTENER
+    with _CONFIGURE_LOCK:
+        if _LISTENER is not None:
+            _LISTENER.stop()
+            _LISTENER = None
+
+
+def get_logger(name):
+    """
+    Returns the logger for a module (pass __name__).
+    """
+    if name.startswith(ROOT_LOGGER_NAME + "."):
+        return logging.getLogger(name)
+    return logging.getLogger(f"{ROOT_LOGGER_NAME}.{name}")
+
+
+configure_logging()
+atexit.register(shutdown_logging)
@@ -0,0 +1,296 @@
+# E:\CRM\automation_project\steps_shared_utils\selector_cache.py
+"""
+Self-healing selector cache.
+
+When find_element() only succeeds through a fallback selector (the primary one
+went stale after the site changed its DOM), every later run would pay the same
+price again. This cache remembers, per step id_uuid, which candidate selector
+actually resolved the element, how often (hit rate) and how fast (latency),
+and find_element() tries the best candidates first on the next run.
+
+A candidate counts an attempt only when it was actually evaluated (the ones
+tried before the winner, and the winner itself). Until a candidate has proven
+itself (PROMOTE_MIN_HITS hits at PROMOTE_MIN_HIT_RATE), the step's own
+selector keeps its place at the front.
+
+Stored in selector_cache.json next to this module:
+
+    {
+      "<step id_uuid>": {
+        "candidates": {
+          "css|input#email": {"selector_type": "css", "selector_value": "input#email",
+                              "hits": 12, "attempts": 12, "avg_latency": 0.08},
+          ...
+        },
+        "promoted": "css|input#email"   # written back to form_steps (optional)
+      }
+    }
+
+With STEP_SELECTOR_WRITE_BACK=1 a fallback that keeps winning is also written
+back to form_steps.selector_value, so the builder and other machines see it.
+"""
+
+import atexit
+import copy
+import json
+import os
+import tempfile
+import threading
+import time
+
+from steps_shared_utils.step_wait_config import _file_lock, FLUSH_BATCH_SIZE, FLUSH_INTERVAL_SECONDS
+
+from steps_shared_utils.run_logging import get_logger
+
+logger = get_logger(__name__)
+
+# STEP_SELECTOR_CACHE_PATH overrides the location (e.g. for the benchmarks).
+SELECTOR_CACHE_PATH = os.getenv("STEP_SELECTOR_CACHE_PATH", os.path.join(os.path.dirname(__file__), "selector_cache.json"))
+
+# Write a winning fallback back to form_steps.selector_value (off by default).
+SELECTOR_WRITE_BACK = os.getenv("STEP_SELECTOR_WRITE_BACK", "0") == "1"
+
+# A candidate is tried first, and a fallback written back, only after it
+# resolved the step this often, at this rate.
+PROMOTE_MIN_HITS = 3
+PROMOTE_MIN_HIT_RATE = 0.8
+
+# Smoothing factor of the per-candidate latency average.
+LATENCY_ALPHA = 0.2
+
+
+def _candidate_key(selector_type, selector_value):
+    return f"{(selector_type or '').lower()}|{selector_value}"
+
+
+def _hit_rate(stats):
+    return stats.get("hits", 0) / max(stats.get("attempts", 0), 1)
+
+
+def _is_proven(stats):
+    return stats.get("hits", 0) >= PROMOTE_MIN_HITS and _hit_rate(stats) >= PROMOTE_MIN_HIT_RATE
+
+
+def _merge_step(stored, base, local):
+    """
+    Returns the step entry to write back: the hits and attempts this process
+    recorded since it read the entry ('local' minus 'base') added to the stored
+    counts, so lookups counted by other processes meanwhile are kept.
+    """
+    if not stored:
+        return local
+    base_candidates = (base or {}).get("candidates", {})
+    merged = copy.deepcopy(stored)
+    candidates = merged.setdefault("candidates", {})
+    for key, s in local.get("candidates", {}).items():
+        b = base_candidates.get(key, {})
+        new_hits = s["hits"] - b.get("hits", 0)
+        new_attempts = s["attempts"] - b.get("attempts", 0)
+        if not new_hits and not new_attempts:
+            continue
+        target = candidates.setdefault(key, dict(s, hits=0, attempts=0))
+        target["hits"] = target.get("hits", 0) + new_hits
+        target["attempts"] = target.get("attempts", 0) + new_attempts
+        if new_hits:
+            target["avg_latency"] = s["avg_latency"]
+    if local.get("promoted") != (base or {}).get("promoted"):
+        merged["promoted"] = local.get("promoted")
+    return merged
+
+
+class SelectorCache:
+    """
+    In-memory view of selector_cache.json with batched, merged write-back
+    (same scheme as WaitStatsStore: under the lock file re-read, add the counts
+    recorded since our last read to each dirty step, replace atomically).
+    """
+
+    def __init__(self, path=None):
+        self.path = path or SELECTOR_CACHE_PATH
+        self._lock = threading.RLock()
+        self._data = None
+        self._dirty = set()
+        self._base = {}  # step_id -> entry as read, before our updates
+        self._last_flush = time.time()
+
+    def _read(self):
+        if not os.path.exists(self.path):
+            return {}
+        try:
+            with open(self.path, "r") as f:
+                return json.load(f)
+        except Exception as e:
+            logger.error("Failed to load selector cache: %s", e)
+            return {}
+
+    def _write(self, data):
+        directory = os.path.dirname(self.path) or "."
+        fd, tmp_path = tempfile.mkstemp(prefix=".selector_cache.", suffix=".tmp", dir=directory)
+        try:
+            with os.fdopen(fd, "w") as f:
+                json.dump(data, f, indent=4)
+            os.replace(tmp_path, self.path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    def _ensure_loaded(self):
+        if self._data is None:
+            self._data = self._read()
+
+    def get(self, step_id):
+        """
+        Returns the cache entry of a step, or None.
+        """
+        with self._lock:
+            self._ensure_loaded()
+            return self._data.get(step_id)
+
+    def order_candidates(self, step_id, selectors):
+        """
+        Returns 'selectors' ([(selector_type, selector_value), ...]) reordered so that
+        candidates proven on this step (at least PROMOTE_MIN_HITS hits at a hit rate
+        of PROMOTE_MIN_HIT_RATE) come first, highest hit rate then lowest latency.
+        The other candidates keep their original order, so the primary selector
+        stays first until a fallback has proven itself.
+        """
+        entry = self.get(step_id)
+        if not entry:
+            return list(selectors)
+        stats = entry.get("candidates", {})
+
+        def sort_key(item):
+            index, (sel_type, sel_value) = item
+            s = stats.get(_candidate_key(sel_type, sel_value))
+            if not s or not _is_proven(s):
+                return (1, 0.0, 0.0, index)
+            return (0, -_hit_rate(s), s.get("avg_latency", 0.0), index)
+
+        return [sel for _, sel in sorted(enumerate(selectors), key=sort_key)]
+
+    def preferred_selector(self, step_id, selector_type, selector_value):
+        """
+        Returns the (selector_type, selector_value) that should be tried first for
+        the step: the best cached candidate, or the given one when nothing is known.
+        """
+        ordered = self.order_candidates(step_id, [(selector_type, selector_value)] + self._known(step_id))
+        return ordered[0]
+
+    def _known(self, step_id):
+        entry = self.get(step_id) or {}
+        return [(s["selector_type"], s["selector_value"]) for s in entry.get("candidates", {}).values()]
+
+    def record(self, step_id, selectors, matched, latency, primary=None):
+        """
+        Records one lookup for the step. 'selectors' are the candidates in the
+        order they were tried: the ones up to the 'matched' (selector_type,
+        selector_value) were evaluated and count an attempt, later ones were never
+        tried and are left alone. The matched one counts a hit and updates its
+        latency. matched=None records a miss of every candidate.
+        'primary' is the step's stored selector, used to decide on write-back.
+        """
+        evaluated = list(selectors)
+        if matched:
+            matched_key = _candidate_key(*matched)
+            for index, (sel_type, sel_value) in enumerate(evaluated):
+                if _candidate_key(sel_type, sel_value) == matched_key:
+                    evaluated = evaluated[:index + 1]
+                    break
+            else:
+                evaluated.append(matched)
+
+        with self._lock:
+            self._ensure_loaded()
+            if step_id not in self._base:
+                self._base[step_id] = copy.deepcopy(self._data.get(step_id))
+            entry = self._data.setdefault(step_id, {"candidates": {}, "promoted": None})
+            candidates = entry.setdefault("candidates", {})
+            for sel_type, sel_value in evaluated:
+                key = _candidate_key(sel_type, sel_value)
+                s = candidates.setdefault(key, {
+                    "selector_type": (sel_type or "").lower(),
+                    "selector_value": sel_value,
+                    "hits": 0,
+                    "attempts": 0,
+                    "avg_latency": 0.0,
+                })
+                s["attempts"] += 1
+
+            if matched:
+                s = candidates[_candidate_key(*matched)]
+                s["avg_latency"] = latency if not s["hits"] else (
+                    LATENCY_ALPHA * latency + (1 - LATENCY_ALPHA) * s["avg_latency"]
+                )
+                s["hits"] += 1
+                if primary and _candidate_key(*matched) != _candidate_key(*primary):
+                    self._maybe_promote(step_id, entry, s)
+
+            self._dirty.add(step_id)
+            if len(self._dirty) >= FLUSH_BATCH_SIZE or time.time() - self._last_flush >= FLUSH_INTERVAL_SECONDS:
+                self.flush()
+
+    def _maybe_promote(self, step_id, entry, stats):
+        """
+        Writes a consistently winning fallback back to form_steps (if enabled).
+        """
+        key = _candidate_key(stats["selector_type"], stats["selector_value"])
+        if not SELECTOR_WRITE_BACK or entry.get("promoted") == key:
+            return
+        if not _is_proven(stats):
+            return
+        try:
+            # Imported lazily: execution runs do not need a DB connection otherwise.
+            from step_builder_repositories.step_builder_form_steps_repository import update_step_selector
+            update_step_selector(step_id, stats["selector_type"], stats["selector_value"])
+            entry["promoted"] = key
+            logger.debug("Promoted %s '%s' for step '%s'.", stats['selector_type'], stats['selector_value'], step_id)
+        except Exception as e:
+            logger.warning("Could not write selector back for step '%s': %s", step_id, e)
+
+    def flush(self):
+        """
+        Writes the dirty steps back to disk, merged with what other processes wrote.
+        """
+        with self._lock:
+            self._last_flush = time.time()
+            if not self._dirty:
+                return
+            dirty = self._dirty
+            self._dirty = set()
+            try:
+                with _file_lock(self.path + ".lock"):
+                    merged = self._read()
+                    for step_id in dirty:
+                        merged[step_id] = _merge_step(merged.get(step_id), self._base.get(step_id), self._data[step_id])
+                    self._write(merged)
+                self._data = merged
+                for step_id in dirty:
+                    self._base.pop(step_id, None)
+                logger.debug("Flushed %s step(s) to %s.", len(dirty), self.path)
+            except Exception as e:
+                self._dirty |= dirty
+                logger.error("Failed to save selector cache: %s", e)
+
+
+_CACHE = None
+_CACHE_LOCK = threading.Lock()
+
+
+def get_selector_cache():
+    """
+    Returns the process-wide SelectorCache (created on first use, flushed at exit).
+    """
+    global _CACHE
+    with _CACHE_LOCK:
+        if _CACHE is None:
+            _CACHE = SelectorCache()
+            atexit.register(_CACHE.flush)
+        return _CACHE
+
+
+def flush_selector_cache():
+    """
+    Writes pending selector statistics to disk now (e.g. at the end of a run).
+    """
+    get_selector_cache().flush()
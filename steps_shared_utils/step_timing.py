@@ -0,0 +1,331 @@
+# E:\CRM\automation_project\steps_shared_utils\step_timing.py
+"""
+Per-step timing spans for the step runners.
+
+Each executed step is split into phases, timed with time.monotonic():
+
+  wait         adaptive wait until the target element is ready
+  locate       find_element() (primary selector, fallbacks, selector race)
+  act          the action handler itself (minus the locate time inside it)
+  alert-check  handle_unexpected_alerts() before and after the step
+  settle       settle_after_action() and the legacy fixed delays
+  human-wait   waiting for an operator (manual, safe and email-link steps)
+  retry        backoff and recovery between attempts of a failed action (retry_policy.py)
+
+Spans nest: a locate span opened by find_element() inside the act span is
+subtracted from the act span, so each phase reports its own ("self") time and
+the phases of a step add up to the step's duration. Spans opened outside a step
+(e.g. "plan") are attributed to the run.
+
+A span is marked as timed out when the phase gave up waiting (adaptive wait hit
+its budget, no selector matched, the page did not settle); that time is reported
+as time lost to timeouts.
+
+Usage (the executor does this for every run):
+
+    with timing_run(run_id, form_id) as timings:
+        with timings.step(step_order, step_id, action_name):
+            with timed_span("wait"):
+                ...
+    summary = timings.summary()
+
+Outside a timing_run(), timed_span() and mark_timeout() do nothing.
+
+Export:
+  STEP_TIMINGS_DIR        : Directory for <run_id>.json (one report per run); unset = no files.
+  STEP_TIMINGS_PROMETHEUS : "1" to also write <run_id>.prom (OpenMetrics / Prometheus text format).
+"""
+
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+from steps_shared_utils.run_logging import get_logger
+
+logger = get_logger(__name__)
+
+PHASES = ("wait", "locate", "act", "alert-check", "settle", "human-wait", "retry")
+
+TIMINGS_DIR = os.getenv("STEP_TIMINGS_DIR")
+TIMINGS_PROMETHEUS = os.getenv("STEP_TIMINGS_PROMETHEUS", "0") == "1"
+
+# Number of slowest steps listed in a summary.
+SLOWEST_STEPS = 10
+
+_LOCAL = threading.local()
+
+
+class _Span:
+    __slots__ = ("phase", "start", "duration", "child_time", "timed_out")
+
+    def __init__(self, phase, start):
+        self.phase = phase
+        self.start = start
+        self.duration = 0.0
+        self.child_time = 0.0
+        self.timed_out = False
+
+    @property
+    def self_time(self):
+        return max(0.0, self.duration - self.child_time)
+
+
+class _StepTiming:
+    __slots__ = ("step_order", "step_id", "action", "start", "duration", "spans", "failed")
+
+    def __init__(self, step_order, step_id, action, start):
+        self.step_order = step_order
+        self.step_id = step_id
+        self.action = action
+        self.start = start
+        self.duration = 0.0
+        self.spans = []
+        self.failed = False
+
+
+class RunTimings:
+    """
+    Timing spans of one run. Only used by the thread executing the run.
+    """
+
+    def __init__(self, run_id=None, form_id=None):
+        self.run_id = run_id
+        self.form_id = form_id
+        self.started = time.monotonic()
+        self.duration = None
+        self.steps = []
+        self.run_spans = []
+        self._current_step = None
+        self._open_spans = []
+
+    @contextmanager
+    def step(self, step_order, step_id=None, action=None):
+        """
+        Times one step; spans opened inside the block belong to it.
+        """
+        timing = _StepTiming(step_order, step_id, action, time.monotonic())
+        self.steps.append(timing)
+        self._current_step = timing
+        try:
+            yield timing
+        except BaseException:
+            timing.failed = True
+            raise
+        finally:
+            timing.duration = time.monotonic() - timing.start
+            self._current_step = None
+
+    @contextmanager
+    def span(self, phase):
+        """
+        Times one phase. Its duration is subtracted from the enclosing span's self time.
+        """
+        span = _Span(phase, time.monotonic())
+        parent = self._open_spans[-1] if self._open_spans else None
+        self._open_spans.append(span)
+        (self._current_step.spans if self._current_step else self.run_spans).append(span)
+        try:
+            yield span
+        finally:
+            span.duration = time.monotonic() - span.start
+            self._open_spans.pop()
+            if parent is not None:
+                parent.child_time += span.duration
+
+    def mark_timeout(self):
+        """
+        Marks the innermost open span as timed out.
+        """
+        if self._open_spans:
+            self._open_spans[-1].timed_out = True
+
+    def finish(self):
+        if self.duration is None:
+            self.duration = time.monotonic() - self.started
+        return self
+
+    def summary(self, slowest=SLOWEST_STEPS):
+        """
+        Returns the run report as a JSON-serializable dict:
+          total time, time by phase, time lost to timeouts (by phase),
+          the slowest steps with their phase breakdown, and every step.
+        """
+        total = self.duration if self.duration is not None else time.monotonic() - self.started
+        by_phase = {}
+        timeouts_by_phase = {}
+        timeout_count = 0
+        all_spans = list(self.run_spans)
+        for step_timing in self.steps:
+            all_spans.extend(step_timing.spans)
+        for span in all_spans:
+            by_phase[span.phase] = by_phase.get(span.phase, 0.0) + span.self_time
+            if span.timed_out:
+                timeout_count += 1
+                timeouts_by_phase[span.phase] = timeouts_by_phase.get(span.phase, 0.0) + span.self_time
+
+        steps = [self._step_entry(step_timing) for step_timing in self.steps]
+        measured = sum(by_phase.values())
+        return {
+            "run_id": self.run_id,
+            "form_id": self.form_id,
+            "total_seconds": round(total, 4),
+            "steps_timed": len(self.steps),
+            "by_phase": {phase: round(seconds, 4) for phase, seconds in by_phase.items()},
+            "unattributed_seconds": round(max(0.0, total - measured), 4),
+            "timeouts": {
+                "count": timeout_count,
+                "seconds": round(sum(timeouts_by_phase.values()), 4),
+                "by_phase": {phase: round(seconds, 4) for phase, seconds in timeouts_by_phase.items()},
+            },
+            "slowest_steps": sorted(steps, key=lambda entry: entry["seconds"], reverse=True)[:slowest],
+            "steps": steps,
+        }
+
+    @staticmethod
+    def _step_entry(step_timing):
+        phases = {}
+        timed_out = []
+        for span in step_timing.spans:
+            phases[span.phase] = phases.get(span.phase, 0.0) + span.self_time
+            if span.timed_out and span.phase not in timed_out:
+                timed_out.append(span.phase)
+        return {
+            "step_order": step_timing.step_order,
+            "step_id": step_timing.step_id,
+            "action": step_timing.action,
+            "seconds": round(step_timing.duration, 4),
+            "phases": {phase: round(seconds, 4) for phase, seconds in phases.items()},
+            "timed_out": timed_out,
+            "failed": step_timing.failed,
+        }
+
+
+def current_timings():
+    """
+    The RunTimings of the run executing in this thread, or None.
+    """
+    return getattr(_LOCAL, "timings", None)
+
+
+@contextmanager
+def timing_run(run_id=None, form_id=None):
+    """
+    Collects timing spans for the run executing in this thread. Nested use keeps
+    the outer run. Yields the RunTimings (finished when the block exits).
+    """
+    outer = current_timings()
+    if outer is not None:
+        yield outer
+        return
+    timings = RunTimings(run_id=run_id, form_id=form_id)
+    _LOCAL.timings = timings
+    try:
+        yield timings
+    finally:
+        timings.finish()
+        _LOCAL.timings = None
+
+
+@contextmanager
+def timed_span(phase):
+    """
+    Times 'phase' in the current run (no-op outside timing_run()).
+    """
+    timings = current_timings()
+    if timings is None:
+        yield None
+        return
+    with timings.span(phase) as span:
+        yield span
+
+
+def mark_timeout():
+    """
+    Marks the innermost open span of the current run as timed out.
+    """
+    timings = current_timings()
+    if timings is not None:
+        timings.mark_timeout()
+
+
+def _metric_label(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def to_prometheus(summary):
+    """
+    Renders a summary() dict in the OpenMetrics / Prometheus text exposition format.
+    """
+    labels = f'form_id="{_metric_label(summary.get("form_id") or "")}",run_id="{_metric_label(summary.get("run_id") or "")}"'
+    lines = [
+        "# HELP step_run_seconds Wall time of the run.",
+        "# TYPE step_run_seconds gauge",
+        f"step_run_seconds{{{labels}}} {summary['total_seconds']}",
+        "# HELP step_phase_seconds Time spent per phase (self time).",
+        "# TYPE step_phase_seconds gauge",
+    ]
+    for phase, seconds in sorted(summary["by_phase"].items()):
+        lines.append(f'step_phase_seconds{{{labels},phase="{_metric_label(phase)}"}} {seconds}')
+    lines += [
+        "# HELP step_timeout_seconds Time lost to timeouts per phase.",
+        "# TYPE step_timeout_seconds gauge",
+    ]
+    for phase, seconds in sorted(summary["timeouts"]["by_phase"].items()):
+        lines.append(f'step_timeout_seconds{{{labels},phase="{_metric_label(phase)}"}} {seconds}')
+    lines += [
+        "# HELP step_seconds Wall time per step.",
+        "# TYPE step_seconds gauge",
+    ]
+    for entry in summary["steps"]:
+        step_labels = f'{labels},step_order="{entry["step_order"]}",action="{_metric_label(entry["action"] or "")}"'
+        lines.append(f"step_seconds{{{step_labels}}} {entry['seconds']}")
+    lines.append("# EOF")
+    return "\n".join(lines) + "\n"
+
+
+def format_summary(summary, limit=5):
+    """
+    Returns a short human-readable version of a summary() dict (for the log).
+    """
+    phases = ", ".join(f"{phase} {seconds:.2f}s" for phase, seconds in
+                       sorted(summary["by_phase"].items(), key=lambda item: item[1], reverse=True))
+    lines = [
+        f"Run took {summary['total_seconds']:.2f}s over {summary['steps_timed']} step(s): {phases or 'no spans'}.",
+        f"Lost to timeouts: {summary['timeouts']['seconds']:.2f}s in {summary['timeouts']['count']} span(s).",
+    ]
+    for entry in summary["slowest_steps"][:limit]:
+        line = f"  #{entry['step_order']} {entry['action']}: {entry['seconds']:.2f}s"
+        if entry["timed_out"]:
+            line += f" (timed out: {', '.join(entry['timed_out'])})"
+        lines.append(line)
+    return "\n".join(lines)
+
+
+def export_summary(summary, directory=None, prometheus=None):
+    """
+    Writes <run_id>.json (and <run_id>.prom) into 'directory' (default STEP_TIMINGS_DIR).
+    Returns the list of written paths; nothing is written without a directory.
+    """
+    directory = directory or TIMINGS_DIR
+    if not directory:
+        return []
+    if prometheus is None:
+        prometheus = TIMINGS_PROMETHEUS
+    name = summary.get("run_id") or time.strftime("%Y%m%d-%H%M%S")
+    written = []
+    try:
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f"{name}.json")
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(summary, f, indent=2)
+        written.append(path)
+        if prometheus:
+            path = os.path.join(directory, f"{name}.prom")
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(to_prometheus(summary))
+            written.append(path)
+    except OSError as e:
+        logger.error("Could not export step timings to '%s': %s", directory, e)
+    return written
@@ -1,46 +1,392 @@
+import atexit
+import copy
 import json
 import os
+import sqlite3
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+
+from steps_shared_utils.wait_histogram import record_sample
+
+from steps_shared_utils.run_logging import get_logger
+
+logger = get_logger(__name__)
 
 # Define the path for the configuration file (stored in the same directory as this module)
-CONFIG_FILE_PATH = os.path.join(os.path.dirname(__file__), "step_wait_config.json")
+# (STEP_WAIT_CONFIG_PATH / STEP_WAIT_SQLITE_PATH override them, e.g. for the benchmarks).
+CONFIG_FILE_PATH = os.getenv("STEP_WAIT_CONFIG_PATH", os.path.join(os.path.dirname(__file__), "step_wait_config.json"))
+SQLITE_FILE_PATH = os.getenv("STEP_WAIT_SQLITE_PATH", os.path.join(os.path.dirname(__file__), "step_wait_config.sqlite3"))
 
-def load_config():
+# "json" (file + lock file, the historical format) or "sqlite" (shared DB file).
+WAIT_STATS_BACKEND = os.getenv("STEP_WAIT_BACKEND", "json").lower()
+
+# Dirty entries are written back when this many have piled up, when this many
+# seconds have passed since the last flush, or when the process exits.
+FLUSH_BATCH_SIZE = 50
+FLUSH_INTERVAL_SECONDS = 10.0
+
+
+@contextmanager
+def _file_lock(lock_path, timeout=10.0, stale_after=30.0):
     """
-    Load the wait configuration from the JSON file.
-    Returns a dictionary. If the file does not exist, returns an empty dict.
+    Cross-platform advisory lock based on exclusive creation of 'lock_path'.
+    A lock file older than 'stale_after' seconds is considered abandoned by a
+    crashed process and removed.
     """
-    if not os.path.exists(CONFIG_FILE_PATH):
-        print(f"[DEBUG step_wait_config] Config file not found at {CONFIG_FILE_PATH}. Returning empty config.")
-        return {}
+    deadline = time.time() + timeout
+    while True:
+        try:
+            fd = os.open(lock_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+            break
+        except FileExistsError:
+            try:
+                if time.time() - os.path.getmtime(lock_path) > stale_after:
+                    os.remove(lock_path)
+                    continue
+            except OSError:
+                continue
+            if time.time() > deadline:
+                raise TimeoutError(f"Could not acquire lock '{lock_path}' within {timeout}s.")
+            time.sleep(0.05)
     try:
-        with open(CONFIG_FILE_PATH, "r") as f:
-            config = json.load(f)
-            # print(f"[DEBUG step_wait_config] Loaded config: {config}")
-            return config
-    except Exception as e:
-        print(f"[ERROR step_wait_config] Failed to load config: {e}")
-        return {}
+        yield
+    finally:
+        os.close(fd)
+        try:
+            os.remove(lock_path)
+        except OSError:
+            pass
+
+
+def _get_entry(config, form_id, step_id, action_type):
+    """
+    Returns the stored stats dict for (form_id, step_id, action_type) or None.
+    Entries without a form_id live at the top level, keyed by step_id.
+    """
+    if form_id:
+        steps = config.get(form_id, {}).get("steps", {})
+    else:
+        steps = config
+    return steps.get(step_id, {}).get(action_type)
+
+
+def _set_entry(config, form_id, step_id, action_type, entry, form_name=None):
+    """
+    Stores 'entry' for (form_id, step_id, action_type), creating parents as needed.
+    """
+    if form_id:
+        if form_id not in config:
+            config[form_id] = {"form_name": form_name or "", "steps": {}}
+        elif form_name and not config[form_id].get("form_name"):
+            config[form_id]["form_name"] = form_name
+        steps = config[form_id].setdefault("steps", {})
+    else:
+        steps = config
+    steps.setdefault(step_id, {})[action_type] = entry
+
+
+# Base of an entry set by replace_all(): it overwrites the stored one instead of being merged.
+_REPLACE = object()
+
+
+def _merge_entry(stored, base, local):
+    """
+    Returns the entry to write back: what this process recorded since it read
+    the entry ('local' minus 'base') added to what is stored now ('stored'), so
+    samples recorded by other processes meanwhile are kept. Counters and
+    histogram buckets (aged counts) add up; the EMA is shifted by this process's change (or
+    averaged by sample count when this process had not seen one before).
+    """
+    if stored is None or base is _REPLACE:
+        return local
+    base = base or {}
+    merged = dict(stored)
+    for key, value in local.items():
+        if key == "hist":
+            stored_hist = stored.get("hist") or [0] * len(value)
+            base_hist = base.get("hist") or [0] * len(value)
+            if len(stored_hist) != len(value) or len(base_hist) != len(value):
+                merged[key] = value
+            else:
+                merged[key] = [s + v - b for s, v, b in zip(stored_hist, value, base_hist)]
+        elif key == "ema":
+            if "ema" not in stored:
+                merged[key] = value
+            elif "ema" in base:
+                merged[key] = max(0.0, stored["ema"] + value - base["ema"])
+            else:
+                new_samples = local.get("count", 0) - base.get("count", 0)
+                stored_samples = stored.get("count", 0)
+                total = new_samples + stored_samples
+                merged[key] = (stored["ema"] * stored_samples + value * new_samples) / total if total > 0 else value
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            merged[key] = stored.get(key, 0) + value - base.get(key, 0)
+        else:
+            merged[key] = value
+    return merged
+
+
+class WaitStatsStore:
+    """
+    In-memory cache of the adaptive wait statistics.
+
+    The statistics are loaded once, lookups are served from memory, and updates
+    only mark entries dirty. Dirty entries are written back in batches: under
+    the backend's lock (lock file / SQLite write transaction) the store re-reads
+    the stored entries, adds what it recorded since it read them (sample counts,
+    histogram buckets, the EMA's shift; see _merge_entry) and writes the result,
+    so several runner processes can share one file/DB without losing each
+    other's samples.
+
+    Backends:
+      - "json"   : CONFIG_FILE_PATH, guarded by a lock file and replaced atomically.
+      - "sqlite" : SQLITE_FILE_PATH, one row per (form_id, step_id, action_type).
+    """
+
+    def __init__(self, backend="json", path=None):
+        self.backend = backend
+        if backend == "json":
+            self.path = path or CONFIG_FILE_PATH
+        elif backend == "sqlite":
+            self.path = path or SQLITE_FILE_PATH
+        else:
+            raise ValueError(f"Unsupported wait stats backend: {backend}")
+
+        self._lock = threading.RLock()
+        self._config = None
+        self._dirty = {}  # (form_id, step_id, action_type) -> form_name
+        self._base = {}   # (form_id, step_id, action_type) -> entry as read, before our updates
+        self._last_flush = time.time()
+
+    # -- backend I/O --------------------------------------------------------
+
+    def _read_json(self):
+        if not os.path.exists(self.path):
+            logger.debug("Config file not found at %s. Returning empty config.", self.path)
+            return {}
+        try:
+            with open(self.path, "r") as f:
+                return json.load(f)
+        except Exception as e:
+            logger.error("Failed to load config: %s", e)
+            return {}
+
+    def _write_json(self, config):
+        # Write to a temp file in the same directory, then atomically swap it in,
+        # so a reader never sees a half-written file.
+        directory = os.path.dirname(self.path) or "."
+        fd, tmp_path = tempfile.mkstemp(prefix=".step_wait_config.", suffix=".tmp", dir=directory)
+        try:
+            with os.fdopen(fd, "w") as f:
+                json.dump(config, f, indent=4)
+            os.replace(tmp_path, self.path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    def _sqlite_connect(self):
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS wait_stats (
+                form_id     TEXT NOT NULL,
+                step_id     TEXT NOT NULL,
+                action_type TEXT NOT NULL,
+                form_name   TEXT,
+                data        TEXT NOT NULL,
+                PRIMARY KEY (form_id, step_id, action_type)
+            )
+        """)
+        return conn
+
+    def _read_sqlite(self):
+        config = {}
+        try:
+            conn = self._sqlite_connect()
+            try:
+                rows = conn.execute(
+                    "SELECT form_id, step_id, action_type, form_name, data FROM wait_stats"
+                ).fetchall()
+            finally:
+                conn.close()
+        except Exception as e:
+            logger.error("Failed to load wait stats from SQLite: %s", e)
+            return {}
+        for form_id, step_id, action_type, form_name, data in rows:
+            _set_entry(config, form_id or None, step_id, action_type, json.loads(data), form_name=form_name)
+        return config
+
+    def _read_backend(self):
+        return self._read_json() if self.backend == "json" else self._read_sqlite()
+
+    # -- public API ---------------------------------------------------------
+
+    def _ensure_loaded(self):
+        if self._config is None:
+            self._config = self._read_backend()
+
+    def snapshot(self):
+        """
+        Returns the full in-memory configuration (loaded on first use).
+        """
+        with self._lock:
+            self._ensure_loaded()
+            return self._config
+
+    def get(self, form_id, step_id, action_type):
+        """
+        Returns the stats dict for the key, or None if nothing has been recorded.
+        """
+        with self._lock:
+            self._ensure_loaded()
+            return _get_entry(self._config, form_id, step_id, action_type)
+
+    def put(self, form_id, step_id, action_type, entry, form_name=None):
+        """
+        Stores 'entry' in memory and marks it dirty. Flushes when the batch size
+        or the flush interval is reached.
+        """
+        with self._lock:
+            self._ensure_loaded()
+            key = (form_id, step_id, action_type)
+            if key not in self._base:
+                self._base[key] = copy.deepcopy(_get_entry(self._config, form_id, step_id, action_type))
+            _set_entry(self._config, form_id, step_id, action_type, entry, form_name=form_name)
+            self._dirty[key] = form_name
+            if len(self._dirty) >= FLUSH_BATCH_SIZE or time.time() - self._last_flush >= FLUSH_INTERVAL_SECONDS:
+                self.flush()
+
+    def replace_all(self, config):
+        """
+        Replaces the whole configuration and marks every entry dirty (its
+        entries overwrite the stored ones instead of being merged).
+        """
+        with self._lock:
+            self._config = config
+            for key, value in config.items():
+                if isinstance(value, dict) and "steps" in value:
+                    for step_id, actions in value["steps"].items():
+                        for action_type in actions:
+                            self._dirty[(key, step_id, action_type)] = value.get("form_name")
+                            self._base[(key, step_id, action_type)] = _REPLACE
+                else:
+                    for action_type in value:
+                        self._dirty[(None, key, action_type)] = None
+                        self._base[(None, key, action_type)] = _REPLACE
+            self.flush()
+
+    def _merged_entry(self, stored, key):
+        return _merge_entry(stored, self._base.get(key), _get_entry(self._config, *key))
+
+    def flush(self):
+        """
+        Writes dirty entries back to the backend (adding their new samples to
+        whatever other processes wrote meanwhile) and refreshes the in-memory copy.
+        """
+        with self._lock:
+            self._last_flush = time.time()
+            if not self._dirty:
+                return
+            dirty = self._dirty
+            self._dirty = {}
+            try:
+                if self.backend == "json":
+                    with _file_lock(self.path + ".lock"):
+                        merged = self._read_json()
+                        for (form_id, step_id, action_type), form_name in dirty.items():
+                            entry = self._merged_entry(
+                                _get_entry(merged, form_id, step_id, action_type), (form_id, step_id, action_type)
+                            )
+                            _set_entry(merged, form_id, step_id, action_type, entry, form_name=form_name)
+                        self._write_json(merged)
+                    self._config = merged
+                else:
+                    conn = self._sqlite_connect()
+                    try:
+                        with conn:
+                            # Take the write lock before reading, so no other process
+                            # writes between our read and our write.
+                            conn.execute("BEGIN IMMEDIATE")
+                            rows = []
+                            for (form_id, step_id, action_type), form_name in dirty.items():
+                                stored = conn.execute(
+                                    "SELECT data FROM wait_stats WHERE form_id = ? AND step_id = ? AND action_type = ?",
+                                    (form_id or "", step_id, action_type),
+                                ).fetchone()
+                                entry = self._merged_entry(
+                                    json.loads(stored[0]) if stored else None, (form_id, step_id, action_type)
+                                )
+                                rows.append((form_id or "", step_id, action_type, form_name or "", json.dumps(entry)))
+                            conn.executemany(
+                                "INSERT OR REPLACE INTO wait_stats (form_id, step_id, action_type, form_name, data) "
+                                "VALUES (?, ?, ?, ?, ?)",
+                                rows,
+                            )
+                    finally:
+                        conn.close()
+                    self._config = self._read_sqlite()
+                for key in dirty:
+                    self._base.pop(key, None)
+                logger.debug("Flushed %s wait stats entr%s to %s.", len(dirty), 'y' if len(dirty) == 1 else 'ies', self.path)
+            except Exception as e:
+                # Keep the entries dirty so the next flush retries them.
+                for key, form_name in dirty.items():
+                    self._dirty.setdefault(key, form_name)
+                logger.error("Failed to save config: %s", e)
+
+
+_STORE = None
+_STORE_LOCK = threading.Lock()
+
+
+def get_wait_stats_store():
+    """
+    Returns the process-wide WaitStatsStore (created on first use, flushed at exit).
+    """
+    global _STORE
+    with _STORE_LOCK:
+        if _STORE is None:
+            _STORE = WaitStatsStore(backend=WAIT_STATS_BACKEND)
+            atexit.register(_STORE.flush)
+        return _STORE
+
+
+def flush_wait_stats():
+    """
+    Writes any pending wait statistics to disk now (e.g. at the end of a run).
+    """
+    get_wait_stats_store().flush()
+
+
+def load_config():
+    """
+    Load the wait configuration.
+    Returns a dictionary (served from the in-memory store after the first call).
+    """
+    return get_wait_stats_store().snapshot()
 
 def save_config(config):
     """
-    Save the wait configuration dictionary to the JSON file.
+    Save the wait configuration dictionary (replaces everything in the store).
     """
-    # print(f"[DEBUG step_wait_config] CONFIG_FILE_PATH is set to: {CONFIG_FILE_PATH}")
-    try:
-        with open(CONFIG_FILE_PATH, "w") as f:
-            json.dump(config, f, indent=4)
-        # print(f"[DEBUG step_wait_config] Config saved successfully to {CONFIG_FILE_PATH}.")
-    except Exception as e:
-        print(f"[ERROR step_wait_config] Failed to save config: {e}")
+    get_wait_stats_store().replace_all(config)
 
-def update_step_config(step_id, action_type, measured_wait, form_id=None, form_name=None, alpha=0.2):
+def update_step_config(step_id, action_type, measured_wait, form_id=None, form_name=None, alpha=0.2, timed_out=False, early=False):
     """
     Update the configuration for a given step and action with a new measured wait time.
-    
+
     If form_id (and optionally form_name) is provided, then store the config under that form.
     Instead of storing a growing list of samples, we use an exponential moving average (EMA)
-    to update the optimal_wait.
-    
+    to update the optimal_wait, plus a fixed-bucket latency histogram ("hist") from which
+    percentile timeouts are derived (see wait_histogram.py).
+
+    A timed-out wait (timed_out=True) is recorded as a censored sample: it increments
+    "censored" but does not touch the EMA or the histogram, since the real latency is unknown.
+
+    The update only touches the in-memory store; it is written to disk in batches.
+
     Parameters:
       step_id      : Unique identifier for the step (from the database).
       action_type  : Type of action (e.g., "click", "enter_text").
@@ -48,42 +394,30 @@ def update_step_config(step_id, action_type, measured_wait, form_id=None, form_n
       form_id      : (Optional) The unique identifier for the form.
       form_name    : (Optional) The form's name.
       alpha        : Smoothing factor for EMA (default 0.2).
+      timed_out    : True if the element never became ready (measured_wait is the timeout).
+      early        : True if the element was ready at the first check, made after a
+                     first-poll delay (measured_wait is an upper bound; the EMA is not updated).
     """
-    config = load_config()
-    
-    if form_id:
-        if form_id not in config:
-            config[form_id] = {"form_name": form_name or "", "steps": {}}
-        if step_id not in config[form_id]["steps"]:
-            config[form_id]["steps"][step_id] = {}
-        if action_type not in config[form_id]["steps"][step_id]:
-            # Initialize with the first measurement
-            config[form_id]["steps"][step_id][action_type] = {"ema": measured_wait, "count": 1}
+    store = get_wait_stats_store()
+    with store._lock:
+        current_data = store.get(form_id, step_id, action_type)
+        if not current_data:
+            new_data = {"count": 0}
         else:
-            current_data = config[form_id]["steps"][step_id][action_type]
-            current_ema = current_data.get("ema", measured_wait)
-            count = current_data.get("count", 1)
-            # Update EMA: new_ema = alpha * measured_wait + (1 - alpha) * old_ema
-            new_ema = alpha * measured_wait + (1 - alpha) * current_ema
-            config[form_id]["steps"][step_id][action_type]["ema"] = new_ema
-            config[form_id]["steps"][step_id][action_type]["count"] = count + 1
-        # print(f"[DEBUG step_wait_config] Updating config for form_id '{form_id}', step_id '{step_id}', action '{action_type}': {config[form_id]['steps'][step_id][action_type]}")
-    else:
-        # Fallback if form_id not provided: use top-level keyed by step_id.
-        if step_id not in config:
-            config[step_id] = {}
-        if action_type not in config[step_id]:
-            config[step_id][action_type] = {"ema": measured_wait, "count": 1}
-        else:
-            current_data = config[step_id][action_type]
-            current_ema = current_data.get("ema", measured_wait)
-            count = current_data.get("count", 1)
-            new_ema = alpha * measured_wait + (1 - alpha) * current_ema
-            config[step_id][action_type]["ema"] = new_ema
-            config[step_id][action_type]["count"] = count + 1
-        # print(f"[DEBUG step_wait_config] Updating config for step_id '{step_id}', action '{action_type}': {config[step_id][action_type]}")
-    
-    save_config(config)
+            # A deep copy: the store merges by comparing with the entry as it was read.
+            new_data = copy.deepcopy(current_data)
+
+        if not timed_out and not early:
+            if "ema" not in new_data or not new_data.get("count"):
+                # Initialize with the first measurement
+                new_data["ema"] = measured_wait
+            else:
+                # Update EMA: new_ema = alpha * measured_wait + (1 - alpha) * old_ema
+                new_data["ema"] = alpha * measured_wait + (1 - alpha) * new_data["ema"]
+            new_data["count"] = new_data.get("count", 0) + 1
+
+        record_sample(new_data, measured_wait, censored=timed_out, early=early)
+        store.put(form_id, step_id, action_type, new_data, form_name=form_name)
 
 
 def get_step_config(form_id, step_id, action_type, default_wait=0):
@@ -91,22 +425,20 @@ def get_step_config(form_id, step_id, action_type, default_wait=0):
     Retrieve the wait configuration for a given form, step, and action.
     Returns a dictionary with keys "ema" (the current estimated optimal wait)
     and "count" (the number of measurements that have been taken).
-    
+
     If no configuration exists, returns a default structure with "ema" set to default_wait and "count" 0.
-    
+
     Parameters:
       form_id     : The unique identifier for the form.
       step_id     : The unique identifier for the step (from the DB, e.g. id_uuid).
       action_type : The type of action (e.g., "click", "enter_text").
       default_wait: The default wait time to use if no config is present (default is 0).
-    
+
     Returns:
       A dictionary such as: {"ema": <optimal_wait>, "count": <number_of_measurements>}
     """
-    config = load_config()
-    form_config = config.get(form_id, {})
-    steps_config = form_config.get("steps", {})
-    action_config = steps_config.get(step_id, {}).get(action_type, {"ema": default_wait, "count": 0})
-    print(f"[DEBUG step_wait_config] get_step_config for form_id '{form_id}', step_id '{step_id}', action '{action_type}': {action_config}")
+    action_config = get_wait_stats_store().get(form_id, step_id, action_type)
+    if action_config is None:
+        action_config = {"ema": default_wait, "count": 0}
+    logger.debug("get_step_config for form_id '%s', step_id '%s', action '%s': %s", form_id, step_id, action_type, action_config)
     return action_config
-
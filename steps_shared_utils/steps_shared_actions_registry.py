@@ -1,74 +1,114 @@
 # E:\CRM\automation_project\steps_shared_utils\steos_shared_actions_registry.py
+"""
+Action type -> handler registry.
 
-from steps_shared_actions.capture_request_number_action import capture_request_number_action
-
-from steps_shared_actions.ocr_captcha_action import ocr_captcha_action
-from steps_shared_actions.enter_ocr_result_action import enter_ocr_result_action
-
-from steps_shared_actions.goto_action import goto_action
-from steps_shared_actions.goto_from_email import goto_from_email
-
-from steps_shared_actions.select_option_action import select_option_action
-from steps_shared_actions.force_chosen_value_injection_action import force_chosen_value_injection_action
-
-from steps_shared_actions.manual_action import manual_action
-from steps_shared_actions.safe_action import safe_action
-
-from steps_shared_actions.enter_text_action import enter_text_action
-
-from steps_shared_actions.click_safe_area_action import click_safe_area_action
-from steps_shared_actions.dismiss_modal_action import dismiss_modal_action
-
-from steps_shared_actions.click_action import click_action
-
-from steps_shared_actions.page_transition import page_transition_action
-
-from steps_shared_actions.enter_date_custom import enter_date_custom_dialog_action
-from steps_shared_actions.datepicker_dialog import enter_date_datepicker_action
-from steps_shared_actions.enter_year_action import enter_year_action
-from steps_shared_actions.enter_month_action import enter_month_action
-from steps_shared_actions.enter_day_action import enter_day_action
-from steps_shared_actions.split_fields_text_month import enter_date_split_text_month_action
-from steps_shared_actions.standard_dd_mm_yyyy import enter_date_dd_mm_yyyy_action
-from steps_shared_actions.force_date_injection_action import force_date_injection_action
-from steps_shared_actions.force_date_injection_5days_action import force_date_injection_5days_action
-
-from steps_shared_actions.select_country_prefix_action import select_country_prefix_action
-from steps_shared_actions.select_country_two_steps import select_country_two_steps
-from steps_shared_actions.select_mat_option_action import select_mat_option_action
-
-
-from steps_shared_actions.full_page_screenshot_action import full_page_screenshot_action
-
-
-ACTION_HANDLERS = {
-    "goto": goto_action,
-    "goto_from_email": goto_from_email,
-    "click": click_action,
-    "enter_text": enter_text_action,
-    "select_option": select_option_action,
-    "select_mat_option_action": select_mat_option_action,
-    "manual": manual_action,
-    "click_safe_area": click_safe_area_action,
-    "page_transition": page_transition_action,
-    "enter_date_dd_mm_yyyy_action": enter_date_dd_mm_yyyy_action,
-    "enter_date_datepicker": enter_date_datepicker_action,
-    "enter_year_action": enter_year_action,
-    "enter_month_action": enter_month_action,
-    "enter_day_action": enter_day_action,
-    "enter_date_split_textmonth": enter_date_split_text_month_action,
-    "enter_date_custom_dialog_action": enter_date_custom_dialog_action,
-    "ocr_captcha": ocr_captcha_action,
-    "enter_ocr_result": enter_ocr_result_action,
-    "capture_request_number": capture_request_number_action,
-    "full_page_screenshot": full_page_screenshot_action,
-    "force_date_injection": force_date_injection_action,
-    "select_country_prefix": select_country_prefix_action,
-    "force_date_injection_5days_action": force_date_injection_5days_action,
-    "force_chosen_value_injection_action": force_chosen_value_injection_action,
-    "dismiss_modal": dismiss_modal_action,
-    "safe_action": safe_action,
-    "select_country_two_steps": select_country_two_steps,
-    "select_mat_option": select_mat_option_action,
-
-}
\ No newline at end of file
+Handlers are listed as "module:function" paths and imported on first use, so a
+form that only needs goto / click / enter_text never imports tkinter, PIL, the
+OCR plumbing or the date helpers. ACTION_HANDLERS behaves like the old dict
+(ACTION_HANDLERS["click"], ACTION_HANDLERS.get(name, default), "click" in
+ACTION_HANDLERS); ACTION_HANDLERS.prewarm(names) imports the handlers a plan
+needs up front.
+"""
+
+import importlib
+import threading
+from collections.abc import Mapping
+
+from steps_shared_utils.run_logging import get_logger
+
+logger = get_logger(__name__)
+
+
+class LazyActionRegistry(Mapping):
+    """
+    Maps action types to handlers given as "module:function" paths (or callables),
+    importing each module the first time its handler is looked up.
+    """
+
+    def __init__(self, targets):
+        self._targets = dict(targets)
+        self._resolved = {}
+        self._lock = threading.Lock()
+
+    def __getitem__(self, name):
+        handler = self._resolved.get(name)
+        if handler is not None:
+            return handler
+        target = self._targets[name]
+        if callable(target):
+            handler = target
+        else:
+            module_name, _, function_name = target.partition(":")
+            with self._lock:
+                handler = getattr(importlib.import_module(module_name), function_name)
+            logger.debug("Loaded handler '%s' for action '%s'.", target, name)
+        self._resolved[name] = handler
+        return handler
+
+    def __contains__(self, name):
+        return name in self._targets
+
+    def __iter__(self):
+        return iter(self._targets)
+
+    def __len__(self):
+        return len(self._targets)
+
+    def register(self, name, target):
+        """
+        Adds or replaces an action: 'target' is a "module:function" path or a callable.
+        """
+        self._targets[name] = target
+        self._resolved.pop(name, None)
+
+    def is_loaded(self, name):
+        return name in self._resolved
+
+    def prewarm(self, names=None):
+        """
+        Imports the handlers of 'names' (default: every action) now, e.g. the
+        action types of a plan before its first step runs. Unknown names are
+        ignored. Returns the list of action names that failed to import.
+        """
+        failed = []
+        for name in (self._targets if names is None else names):
+            if name not in self._targets:
+                continue
+            try:
+                self[name]
+            except Exception as e:
+                logger.error("Could not load the handler of action '%s': %s", name, e)
+                failed.append(name)
+        return failed
+
+
+ACTION_HANDLERS = LazyActionRegistry({
+    "goto": "steps_shared_actions.goto_action:goto_action",
+    "goto_from_email": "steps_shared_actions.goto_from_email:goto_from_email",
+    "click": "steps_shared_actions.click_action:click_action",
+    "enter_text": "steps_shared_actions.enter_text_action:enter_text_action",
+    "select_option": "steps_shared_actions.select_option_action:select_option_action",
+    "select_mat_option_action": "steps_shared_actions.select_mat_option_action:select_mat_option_action",
+    "manual": "steps_shared_actions.manual_action:manual_action",
+    "click_safe_area": "steps_shared_actions.click_safe_area_action:click_safe_area_action",
+    "page_transition": "steps_shared_actions.page_transition:page_transition_action",
+    "enter_date_dd_mm_yyyy_action": "steps_shared_actions.standard_dd_mm_yyyy:enter_date_dd_mm_yyyy_action",
+    "enter_date_datepicker": "steps_shared_actions.datepicker_dialog:enter_date_datepicker_action",
+    "enter_year_action": "steps_shared_actions.enter_year_action:enter_year_action",
+    "enter_month_action": "steps_shared_actions.enter_month_action:enter_month_action",
+    "enter_day_action": "steps_shared_actions.enter_day_action:enter_day_action",
+    "enter_date_split_textmonth": "steps_shared_actions.split_fields_text_month:enter_date_split_text_month_action",
+    "enter_date_custom_dialog_action": "steps_shared_actions.enter_date_custom:enter_date_custom_dialog_action",
+    "ocr_captcha": "steps_shared_actions.ocr_captcha_action:ocr_captcha_action",
+    "enter_ocr_result": "steps_shared_actions.enter_ocr_result_action:enter_ocr_result_action",
+    "capture_request_number": "steps_shared_actions.capture_request_number_action:capture_request_number_action",
+    "full_page_screenshot": "steps_shared_actions.full_page_screenshot_action:full_page_screenshot_action",
+    "force_date_injection": "steps_shared_actions.force_date_injection_action:force_date_injection_action",
+    "select_country_prefix": "steps_shared_actions.select_country_prefix_action:select_country_prefix_action",
+    "force_date_injection_5days_action": "steps_shared_actions.force_date_injection_5days_action:force_date_injection_5days_action",
+    "force_chosen_value_injection_action": "steps_shared_actions.force_chosen_value_injection_action:force_chosen_value_injection_action",
+    "dismiss_modal": "steps_shared_actions.dismiss_modal_action:dismiss_modal_action",
+    "safe_action": "steps_shared_actions.safe_action:safe_action",
+    "select_country_two_steps": "steps_shared_actions.select_country_two_steps:select_country_two_steps",
+    "select_mat_option": "steps_shared_actions.select_mat_option_action:select_mat_option_action",
+})
@@ -1,32 +1,411 @@
 # E:\CRM\automation_project\steps_shared_utils\steps_shares_browser_manager.py
 
+import base64
+import json
 import os
-import sys
+import threading
+import time
+import weakref
+from contextlib import contextmanager
+from urllib.parse import urlsplit
 from selenium import webdriver
 from selenium.webdriver.firefox.options import Options
+from selenium.webdriver.firefox.firefox_profile import FirefoxProfile
+from selenium.webdriver.firefox.service import Service as FirefoxService
+from selenium.webdriver.chrome.options import Options as ChromiumOptions
+from selenium.webdriver.chrome.service import Service as ChromiumService
 
-def init_browser(headless=False):
+try:
+    import psutil  # Optional: only needed for the pool's memory ceiling.
+except ImportError:
+    psutil = None
+
+from steps_shared_utils.run_logging import get_logger
+
+logger = get_logger(__name__)
+
+# -----------------------------------------------------------------------------
+# Execution profiles
+#
+# How the browser is started for a run:
+#   - "interactive"      : A visible, maximized window that loads everything (the old behaviour).
+#   - "production"       : Headless with a fixed viewport. Images, web fonts and media are
+#                          blocked, animations and smooth scrolling are disabled, and
+#                          page loads return at DOMContentLoaded ("eager").
+#   - "production_media" : Like "production", but images and fonts are kept, for
+#                          forms that OCR a captcha or take screenshots.
+#
+# STEP_BROWSER_PROFILE picks the default; a form may name its own
+# ("execution_profile" in the form dict).
+#
+# Browser backends ("firefox", "chromium") are chosen the same way:
+# STEP_BROWSER_BACKEND, or "browser_backend" in the form dict. Both are driven
+# from the local binaries; STEP_FIREFOX_BINARY / STEP_CHROMIUM_BINARY and
+# STEP_GECKODRIVER / STEP_CHROMEDRIVER point at them when they are not on PATH.
+# -----------------------------------------------------------------------------
+
+BROWSER_PROFILE = os.getenv("STEP_BROWSER_PROFILE", "interactive")
+BROWSER_BACKEND = os.getenv("STEP_BROWSER_BACKEND", "firefox").lower()
+
+FIREFOX_BINARY = os.getenv("STEP_FIREFOX_BINARY")
+GECKODRIVER_PATH = os.getenv("STEP_GECKODRIVER")
+CHROMIUM_BINARY = os.getenv("STEP_CHROMIUM_BINARY")
+CHROMEDRIVER_PATH = os.getenv("STEP_CHROMEDRIVER")
+
+# Prepared Firefox profile directories (one per execution profile); created on first use.
+BROWSER_PROFILES_DIR = os.getenv(
+    "STEP_BROWSER_PROFILES_DIR",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "browser_profiles"),
+)
+
+EXECUTION_PROFILES = {
+    "interactive": {
+        "headless": False,
+        "window_size": None,          # None = maximize the window
+        "block_images": False,
+        "block_fonts": False,
+        "block_media": False,
+        "disable_animations": False,
+        "page_load_strategy": "normal",
+        "prepared_profile": False,
+    },
+    "production": {
+        "headless": True,
+        "window_size": (1366, 900),
+        "block_images": True,
+        "block_fonts": True,
+        "block_media": True,
+        "disable_animations": True,
+        "page_load_strategy": "eager",
+        "prepared_profile": True,
+    },
+    "production_media": {
+        "headless": True,
+        "window_size": (1366, 900),
+        "block_images": False,
+        "block_fonts": False,
+        "block_media": True,
+        "disable_animations": True,
+        "page_load_strategy": "eager",
+        "prepared_profile": True,
+    },
+}
+
+# Actions that read what the page renders; their forms must keep images and fonts.
+MEDIA_ACTIONS = {"ocr_captcha", "full_page_screenshot"}
+
+# Firefox preferences applied by each profile option.
+_BLOCK_IMAGES_PREFS = {"permissions.default.image": 2}
+_BLOCK_FONTS_PREFS = {"browser.display.use_document_fonts": 0, "gfx.downloadable_fonts.enabled": False}
+_BLOCK_MEDIA_PREFS = {"media.autoplay.default": 5, "media.preload.default": 0, "media.preload.auto": 0}
+_NO_ANIMATIONS_PREFS = {
+    "ui.prefersReducedMotion": 1,
+    "general.smoothScroll": False,
+    "toolkit.cosmeticAnimations.enabled": False,
+    # Lets the prepared profile's userContent.css apply to every page.
+    "toolkit.legacyUserProfileCustomizations.stylesheets": True,
+}
+
+# Applied to every page by the prepared profile (disable_animations).
+_NO_ANIMATIONS_CSS = """*, *::before, *::after {
+    animation-duration: 0s !important;
+    animation-delay: 0s !important;
+    transition-duration: 0s !important;
+    transition-delay: 0s !important;
+    scroll-behavior: auto !important;
+}
+"""
+
+_PREPARED_PROFILES = {}
+_PREPARED_PROFILES_LOCK = threading.Lock()
+
+
+def get_execution_profile(name=None, steps=None, form=None, backend=None):
+    """
+    get_execution_profile(name=None, steps=None, form=None, backend=None)
+
+    Returns the execution profile (a dict, see EXECUTION_PROFILES, plus its "name"
+    and "backend") to start the browser with for a form.
+
+    Parameters:
+      name    : Profile name; defaults to form["execution_profile"], then STEP_BROWSER_PROFILE.
+      steps   : The form's steps. If any of them OCRs or takes screenshots
+                (MEDIA_ACTIONS), a profile blocking images or fonts is swapped for
+                its "_media" variant.
+      form    : The "form" dict of the execution input.
+      backend : Browser backend (see BROWSER_BACKENDS); defaults to
+                form["browser_backend"], then STEP_BROWSER_BACKEND.
+    """
+    backend = (backend or (form or {}).get("browser_backend") or BROWSER_BACKEND).lower()
+    if backend not in BROWSER_BACKENDS:
+        logger.warning("Unknown browser backend '%s'. Using 'firefox'.", backend)
+        backend = "firefox"
+
+    name = name or (form or {}).get("execution_profile") or BROWSER_PROFILE
+    if name not in EXECUTION_PROFILES:
+        logger.warning("Unknown execution profile '%s'. Using 'interactive'.", name)
+        name = "interactive"
+    profile = EXECUTION_PROFILES[name]
+
+    needs_media = any((step or {}).get("action_type") in MEDIA_ACTIONS for step in steps or ())
+    if needs_media and (profile["block_images"] or profile["block_fonts"]):
+        media_name = f"{name}_media"
+        if media_name in EXECUTION_PROFILES:
+            logger.debug("Form renders images (OCR/screenshot); using profile '%s' instead of '%s'.", media_name, name)
+            name, profile = media_name, EXECUTION_PROFILES[media_name]
+        else:
+            profile = dict(profile, block_images=False, block_fonts=False)
+
+    return dict(profile, name=name, backend=backend)
+
+
+def _profile_preferences(profile):
+    prefs = {}
+    if profile.get("block_images"):
+        prefs.update(_BLOCK_IMAGES_PREFS)
+    if profile.get("block_fonts"):
+        prefs.update(_BLOCK_FONTS_PREFS)
+    if profile.get("block_media"):
+        prefs.update(_BLOCK_MEDIA_PREFS)
+    if profile.get("disable_animations"):
+        prefs.update(_NO_ANIMATIONS_PREFS)
+    return prefs
+
+
+def prepare_profile_dir(profile):
+    """
+    Creates (once per process) the Firefox profile directory of an execution
+    profile under BROWSER_PROFILES_DIR: user.js with its preferences and
+    chrome/userContent.css that disables animations. Returns the directory.
+
+    Selenium copies this template for every session, so concurrent browsers
+    never share (and lock) the same profile.
+    """
+    name = profile.get("name", "custom")
+    with _PREPARED_PROFILES_LOCK:
+        path = _PREPARED_PROFILES.get(name)
+        if path:
+            return path
+        path = os.path.join(BROWSER_PROFILES_DIR, name)
+        os.makedirs(os.path.join(path, "chrome"), exist_ok=True)
+        with open(os.path.join(path, "user.js"), "w", encoding="utf-8") as f:
+            for key, value in sorted(_profile_preferences(profile).items()):
+                f.write(f'user_pref("{key}", {json.dumps(value)});\n')
+        with open(os.path.join(path, "chrome", "userContent.css"), "w", encoding="utf-8") as f:
+            f.write(_NO_ANIMATIONS_CSS if profile.get("disable_animations") else "")
+        _PREPARED_PROFILES[name] = path
+        logger.debug("Prepared Firefox profile '%s' in %s", name, path)
+        return path
+
+
+def build_firefox_options(profile):
+    """
+    Returns the Firefox Options for an execution profile dict.
+    """
+    options = Options()
+    if profile.get("headless"):
+        options.add_argument("-headless")
+    if FIREFOX_BINARY:
+        options.binary_location = FIREFOX_BINARY
+
+    # Set the capability to automatically accept unexpected alerts.
+    options.set_capability("unhandledPromptBehavior", "accept")
+
+    options.page_load_strategy = profile.get("page_load_strategy") or "normal"
+    if profile.get("prepared_profile"):
+        options.profile = FirefoxProfile(prepare_profile_dir(profile))
+    for key, value in _profile_preferences(profile).items():
+        options.set_preference(key, value)
+    return options
+
+
+# URL patterns blocked through the DevTools Protocol on Chromium (it has no
+# preference for fonts or media).
+_CHROMIUM_BLOCKED_FONTS = ["*.woff", "*.woff2", "*.ttf", "*.otf", "*.eot"]
+_CHROMIUM_BLOCKED_MEDIA = ["*.mp4", "*.webm", "*.ogg", "*.mp3", "*.m4a", "*.wav", "*.m3u8"]
+
+# Injected into every document on Chromium (the counterpart of the Firefox userContent.css).
+# It runs before the document has any element, so the stylesheet is added as soon
+# as the root element exists (at the latest on DOMContentLoaded).
+_CHROMIUM_NO_ANIMATIONS_JS = """
+(function () {
+    function inject() {
+        var root = document.head || document.documentElement;
+        if (!root) { return false; }
+        var style = document.createElement('style');
+        style.textContent = %s;
+        root.appendChild(style);
+        return true;
+    }
+    if (inject()) { return; }
+    var observer = new MutationObserver(function () {
+        if (inject()) { observer.disconnect(); document.removeEventListener('DOMContentLoaded', onReady); }
+    });
+    function onReady() { observer.disconnect(); inject(); }
+    observer.observe(document, {childList: true});
+    document.addEventListener('DOMContentLoaded', onReady);
+})();
+""" % json.dumps(_NO_ANIMATIONS_CSS)
+
+
+def build_chromium_options(profile):
+    """
+    Returns the Chromium/Chrome Options for an execution profile dict.
+    Font/media blocking and the animation stylesheet are applied over the
+    DevTools Protocol once the browser runs (see _apply_chromium_profile).
     """
-    init_browser(headless=False)
+    options = ChromiumOptions()
+    if profile.get("headless"):
+        options.add_argument("--headless=new")
+    if CHROMIUM_BINARY:
+        options.binary_location = CHROMIUM_BINARY
+    if profile.get("window_size"):
+        width, height = profile["window_size"]
+        options.add_argument(f"--window-size={width},{height}")
+    options.add_argument("--disable-dev-shm-usage")
 
-    Initializes a Firefox WebDriver, optionally in headless mode.
-    Returns a Selenium WebDriver instance.
+    # Set the capability to automatically accept unexpected alerts.
+    options.set_capability("unhandledPromptBehavior", "accept")
+
+    options.page_load_strategy = profile.get("page_load_strategy") or "normal"
+    if profile.get("block_images"):
+        options.add_experimental_option("prefs", {"profile.managed_default_content_settings.images": 2})
+    if profile.get("block_media"):
+        options.add_argument("--autoplay-policy=user-gesture-required")
+    if profile.get("disable_animations"):
+        options.add_argument("--force-prefers-reduced-motion")
+        options.add_argument("--disable-smooth-scrolling")
+    return options
+
+
+def _apply_chromium_profile(driver, profile):
+    blocked = []
+    if profile.get("block_fonts"):
+        blocked += _CHROMIUM_BLOCKED_FONTS
+    if profile.get("block_media"):
+        blocked += _CHROMIUM_BLOCKED_MEDIA
+    if blocked:
+        driver.execute_cdp_cmd("Network.enable", {})
+        driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": blocked})
+    if profile.get("disable_animations"):
+        driver.execute_cdp_cmd("Page.addScriptToEvaluateOnNewDocument", {"source": _CHROMIUM_NO_ANIMATIONS_JS})
+
+
+def _start_firefox(profile):
+    service = FirefoxService(executable_path=GECKODRIVER_PATH) if GECKODRIVER_PATH else None
+    return webdriver.Firefox(options=build_firefox_options(profile), service=service)
+
+
+def _start_chromium(profile):
+    service = ChromiumService(executable_path=CHROMEDRIVER_PATH) if CHROMEDRIVER_PATH else None
+    driver = webdriver.Chrome(options=build_chromium_options(profile), service=service)
+    _apply_chromium_profile(driver, profile)
+    return driver
+
+
+# Backend name -> function(profile) returning a started WebDriver.
+BROWSER_BACKENDS = {
+    "firefox": _start_firefox,
+    "chromium": _start_chromium,
+    "chrome": _start_chromium,
+}
+
+
+class BrowserStartError(RuntimeError):
+    """
+    Raised by init_browser() when the WebDriver cannot be started.
+    """
+
+
+def init_browser(headless=False, profile=None, backend=None):
     """
-    print("[DEBUG browser_manager.init_browser] Called with headless=", headless)
+    init_browser(headless=False, profile=None, backend=None)
+
+    Initializes a WebDriver (Firefox unless told otherwise), optionally in headless mode.
+    Returns a Selenium WebDriver instance; raises BrowserStartError if it cannot be started.
+
+    'profile' is an execution profile name or dict (see get_execution_profile);
+    without one the "interactive" profile is used. headless=True forces headless
+    mode for any profile. 'backend' ("firefox", "chromium") overrides the
+    profile's backend.
+    """
+    if profile is None or isinstance(profile, str):
+        profile = get_execution_profile(profile or "interactive", backend=backend)
+    if backend and profile.get("backend") != backend:
+        profile = dict(profile, backend=backend)
+    if headless and not profile.get("headless"):
+        profile = dict(profile, headless=True)
+    backend = profile.get("backend") or BROWSER_BACKEND
+    logger.debug("Called with headless= %s, profile= %s, backend= %s", profile.get("headless"), profile.get("name"), backend)
     try:
-        options = Options()
-        options.headless = headless
-
-        # Set the capability to automatically accept unexpected alerts.
-        options.set_capability("unhandledPromptBehavior", "accept")
-        
-        driver = webdriver.Firefox(options=options)
-        driver.maximize_window()
-        print("[DEBUG browser_manager.init_browser] Successfully initialized Firefox WebDriver.")
+        driver = BROWSER_BACKENDS[backend](profile)
+        if profile.get("window_size"):
+            width, height = profile["window_size"]
+            driver.set_window_size(width, height)
+        else:
+            driver.maximize_window()
+        logger.debug("Successfully initialized %s WebDriver.", backend)
         return driver
     except Exception as e:
-        print(f"[ERROR browser_manager.init_browser] Failed to initialize Firefox WebDriver: {e}")
-        sys.exit(1)  # or raise
+        logger.error("Failed to initialize %s WebDriver: %s", backend, e)
+        raise BrowserStartError(f"Failed to initialize {backend} WebDriver: {e}") from e
+
+
+def browser_family(driver):
+    """
+    Returns "firefox", "chromium" or None for a running WebDriver.
+    """
+    name = (getattr(driver, "capabilities", None) or {}).get("browserName", "").lower()
+    if "firefox" in name:
+        return "firefox"
+    if "chrom" in name or "edge" in name:
+        return "chromium"
+    return None
+
+
+# Feature -> browser families that provide it.
+BROWSER_FEATURES = {
+    "full_page_screenshot": {"firefox", "chromium"},  # native capture, no scrolling/stitching
+    "cdp": {"chromium"},                              # DevTools Protocol (execute_cdp_cmd)
+    "request_blocking": {"chromium"},                 # Network.setBlockedURLs
+}
+
+
+def browser_supports(driver, feature):
+    """
+    True if the running browser offers 'feature' (see BROWSER_FEATURES).
+    """
+    family = browser_family(driver)
+    if family not in BROWSER_FEATURES.get(feature, ()):
+        return False
+    if family == "chromium":
+        return hasattr(driver, "execute_cdp_cmd")
+    if feature == "full_page_screenshot":
+        return hasattr(driver, "get_full_page_screenshot_as_png")
+    return True
+
+
+def get_full_page_screenshot_png(driver):
+    """
+    Returns a PNG (bytes) of the whole page captured natively by the browser,
+    or None if the browser cannot do that (the caller then scrolls and stitches).
+    """
+    if not browser_supports(driver, "full_page_screenshot"):
+        return None
+    try:
+        if browser_family(driver) == "firefox":
+            return driver.get_full_page_screenshot_as_png()
+        metrics = driver.execute_cdp_cmd("Page.getLayoutMetrics", {})
+        size = metrics.get("cssContentSize") or metrics["contentSize"]
+        result = driver.execute_cdp_cmd("Page.captureScreenshot", {
+            "format": "png",
+            "captureBeyondViewport": True,
+            "clip": {"x": 0, "y": 0, "width": size["width"], "height": size["height"], "scale": 1},
+        })
+        return base64.b64decode(result["data"])
+    except Exception as e:
+        logger.warning("Native full-page screenshot failed: %s", e)
+        return None
 
 def close_browser(driver):
     """
@@ -34,9 +413,461 @@ def close_browser(driver):
 
     Closes the given WebDriver instance, logging debug output.
     """
-    print("[DEBUG browser_manager.close_browser] Called.")
+    logger.debug("Called.")
     try:
         driver.quit()
-        print("[DEBUG browser_manager.close_browser] Firefox WebDriver closed.")
+        logger.debug("WebDriver closed.")
     except Exception as e:
-        print(f"[ERROR browser_manager.close_browser] Failed to close Firefox WebDriver: {e}")
+        logger.error("Failed to close WebDriver: %s", e)
+
+
+# driver -> origins ("https://host:port") its current job visited, see note_visited_origin().
+_VISITED_ORIGINS = weakref.WeakKeyDictionary()
+_VISITED_ORIGINS_LOCK = threading.Lock()
+
+
+def _origin_of(url):
+    parts = urlsplit(url or "")
+    if parts.scheme not in ("http", "https") or not parts.netloc:
+        return None
+    return f"{parts.scheme}://{parts.netloc}"
+
+
+def note_visited_origin(driver):
+    """
+    Remembers the origin of the page 'driver' is on, so reset_browser() clears
+    that site too when the session goes back to a pool. The executor calls this
+    after every step.
+    """
+    try:
+        origin = _origin_of(driver.current_url)
+    except Exception:
+        return
+    if origin:
+        with _VISITED_ORIGINS_LOCK:
+            _VISITED_ORIGINS.setdefault(driver, set()).add(origin)
+
+
+def _clear_site_data_cdp(driver, origins):
+    """
+    Chromium: deletes every cookie of the browser and the storage (localStorage,
+    IndexedDB, cache storage, service workers, ...) of 'origins' and of every
+    site that had a cookie.
+    """
+    origins = set(origins)
+    cookies = driver.execute_cdp_cmd("Storage.getCookies", {}).get("cookies", [])
+    for cookie in cookies:
+        domain = cookie.get("domain", "").lstrip(".")
+        if domain:
+            origins.update((f"https://{domain}", f"http://{domain}"))
+    driver.execute_cdp_cmd("Network.clearBrowserCookies", {})
+    for origin in origins:
+        driver.execute_cdp_cmd("Storage.clearDataForOrigin", {"origin": origin, "storageTypes": "all"})
+
+
+# Same-origin page loaded to clear a site without other CDP: small, and it does not
+# run the site's application code.
+_CLEAR_SITE_PATH = "/favicon.ico"
+
+
+def _clear_site_data_by_navigation(driver, origins):
+    """
+    Other browsers: opens a lightweight page of every origin in turn and deletes
+    its cookies, localStorage and sessionStorage from there (WebDriver only
+    reaches the site that is open).
+    """
+    for origin in sorted(origins):
+        driver.get(origin + _CLEAR_SITE_PATH)
+        driver.delete_all_cookies()
+        driver.execute_script(
+            "try { window.localStorage.clear(); } catch (e) {}"
+            "try { window.sessionStorage.clear(); } catch (e) {}"
+        )
+
+
+def reset_browser(driver, window_size=None):
+    """
+    reset_browser(driver, window_size=None)
+
+    Brings a used browser session back to a clean state so the next job can reuse it:
+      - closes every tab/window except the first one
+      - deletes the cookies and site storage of every site the job visited
+      - navigates to about:blank
+      - restores the window size (or maximizes the window if no size is given)
+
+    On Chromium every cookie of the browser is deleted and the storage of every
+    visited site (and of every site that had a cookie) is cleared through the
+    DevTools Protocol. Other browsers visit a small page of every site the job
+    went to and delete its cookies and storage from there.
+
+    Returns True if the reset succeeded, False otherwise (the caller should then
+    quit the session instead of reusing it).
+    """
+    with _VISITED_ORIGINS_LOCK:
+        origins = _VISITED_ORIGINS.pop(driver, set())
+    try:
+        handles = driver.window_handles
+        for handle in handles[1:]:
+            driver.switch_to.window(handle)
+            origins.add(_origin_of(driver.current_url))
+            driver.close()
+        driver.switch_to.window(handles[0])
+        origins.add(_origin_of(driver.current_url))
+        origins.discard(None)
+
+        if browser_supports(driver, "cdp"):
+            _clear_site_data_cdp(driver, origins)
+        else:
+            _clear_site_data_by_navigation(driver, origins)
+        driver.get("about:blank")
+
+        if window_size:
+            driver.set_window_size(window_size["width"], window_size["height"])
+        else:
+            driver.maximize_window()
+        return True
+    except Exception as e:
+        logger.warning("Failed to reset browser session: %s", e)
+        return False
+
+
+def is_browser_healthy(driver):
+    """
+    Returns True if the WebDriver session still answers a trivial script call.
+    """
+    try:
+        return driver.execute_script("return 1;") == 1
+    except Exception:
+        return False
+
+
+def get_browser_memory_mb(driver):
+    """
+    Returns the resident memory (in MB) of the driver process and all browser
+    processes it spawned, or None if it cannot be measured (psutil missing, remote driver, ...).
+    """
+    if psutil is None:
+        return None
+    try:
+        root = psutil.Process(driver.service.process.pid)
+        processes = [root] + root.children(recursive=True)
+        return sum(p.memory_info().rss for p in processes) / (1024 * 1024)
+    except Exception:
+        return None
+
+
+# Seconds between checks while a pool waits for another pool to free a session
+# of their shared SessionLimit.
+_LIMIT_POLL = 0.5
+
+
+class SessionLimit:
+    """
+    Caps the number of browser sessions of several BrowserPools together (e.g.
+    one pool per execution profile, see ProfilePools). A pool that needs a new
+    session while the limit is reached quits an idle session of another pool.
+    """
+
+    def __init__(self, size):
+        self.size = size
+        self.used = 0
+        self._pools = []
+        self._lock = threading.Lock()
+
+    def add_pool(self, pool):
+        with self._lock:
+            self._pools.append(pool)
+
+    def take(self):
+        with self._lock:
+            if self.used >= self.size:
+                return False
+            self.used += 1
+            return True
+
+    def give_back(self):
+        with self._lock:
+            self.used -= 1
+
+    def make_room(self, requester):
+        """
+        Quits one idle session of a pool other than 'requester'. Returns True if
+        one was quit.
+        """
+        with self._lock:
+            pools = [pool for pool in self._pools if pool is not requester]
+        return any(pool.discard_idle() for pool in pools)
+
+
+class BrowserPool:
+    """
+    A pool of pre-launched browser sessions that are reused across jobs.
+
+    Starting Firefox + geckodriver costs several seconds per job. The pool keeps
+    sessions warm, resets them between jobs instead of quitting them, checks that
+    they are still alive before handing them out, and recycles a session after a
+    configurable number of jobs or when it grows past a memory ceiling.
+
+    Usage:
+        pool = BrowserPool(size=4, headless=True)
+        with pool.session() as driver:
+            run_steps_crm_format(steps_data, driver=driver, ...)
+        pool.close()
+    """
+
+    def __init__(self, size=1, headless=False, max_jobs_per_session=50, max_memory_mb=None, prelaunch=True, profile=None,
+                 limit=None):
+        """
+        Parameters:
+          size                 : Maximum number of browser sessions alive at once.
+          limit                : Optional SessionLimit shared with other pools.
+          headless             : Passed to init_browser for every session.
+          profile              : Execution profile (name or dict) passed to init_browser.
+          max_jobs_per_session : Quit and replace a session after this many jobs.
+          max_memory_mb        : Quit and replace a session once it uses more memory
+                                 than this (requires psutil; ignored otherwise).
+          prelaunch            : Start all sessions right away instead of on first use.
+        """
+        self.size = size
+        self.headless = headless
+        self.profile = profile
+        self.max_jobs_per_session = max_jobs_per_session
+        self.max_memory_mb = max_memory_mb
+        self.limit = limit
+
+        self._condition = threading.Condition()
+        self._idle = []          # drivers ready to be handed out
+        self._sessions = {}      # id(driver) -> {"jobs": int, "window_size": dict}
+        self._launching = 0      # sessions currently being started
+        self._closed = False
+
+        if max_memory_mb and psutil is None:
+            logger.warning("psutil is not installed; max_memory_mb will be ignored.")
+        if limit is not None:
+            limit.add_pool(self)
+
+        if prelaunch:
+            for _ in range(size):
+                self._launch_in_background()
+
+    # -- internal helpers -------------------------------------------------
+
+    def _total(self):
+        return len(self._sessions) + self._launching
+
+    def _launch(self):
+        """
+        Starts a new browser session and registers it. Returns the driver.
+        """
+        driver = init_browser(headless=self.headless, profile=self.profile)
+        try:
+            window_size = driver.get_window_size()
+        except Exception:
+            close_browser(driver)
+            raise
+        with self._condition:
+            self._sessions[id(driver)] = {"jobs": 0, "window_size": window_size}
+        return driver
+
+    def _launch_in_background(self):
+        """
+        Starts a new session in a background thread and puts it in the idle list,
+        so a replacement is warm by the time the next job asks for it.
+        """
+        with self._condition:
+            if self.limit is not None and not self.limit.take():
+                return
+            self._launching += 1
+
+        def worker():
+            driver = None
+            try:
+                driver = self._launch()
+            except Exception as e:
+                logger.error("Failed to pre-launch browser: %s", e)
+                if self.limit is not None:
+                    self.limit.give_back()
+            with self._condition:
+                self._launching -= 1
+                closed = self._closed
+                if driver is not None:
+                    if closed:
+                        self._forget(driver)
+                    else:
+                        self._idle.append(driver)
+                self._condition.notify_all()
+            if driver is not None and closed:
+                close_browser(driver)
+
+        threading.Thread(target=worker, name="browser-pool-launcher", daemon=True).start()
+
+    def _forget(self, driver):
+        """
+        Unregisters a session and frees its limit slot. Caller must hold the
+        condition lock and quit the driver (close_browser) after releasing it, so
+        other workers are not blocked while the browser shuts down.
+        """
+        if self._sessions.pop(id(driver), None) is not None and self.limit is not None:
+            self.limit.give_back()
+
+    # -- public API -------------------------------------------------------
+
+    def acquire(self, timeout=None):
+        """
+        Returns a healthy browser session, waiting up to 'timeout' seconds
+        (None = forever) if all sessions are busy.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            make_room = False
+            stale = None
+            with self._condition:
+                while True:
+                    if self._closed:
+                        raise RuntimeError("BrowserPool is closed.")
+                    if self._idle:
+                        driver = self._idle.pop()
+                        if is_browser_healthy(driver):
+                            return driver
+                        logger.warning("Idle session failed health check; replacing it.")
+                        self._forget(driver)
+                        stale = driver
+                        break
+                    if self._total() < self.size:
+                        if self.limit is None or self.limit.take():
+                            self._launching += 1
+                            break
+                        make_room = True
+                    remaining = None if deadline is None else deadline - time.monotonic()
+                    if remaining is not None and remaining <= 0:
+                        raise TimeoutError(f"No browser session became available within {timeout}s.")
+                    if make_room:
+                        break
+                    self._condition.wait(remaining)
+
+            if stale is not None:
+                close_browser(stale)
+                continue
+            if not make_room:
+                break
+            # The shared limit is reached: quit an idle session of another pool,
+            # or wait for one to become idle.
+            if not self.limit.make_room(self):
+                with self._condition:
+                    self._condition.wait(_LIMIT_POLL if remaining is None else min(remaining, _LIMIT_POLL))
+
+        # Start the browser outside the lock so other workers are not blocked meanwhile.
+        # Waiters are woken either way: on success the count moves to _sessions, on
+        # failure a slot became free for them to launch into.
+        try:
+            return self._launch()
+        except Exception:
+            if self.limit is not None:
+                self.limit.give_back()
+            raise
+        finally:
+            with self._condition:
+                self._launching -= 1
+                self._condition.notify_all()
+
+    def release(self, driver, discard=False):
+        """
+        Returns a session to the pool after a job.
+
+        The session is quit (and a warm replacement started) instead of being
+        reused when 'discard' is True, when it has served max_jobs_per_session
+        jobs, when it exceeds max_memory_mb, or when it cannot be reset.
+        """
+        with self._condition:
+            meta = self._sessions.get(id(driver))
+        if meta is None:
+            # Not one of ours; just close it.
+            close_browser(driver)
+            return
+
+        meta["jobs"] += 1
+        reason = None
+        if discard:
+            reason = "discard requested"
+        elif meta["jobs"] >= self.max_jobs_per_session:
+            reason = f"served {meta['jobs']} jobs"
+        elif self.max_memory_mb:
+            memory_mb = get_browser_memory_mb(driver)
+            if memory_mb is not None and memory_mb > self.max_memory_mb:
+                reason = f"uses {memory_mb:.0f} MB (ceiling {self.max_memory_mb} MB)"
+        if reason is None and not reset_browser(driver, meta["window_size"]):
+            reason = "could not be reset"
+
+        with self._condition:
+            if reason is None and self._total() > self.size:
+                reason = "pool shrunk"
+            if reason is None and not self._closed:
+                self._idle.append(driver)
+                self._condition.notify_all()
+                return
+            logger.debug("Recycling browser session: %s.", reason or 'pool closed')
+            self._forget(driver)
+            recycle = not self._closed and self._total() < self.size
+            self._condition.notify_all()
+
+        close_browser(driver)
+        if recycle:
+            self._launch_in_background()
+
+    def resize(self, size):
+        """
+        Changes the maximum number of sessions. Growing lets waiting acquire()
+        calls start a new session; surplus idle sessions are quit right away and
+        busy ones when they are released.
+        """
+        surplus = []
+        with self._condition:
+            self.size = max(1, size)
+            while self._idle and self._total() > self.size:
+                surplus.append(self._idle.pop())
+                self._forget(surplus[-1])
+            self._condition.notify_all()
+        for driver in surplus:
+            close_browser(driver)
+
+    def discard_idle(self):
+        """
+        Quits the longest-idle session, if any. Returns True if one was quit.
+        """
+        with self._condition:
+            if not self._idle:
+                return False
+            driver = self._idle.pop(0)
+            self._forget(driver)
+            self._condition.notify_all()
+        close_browser(driver)
+        return True
+
+    @contextmanager
+    def session(self, timeout=None):
+        """
+        Context manager: acquires a session and always releases it afterwards.
+        If the body raises, the session is discarded rather than reused.
+        """
+        driver = self.acquire(timeout=timeout)
+        failed = False
+        try:
+            yield driver
+        except BaseException:
+            failed = True
+            raise
+        finally:
+            self.release(driver, discard=failed)
+
+    def close(self):
+        """
+        Quits every idle session. Sessions still in use are quit when released.
+        """
+        with self._condition:
+            self._closed = True
+            idle, self._idle = self._idle, []
+            for driver in idle:
+                self._forget(driver)
+            self._condition.notify_all()
+        for driver in idle:
+            close_browser(driver)
@@ -1,37 +1,46 @@
+import os
 import time
-from selenium.common.exceptions import ElementClickInterceptedException, ElementNotInteractableException, TimeoutException
+from selenium.common.exceptions import TimeoutException
 from selenium.webdriver.support.wait import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.common.by import By
 
+from steps_shared_utils.run_logging import get_logger
+from steps_shared_utils.step_timing import mark_timeout
+from steps_shared_utils.retry_policy import retry_call
+
+logger = get_logger(__name__)
+
 def click_with_retry(driver, element, max_retries=5, delay=1.0):
     """
-    Attempts to click the given element up to max_retries times.
-    Between attempts, waits for 'delay' seconds.
+    Attempts to click the given element up to max_retries times while the click
+    is intercepted or the element is not interactable yet (max_retries overrides
+    the retry policy's own limits).
+
+    'delay' is the longest wait between two attempts, no longer a fixed sleep:
+    the waits follow the retry policy's jittered backoff (0.25 s, 0.5 s, 1 s, ...)
+    capped at 'delay', and count against the run's retry budget.
     """
-    last_exc = None
-    for attempt in range(1, max_retries + 1):
-        try:
-            element.click()
-            return  # success
-        except (ElementClickInterceptedException, ElementNotInteractableException) as e:
-            last_exc = e
-            print(f"[WARNING] Attempt #{attempt} to click element failed: {e}")
-            time.sleep(delay)
-    raise last_exc
+    retry_call(
+        element.click,
+        driver=driver,
+        retry_classes=("intercepted", "not_interactable"),
+        max_retries=max_retries - 1,
+        max_delay=delay,
+    )
 
 def wait_for_overlay_disappear(driver, overlay_id="overlay-background", timeout=2):
     """
     Waits up to 'timeout' seconds for an overlay (by ID) to disappear.
     """
-    print(f"[DEBUG] Waiting up to {timeout}s for overlay '{overlay_id}' to disappear.")
+    logger.debug("Waiting up to %ss for overlay '%s' to disappear.", timeout, overlay_id)
     try:
         WebDriverWait(driver, timeout).until(
             EC.invisibility_of_element_located((By.ID, overlay_id))
         )
-        print("[DEBUG] Overlay disappeared or was not present.")
+        logger.debug("Overlay disappeared or was not present.")
     except TimeoutException:
-        print(f"[WARNING] Overlay '{overlay_id}' still visible after {timeout}s. Continuing anyway.")
+        logger.warning("Overlay '%s' still visible after %ss. Continuing anyway.", overlay_id, timeout)
 
 def wait_until_clickable(driver, by, locator, timeout=2):
     """
@@ -98,7 +107,220 @@ def wait_for_page_ready(driver, timeout=3, spinner_css=None, check_jquery=False,
     try:
         WebDriverWait(driver, timeout).until(combined_condition)
         total_wait = time.time() - start_time
-        print(f"[DEBUG wait_helpers] Combined wait_for_page_ready finished in {total_wait:.2f}s")
+        logger.debug("Combined wait_for_page_ready finished in %.2fs", total_wait)
     except TimeoutException as e:
         total_wait = time.time() - start_time
-        print(f"[WARNING wait_helpers] wait_for_page_ready timed out after {timeout}s: {e}. Total wait: {total_wait:.2f}s")
+        logger.warning("wait_for_page_ready timed out after %ss: %s. Total wait: %.2fs", timeout, e, total_wait)
+
+
+# ---------------------------------------------------------------------------
+# POST-ACTION SETTLE
+# ---------------------------------------------------------------------------
+# After every action the executors used to sleep a fixed second (twice).
+# wait_for_settle() instead polls a set of "settled" predicates and returns as
+# soon as all of them hold, bounded by a timeout. The fixed delay is still
+# available per step for legacy sites (see get_settle_options).
+
+# Overlays already known to wait_for_page_ready / wait_for_overlay_disappear.
+DEFAULT_OVERLAY_CSS = "#loadingOverlay, #overlay-background"
+
+# "auto" (predicate based) or "fixed" (legacy sleep) for steps that don't say otherwise.
+DEFAULT_SETTLE_MODE = os.getenv("STEP_SETTLE_MODE", "auto")
+DEFAULT_SETTLE_DELAY = 1.0     # seconds, the old fixed delay
+DEFAULT_SETTLE_TIMEOUT = 2.0   # seconds, upper bound for "auto" (the old fixed delays added up to 2 s)
+DEFAULT_QUIET_MS = 300         # DOM must be free of structural mutations for this long
+
+# Installs, once per document, a MutationObserver and XMLHttpRequest/fetch
+# wrappers counting in-flight requests (window.__stepSettle). arm_settle() runs
+# it before the action, so the requests the action starts are counted.
+# Only mutations adding or removing elements count: attribute and text changes
+# of spinners and clocks would otherwise keep the page "busy" forever. A
+# document that is already loaded when the observer is installed counts as
+# quiet since its load event, so a navigation does not pay the full quiet window.
+_SETTLE_INSTALL_JS = """
+var st = window.__stepSettle;
+if (!st) {
+    var loadedAt = (document.readyState === 'complete' && window.performance && performance.timing && performance.timing.loadEventEnd) || Date.now();
+    st = window.__stepSettle = {lastMutation: loadedAt, pending: 0, resources: 0};
+    try { st.resources = performance.getEntriesByType('resource').length; } catch (e) {}
+    try {
+        new MutationObserver(function (records) {
+            for (var i = 0; i < records.length; i++) {
+                var nodes = [].concat([].slice.call(records[i].addedNodes), [].slice.call(records[i].removedNodes));
+                for (var j = 0; j < nodes.length; j++) {
+                    if (nodes[j].nodeType === 1) { st.lastMutation = Date.now(); return; }
+                }
+            }
+        }).observe(document, {childList: true, subtree: true});
+    } catch (e) {}
+    try {
+        var origSend = XMLHttpRequest.prototype.send;
+        XMLHttpRequest.prototype.send = function () {
+            st.pending++;
+            this.addEventListener('loadend', function () { st.pending = Math.max(0, st.pending - 1); });
+            return origSend.apply(this, arguments);
+        };
+    } catch (e) {}
+    try {
+        if (window.fetch) {
+            var origFetch = window.fetch;
+            window.fetch = function () {
+                st.pending++;
+                var done = function () { st.pending = Math.max(0, st.pending - 1); };
+                var p = origFetch.apply(this, arguments);
+                p.then(done, done);
+                return p;
+            };
+        }
+    } catch (e) {}
+}
+"""
+
+# One round-trip probe: installs the instrumentation if this document has none
+# yet (e.g. the action navigated), then returns the current page state.
+_SETTLE_PROBE_JS = _SETTLE_INSTALL_JS + """
+var overlayCss = arguments[0];
+try {
+    // Resources finishing (images, scripts, requests begun before the probe was
+    // installed) count as activity too.
+    var resources = performance.getEntriesByType('resource').length;
+    if (resources !== st.resources) { st.resources = resources; st.lastMutation = Date.now(); }
+} catch (e) {}
+var overlayVisible = false;
+if (overlayCss) {
+    var nodes = document.querySelectorAll(overlayCss);
+    for (var i = 0; i < nodes.length; i++) {
+        var r = nodes[i].getClientRects();
+        var cs = window.getComputedStyle(nodes[i]);
+        if (r.length && cs.visibility !== 'hidden' && cs.display !== 'none') { overlayVisible = true; break; }
+    }
+}
+var jqActive = (typeof window.jQuery !== 'undefined' && window.jQuery.active) ? window.jQuery.active : 0;
+return {
+    readyState: document.readyState,
+    quietMs: Date.now() - st.lastMutation,
+    pending: st.pending + jqActive,
+    overlayVisible: overlayVisible
+};
+"""
+
+
+def _ready_state_settled(state, options):
+    return state.get("readyState") == "complete"
+
+
+def _dom_quiet_settled(state, options):
+    return state.get("quietMs", 0) >= options.get("quiet_ms", DEFAULT_QUIET_MS)
+
+
+def _network_idle_settled(state, options):
+    return state.get("pending", 0) == 0
+
+
+def _overlay_settled(state, options):
+    return not state.get("overlayVisible", False)
+
+
+# Name -> predicate(state, options). Register more with register_settle_predicate().
+SETTLE_PREDICATES = {
+    "ready_state": _ready_state_settled,
+    "dom_quiet": _dom_quiet_settled,
+    "network_idle": _network_idle_settled,
+    "overlay": _overlay_settled,
+}
+
+DEFAULT_SETTLE_PREDICATES = ("ready_state", "dom_quiet", "network_idle", "overlay")
+
+
+def register_settle_predicate(name, predicate):
+    """
+    Adds a custom "settled" predicate. 'predicate' receives (state, options), where
+    state is the dict returned by the page probe (readyState, quietMs, pending,
+    overlayVisible) and options the settle options of the step.
+    """
+    SETTLE_PREDICATES[name] = predicate
+
+
+def get_settle_options(step):
+    """
+    Reads the settle behaviour for a step. Optional step keys:
+      - settle_mode       : "auto" (predicate based) or "fixed" (legacy sleep).
+      - settle_delay      : Seconds to sleep in "fixed" mode (default 1.0).
+      - settle_timeout    : Upper bound in seconds for "auto" mode (default 2.0).
+      - settle_predicates : List of predicate names to use in "auto" mode.
+    """
+    step = step or {}
+    predicates = step.get("settle_predicates") or DEFAULT_SETTLE_PREDICATES
+    if isinstance(predicates, str):
+        predicates = [p.strip() for p in predicates.split(",") if p.strip()]
+    delay = step.get("settle_delay")
+    timeout = step.get("settle_timeout")
+    return {
+        "mode": (step.get("settle_mode") or DEFAULT_SETTLE_MODE).lower(),
+        "delay": float(DEFAULT_SETTLE_DELAY if delay is None else delay),
+        "timeout": float(DEFAULT_SETTLE_TIMEOUT if timeout is None else timeout),
+        "quiet_ms": DEFAULT_QUIET_MS,
+        "overlay_css": DEFAULT_OVERLAY_CSS,
+        "predicates": tuple(predicates),
+    }
+
+
+def wait_for_settle(driver, options=None, poll_interval=0.1):
+    """
+    Waits until every predicate in options["predicates"] holds, or until
+    options["timeout"] seconds have passed. Returns the time spent (seconds).
+
+    Predicates that are not registered are ignored with a warning. If the page
+    cannot be probed (e.g. an alert is open or the page is mid-navigation) the
+    probe is retried until the timeout.
+    """
+    options = options or get_settle_options(None)
+    predicates = []
+    for name in options["predicates"]:
+        predicate = SETTLE_PREDICATES.get(name)
+        if predicate is None:
+            logger.warning("Unknown settle predicate '%s'. Ignoring it.", name)
+            continue
+        predicates.append(predicate)
+
+    start_time = time.time()
+    deadline = start_time + options["timeout"]
+    while True:
+        try:
+            state = driver.execute_script(_SETTLE_PROBE_JS, options.get("overlay_css"))
+            if all(predicate(state, options) for predicate in predicates):
+                return time.time() - start_time
+        except Exception:
+            # Alert open, page navigating, ... -> just try again.
+            pass
+        if time.time() >= deadline:
+            logger.warning("Page did not settle within %ss. Continuing anyway.", options['timeout'])
+            mark_timeout()
+            return time.time() - start_time
+        time.sleep(poll_interval)
+
+
+def arm_settle(driver, options):
+    """
+    Installs the settle instrumentation (mutation observer, request counters)
+    in the current document before an action, so wait_for_settle() also sees
+    the requests and DOM changes the action itself starts. No-op in "fixed" mode.
+    """
+    if options["mode"] == "fixed":
+        return
+    try:
+        driver.execute_script(_SETTLE_INSTALL_JS)
+    except Exception as e:
+        # Alert open, page navigating, ... -> the probe installs it after the action.
+        logger.debug("Could not arm the settle probe: %s", e)
+
+
+def settle_after_action(driver, options):
+    """
+    Post-action pause used by the executors, driven by get_settle_options(step).
+    In "fixed" mode this is the legacy time.sleep(delay); otherwise wait_for_settle().
+    """
+    if options["mode"] == "fixed":
+        time.sleep(options["delay"])
+        return options["delay"]
+    return wait_for_settle(driver, options)
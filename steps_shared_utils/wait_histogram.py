@@ -0,0 +1,142 @@
+# E:\CRM\automation_project\steps_shared_utils\wait_histogram.py
+"""
+Compact latency sketch for the adaptive wait statistics.
+
+Each (form, step, action) entry in step_wait_config keeps a fixed-bucket
+histogram of how long the element took to become ready:
+
+    "hist":     [count per bucket]   (bucket i covers (BUCKET_BOUNDS[i-1], BUCKET_BOUNDS[i]])
+    "censored": number of waits that timed out (true latency unknown, > the timeout)
+    "early":    number of waits already ready at the first check after the
+                first-poll delay (true latency unknown, <= that delay)
+
+Timeouts are kept apart from real measurements so that one slow page does not
+poison the estimate. From the histogram the executor picks a p95/p99 timeout
+and a first-poll delay.
+
+An early sample goes into the bucket of the delay (an upper bound, which keeps
+the timeout on the safe side) and counts as possibly instant for the first-poll
+delay, so that delay can shrink again once the page gets faster. All counts age
+by HISTORY_DECAY per new sample, so old runs fade out instead of pinning the
+estimates forever.
+"""
+
+# Upper bounds (seconds) of the histogram buckets; the last bucket is open-ended.
+BUCKET_BOUNDS = (
+    0.05, 0.1, 0.2, 0.3, 0.5, 0.75, 1.0, 1.5, 2.0, 3.0,
+    4.0, 5.0, 7.0, 10.0, 15.0, 20.0, 30.0, float("inf"),
+)
+
+# Below this many samples the histogram is not trusted and the caller's default is used.
+MIN_SAMPLES = 5
+
+# Every count is multiplied by this before a new sample is added (about 35
+# samples to halve the weight of an old one).
+HISTORY_DECAY = 0.98
+
+
+def _bucket_index(seconds):
+    for i, bound in enumerate(BUCKET_BOUNDS):
+        if seconds <= bound:
+            return i
+    return len(BUCKET_BOUNDS) - 1
+
+
+def _aged(count):
+    return round(count * HISTORY_DECAY, 4)
+
+
+def record_sample(entry, seconds, censored=False, early=False):
+    """
+    Adds one observation to 'entry' (a stats dict, modified in place), after
+    aging the existing counts by HISTORY_DECAY.
+
+    A censored sample (timeout) only increases the "censored" counter, because
+    the real latency is only known to be larger than 'seconds'. An early sample
+    (ready at the first check, made after a delay of 'seconds') is counted in
+    the bucket of 'seconds' and in "early".
+    """
+    hist = entry.get("hist")
+    if not hist or len(hist) != len(BUCKET_BOUNDS):
+        hist = [0] * len(BUCKET_BOUNDS)
+    hist = [_aged(count) for count in hist]
+    entry["censored"] = _aged(entry.get("censored", 0))
+    entry["early"] = _aged(entry.get("early", 0))
+    if censored:
+        entry["censored"] += 1
+    else:
+        hist[_bucket_index(seconds)] += 1
+        if early:
+            entry["early"] += 1
+    entry["hist"] = hist
+    return entry
+
+
+def sample_count(entry):
+    """
+    Number of observations in 'entry', including censored ones.
+    """
+    return sum(entry.get("hist") or []) + entry.get("censored", 0)
+
+
+def estimate_quantile(entry, quantile):
+    """
+    Returns the upper bound (seconds) of the bucket that holds the given quantile,
+    or None when there are too few samples or the quantile lies among the
+    censored (timed-out) samples, i.e. beyond anything we have observed.
+    """
+    hist = entry.get("hist") or []
+    total = sample_count(entry)
+    if total < MIN_SAMPLES:
+        return None
+    target = quantile * total
+    cumulative = 0
+    for i, count in enumerate(hist):
+        cumulative += count
+        if count and cumulative >= target:
+            bound = BUCKET_BOUNDS[i]
+            return None if bound == float("inf") else bound
+    return None
+
+
+def estimate_lower_bound(entry, quantile):
+    """
+    Returns the lower edge (seconds) of the bucket that holds the given quantile:
+    nothing faster than this has been seen for that share of the samples.
+    Early samples may have been instant and count as 0 seconds here.
+    Returns 0.0 when unknown.
+    """
+    hist = entry.get("hist") or []
+    total = sample_count(entry)
+    if total < MIN_SAMPLES:
+        return 0.0
+    target = quantile * total
+    cumulative = entry.get("early", 0)
+    if cumulative >= target:
+        return 0.0
+    for i, count in enumerate(hist):
+        cumulative += count
+        if count and cumulative >= target:
+            return BUCKET_BOUNDS[i - 1] if i > 0 else 0.0
+    return 0.0
+
+
+def choose_timeout(entry, default_timeout, quantile=0.95, margin=1.5, min_timeout=1.0):
+    """
+    Picks the wait timeout for a step: the 'quantile' latency times 'margin',
+    clamped to [min_timeout, default_timeout]. Falls back to default_timeout when
+    the histogram cannot answer (too few samples, or too many timeouts).
+    """
+    estimate = estimate_quantile(entry or {}, quantile)
+    if estimate is None:
+        return default_timeout
+    return max(min_timeout, min(default_timeout, estimate * margin))
+
+
+def choose_first_poll_delay(entry, quantile=0.05, max_delay=2.0):
+    """
+    Picks how long to wait before the first readiness check: the lower edge of
+    the bucket holding the 'quantile' latency (so ~95% of past runs were not
+    ready earlier than this), capped at max_delay.
+    """
+    return min(max_delay, estimate_lower_bound(entry or {}, quantile))